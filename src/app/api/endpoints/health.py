@@ -0,0 +1,41 @@
+from fastapi import APIRouter, Response, status
+
+from app.core.warmup import readiness
+from app.util.budget import budget_report, latency_report
+from app.util.conversation_store import get_conversation_manager
+from app.util.llm import LLMClientManager
+from app.util.paths import path_stats
+from app.util.planner import planner_stats
+from app.util.serializer import serializer_report
+from app.util.speculation import hit_rate, speculation_stats
+from app.util.standalone import condense_report
+
+router = APIRouter()
+
+
+@router.get("/")
+async def liveness():
+    return {"status": "ok"}
+
+
+@router.get("/ready")
+async def ready(response: Response):
+    if not readiness.ready:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return readiness.report()
+
+
+@router.get("/stats")
+async def stats():
+    return {
+        "conversations": get_conversation_manager().stats(),
+        "llm_clients": LLMClientManager.stats(),
+        "llm_routes": LLMClientManager.route_stats(),
+        "condense": condense_report(),
+        "planner": planner_stats,
+        "paths": path_stats,
+        "query_budget": budget_report(),
+        "query_latency": latency_report(),
+        "synthesis_prompts": serializer_report(),
+        "speculation": {**speculation_stats, "hit_rate": hit_rate()},
+    }
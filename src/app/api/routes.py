@@ -1,6 +1,7 @@
 from fastapi import APIRouter
 
-from app.api.endpoints import chat
+from app.api.endpoints import chat, health
 
 api_router = APIRouter()
 api_router.include_router(chat.router, prefix="/chat", tags=["chat"])
+api_router.include_router(health.router, prefix="/health", tags=["health"])
@@ -1,20 +1,24 @@
 import asyncio
 import os
 import sys
+import time
 import uuid
 from typing import Any, Dict, List, Optional
 
 import chainlit as cl
+from chainlit.utils import utc_now
 from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
 from langchain_core.runnables import Runnable, RunnableConfig
 from loguru import logger
 
-from app.util import get_rag_chain, get_summary_chain
+from app.core.config import config
 from app.util.agent import AgenticGraphRAG
+from app.util.budget import QueryBudget
 from app.util.chains import ConversationState
-from app.util.planner import QueryPlanner
-from app.util.response import ResponseParser, display_response_with_thinking_step
-from app.util.validators import ResponseValidator
+from app.util.conversation_store import get_conversation_manager
+from app.util.planner import FinalResult, StepResult
+from app.util.response import ResponseParser, stream_response_with_thinking_step
+from app.util.shared import get_shared_chains
 
 # Add the src directory to Python path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
@@ -85,26 +89,31 @@ I can:
 
     await cl.Message(content=welcome_message).send()
 
-    # Initialize components with modern conversation state
-    conversation_state = ConversationState()
-    rag_chain = get_rag_chain()
-    summary_chain = get_summary_chain()
+    await start_session()
 
-    # Initialize agentic components
-    query_planner = QueryPlanner()
-    response_validator = ResponseValidator()
+
+async def start_session() -> None:
+    """Allocate the per-session state, everything else is shared by all sessions."""
+    # Chains, planner and validator are stateless and shared by all sessions,
+    # a session only allocates its execution history. The conversation itself is
+    # owned by the conversation manager and resolved per message.
+    shared = get_shared_chains()
+    session_id = cl.context.session.thread_id
     agentic_rag = AgenticGraphRAG(
-        base_rag_chain=rag_chain,
-        planner=query_planner,
-        validator=response_validator,
-        memory=conversation_state,  # Pass the new conversation state
+        base_rag_chain=shared.rag_chain,
+        planner=shared.planner,
+        validator=shared.validator,
+        memory=await get_conversation_manager().aget(session_id),
     )
 
-    set_session("conversation_state", conversation_state)
-    set_session("rag_chain", rag_chain)
-    set_session("summary_chain", summary_chain)
+    set_session("conversation_id", session_id)
     set_session("agentic_rag", agentic_rag)
-    set_session("query_planner", query_planner)
+
+
+@cl.on_chat_resume
+async def on_chat_resume(thread: Dict):
+    # History is loaded lazily from the conversation store on the next message.
+    await start_session()
 
 
 @cl.on_message
@@ -112,15 +121,17 @@ async def on_message(message: cl.Message):
     """Handle incoming messages with agentic processing."""
 
     # Get session components
-    conversation_state: ConversationState = get_session("conversation_state")
+    # Resolved per message: an evicted or resumed session is reloaded from the store.
+    conversation_state = await get_conversation_manager().aget(get_session("conversation_id"))
     agentic_rag: AgenticGraphRAG = get_session("agentic_rag")
+    agentic_rag.memory = conversation_state
 
     # Step 1: Analyze query complexity
     complexity_analysis = await analyze_query_complexity(message.content, conversation_state)
 
     if complexity_analysis["is_simple"]:
         # Simple query - use direct RAG
-        await handle_simple_query(message, conversation_state, get_session("rag_chain"))
+        await handle_simple_query(message, conversation_state, get_shared_chains().rag_chain)
     else:
         # Complex query - use agentic approach
         await handle_complex_query(message, agentic_rag, complexity_analysis)
@@ -197,58 +208,16 @@ async def handle_simple_query(
     if chat_messages:
         query["chat_history"] = chat_messages
 
-    full_response = ""
-    current_content = ""
-    thinking_step = None
-    main_msg = None
-    in_think_tags = False
-
-    async for chunk in rag_chain.astream(
-        query,
-        config=RunnableConfig(callbacks=[cl.LangchainCallbackHandler()]),
-    ):
-        full_response += chunk
-        current_content += chunk
-
-        # Check if we're entering think tags
-        if "<think>" in current_content and not in_think_tags:
-            in_think_tags = True
-            thinking_step = cl.Step(name="🧠 Reasoning...", type="tool")
-            await thinking_step.__aenter__()
-            # Remove the <think> tag from display
-            current_content = current_content.replace("<think>", "")
-            continue
-
-        # Check if we're exiting think tags
-        if "</think>" in current_content and in_think_tags:
-            in_think_tags = False
-            # Extract thinking content and close step
-            think_content = current_content.replace("</think>", "")
-            thinking_step.output = think_content
-            await thinking_step.__aexit__(None, None, None)
-
-            # Start main message for the answer
-            main_msg = cl.Message(content="")
-            current_content = ""  # Reset for answer content
-            continue
-
-        # Stream to appropriate destination
-        if in_think_tags and thinking_step:
-            # Update thinking step (note: chainlit steps don't support
-            # streaming)
-            thinking_step.output = current_content
-        elif main_msg:
-            # Stream to main answer
-            await main_msg.stream_token(chunk)
-        elif not in_think_tags and not main_msg:
-            # No thinking tags detected, create main message if not exists
-            if not main_msg:
-                main_msg = cl.Message(content="")
-            await main_msg.stream_token(chunk)
-
-    # Finalize main message
-    if main_msg:
-        await main_msg.update()
+    full_response = await stream_response_with_thinking_step(
+        rag_chain.astream(
+            query,
+            config=RunnableConfig(
+                callbacks=[cl.LangchainCallbackHandler()],
+                # Keys the entities of previous turns used by speculative retrieval.
+                configurable={"session_id": conversation_state.session_id},
+            ),
+        )
+    )
 
     # Extract clean answer for conversation state
     _, clean_answer = ResponseParser.extract_think_and_answer(full_response)
@@ -260,6 +229,21 @@ async def handle_simple_query(
             "ai": clean_answer})
 
 
+def step_result_text(step_result: StepResult, number: int) -> str:
+    """Extract the text to display from the result of a plan step."""
+    if step_result.data and isinstance(step_result.data, dict):
+        data = step_result.data
+        for key in ("result", "synthesis", "answer"):
+            if key in data:
+                return str(getattr(data[key], "content", data[key]))
+        # Join all non-empty string values
+        values = [str(v) for v in data.values() if v and str(v).strip()]
+        return " ".join(values) if values else str(data)
+    if step_result.data:
+        return str(step_result.data)
+    return step_result.summary or f"Step {number} completed successfully"
+
+
 # Updated complex query handler for consistency
 async def handle_complex_query(
         message: cl.Message,
@@ -267,136 +251,144 @@ async def handle_complex_query(
         complexity_analysis: Dict):
     """Handle complex queries with agentic processing."""
 
+    # Planning, plan steps and synthesis share one latency budget
+    budget = QueryBudget(config.QUERY_BUDGET) if config.QUERY_BUDGET > 0 else None
+    started = time.monotonic()
+
     try:
         # Step 1: Show planning phase
         planning_msg = cl.Message(content="🎯 **Planning my approach...**")
         await planning_msg.send()
 
-        # Generate execution plan
-        plan = await agentic_rag.create_execution_plan(message.content, complexity_analysis)
-
-        # Update planning message with the plan
+        # Step 2: Execute the plan while it is planned. Steps are listed in the
+        # planning message as they arrive, independent steps run concurrently and
+        # each step is displayed as it starts and updated as it finishes
+        plan = None
         plan_text = "## 📋 My Analysis Plan\n\n"
-        for i, step in enumerate(plan.steps, 1):
-            plan_text += f"**Step {i}:** {step.description}\n"
-        plan_text += f"\n*Estimated confidence: {plan.confidence_estimate}%*"
-
-        planning_msg.content = plan_text
-        await planning_msg.update()
-
-        # Step 2: Execute plan with enhanced step display
-        results = []
-
-        for i, step in enumerate(plan.steps, 1):
-            # Each step gets its own chainlit step for better UX
-            step_title = f"Step {i}: {step.description}"
-            step_context = cl.Step(name=step_title, type="tool")
-            async with step_context as step_display:
-                try:
-                    # Execute step
-                    step_result = await agentic_rag.execute_step(step, message.content)
-                    results.append(step_result)
-
-                    # Handle step result safely - extract text content
-                    if hasattr(step_result, "summary") and step_result.summary:
-                        result_text = str(step_result.summary)
-                    elif hasattr(step_result, "data") and step_result.data:
-                        # Try to extract meaningful text from data
-                        data = step_result.data
-                        if isinstance(data, dict):
-                            if "result" in data:
-                                result_text = str(data["result"])
-                            elif "synthesis" in data:
-                                result_text = str(data["synthesis"])
-                            elif "answer" in data:
-                                result_text = str(data["answer"])
-                            else:
-                                # Join all non-empty string values
-                                values = [
-                                    str(v) for v in data.values() if v and str(v).strip()]
-                                result_text = " ".join(
-                                    values) if values else str(data)
-                        else:
-                            result_text = str(data)
-                    else:
-                        result_text = f"Step {i} completed successfully"
-
-                    # Parse step result for thinking vs summary
-                    thinking, summary = ResponseParser.extract_think_and_answer(
-                        result_text)
-
-                    if thinking:
-                        step_display.output = (
-                            f"**🧠 Reasoning:**\n{thinking}\n\n**📝 Result:**\n{summary}")
-                    else:
-                        step_display.output = summary or result_text
-
-                    # Don't store the step_result object to avoid serialization issues
-                    # Instead, store just basic metadata as a simple dict
-                    step_display.generation = {
-                        "success": getattr(
-                            step_result, "success", True), "confidence": getattr(
-                            step_result, "confidence", 0), "execution_time": getattr(
-                            step_result, "execution_time", 0), "step_type": getattr(
-                            step, "query_type", "unknown"), }
-
-                except Exception as e:
-                    import traceback
-
-                    error_details = f"❌ **Error in Step {i}:** {
-                        str(e)
-                    }\n\n**Debug Info:**\n```\n{traceback.format_exc()}\n```"
-                    step_display.output = error_details
-                    print(f"Step execution error: {e}")  # For server logs
-                    # Add a None result to maintain step count
-                    results.append(None)
+        numbers: Dict[str, int] = {}
+        displays: Dict[str, cl.Step] = {}
+        results_by_id: Dict[str, StepResult] = {}
+
+        async for event in agentic_rag.execute_streamed_plan(
+            agentic_rag.stream_execution_plan(message.content, complexity_analysis),
+            message.content,
+            budget,
+        ):
+            if event.status in ("planned", "plan"):
+                planned = [event.step] if event.step else event.plan.steps
+                for step in planned:
+                    if step.step_id not in numbers:
+                        numbers[step.step_id] = len(numbers) + 1
+                        plan_text += f"**Step {numbers[step.step_id]}:** {step.description}\n"
+                if event.plan:
+                    plan = event.plan
+                    planning_msg.content = (
+                        plan_text + f"\n*Estimated confidence: {plan.confidence_estimate}%*")
+                else:
+                    planning_msg.content = plan_text + "\n*Planning...*"
+                await planning_msg.update()
+                continue
+
+            i = numbers[event.step.step_id]
+            if event.status in ("started", "cancelled"):
+                # Each step gets its own chainlit step for better UX
+                step_display = cl.Step(name=f"Step {i}: {event.step.description}", type="tool")
+                step_display.start = utc_now()
+                await step_display.send()
+                displays[event.step.step_id] = step_display
+                if event.status == "started":
                     continue
 
-        # Step 3: Synthesize results with enhanced display
-        step_context = cl.Step(name="🔄 Synthesizing Results", type="tool")
-        async with step_context as synthesis_step:
-            try:
-                # Filter successful results (remove None values from failed
-                # steps)
-                successful_results = [
-                    r for r in results if r is not None and getattr(
-                        r, "success", False)]
-
-                if not successful_results:
-                    synthesis_step.output = (
-                        "❌ No successful steps to synthesize - all steps failed"
-                    )
-                    raise RuntimeError(
-                        "No successful step results to synthesize")
-
-                synthesis_step.output = f"🔄 Processing {
-                    len(successful_results)} successful results..."
-
-                final_result = await agentic_rag.synthesize_results(
-                    successful_results, message.content
-                )
-                synthesis_step.output = f"✅ Successfully combined {
-                    len(successful_results)
-                } findings into comprehensive analysis"
-
-            except Exception as e:
-                import traceback
-
-                error_details = f"❌ Synthesis failed: {
-                    str(e)
-                }\n\n**Debug Info:**\n```\n{traceback.format_exc()}\n```"
-                synthesis_step.output = error_details
-                print(f"Synthesis error: {e}")  # For server logs
-                raise
+            step_display = displays.pop(event.step.step_id)
+            step_result = results_by_id[event.step.step_id] = event.result
+            step_display.end = utc_now()
+
+            if event.status == "cancelled":
+                step_display.output = f"⏭️ **Step {i} skipped:** {step_result.summary}"
+            elif not step_result.success:
+                step_display.output = f"❌ **Error in Step {i}:** {step_result.summary}"
+                step_display.is_error = True
+            else:
+                # Parse step result for thinking vs summary
+                result_text = step_result_text(step_result, i)
+                thinking, summary = ResponseParser.extract_think_and_answer(result_text)
+
+                if thinking:
+                    step_display.output = (
+                        f"**🧠 Reasoning:**\n{thinking}\n\n**📝 Result:**\n{summary}")
+                else:
+                    step_display.output = summary or result_text
+
+            # Don't store the step_result object to avoid serialization issues
+            # Instead, store just basic metadata as a simple dict
+            step_display.generation = {
+                "success": step_result.success,
+                "confidence": step_result.confidence,
+                "execution_time": step_result.execution_time,
+                "step_type": event.step.query_type,
+            }
+            await step_display.update()
+
+        results = [results_by_id[step.step_id] for step in plan.steps]
+
+        # Step 3: Synthesize results, streaming the answer as it is generated.
+        # The synthesis step is sent rather than entered so the answer message
+        # is not nested under it
+        synthesis_step = cl.Step(name="🔄 Synthesizing Results", type="tool")
+        synthesis_step.start = utc_now()
+        await synthesis_step.send()
+        final_result = None
+
+        async def answer_tokens():
+            nonlocal final_result
+            async for item in agentic_rag.stream_synthesis(
+                results, message.content, budget, started
+            ):
+                if isinstance(item, FinalResult):
+                    final_result = item
+                else:
+                    yield item
 
-        # Step 4: Display final result with thinking separation
-        # Safely extract the answer text
-        if hasattr(final_result, "answer"):
-            answer_text = str(final_result.answer)
-        else:
-            answer_text = str(final_result)
-
-        await display_response_with_thinking_step(answer_text, "Final Analysis")
+        try:
+            # Filter successful results (remove None values from failed
+            # steps)
+            successful_results = [
+                r for r in results if r is not None and getattr(
+                    r, "success", False)]
+
+            if not successful_results:
+                synthesis_step.output = (
+                    "❌ No successful steps to synthesize - all steps failed"
+                )
+                raise RuntimeError(
+                    "No successful step results to synthesize")
+
+            synthesis_step.output = f"🔄 Processing {
+                len(successful_results)} successful results..."
+            await synthesis_step.update()
+
+            # Step 4: Stream the final answer with thinking separation. Failed
+            # and cancelled steps are passed along so a partial answer is
+            # flagged as such
+            full_answer = await stream_response_with_thinking_step(answer_tokens())
+            synthesis_step.output = f"✅ Successfully combined {
+                len(successful_results)
+            } findings into comprehensive analysis"
+
+        except Exception as e:
+            import traceback
+
+            error_details = f"❌ Synthesis failed: {
+                str(e)
+            }\n\n**Debug Info:**\n```\n{traceback.format_exc()}\n```"
+            synthesis_step.output = error_details
+            synthesis_step.is_error = True
+            print(f"Synthesis error: {e}")  # For server logs
+            raise
+
+        finally:
+            synthesis_step.end = utc_now()
+            await synthesis_step.update()
 
         # Step 5: Show metadata in a clean format
         metadata_content = f"""## 📊 Analysis Summary
@@ -427,8 +419,7 @@ async def handle_complex_query(
         await cl.Message(content=metadata_content).send()
 
         # Save clean answer to conversation state
-        _, clean_answer = ResponseParser.extract_think_and_answer(
-            final_result.answer)
+        _, clean_answer = ResponseParser.extract_think_and_answer(full_answer)
         agentic_rag.memory.save_context(
             inputs={"human": message.content}, outputs={"ai": clean_answer}
         )
@@ -118,6 +118,135 @@ class Config(BaseSettings):
     LLM_MODEL_ID: str = Field(
         default="openai/gpt-4o",
         description="LLM model ID")
+    LLM_MAX_CONNECTIONS: int = Field(
+        default=20,
+        description="Max open HTTP connections per LLM provider")
+    LLM_MAX_KEEPALIVE_CONNECTIONS: int = Field(
+        default=10,
+        description="Max idle keep-alive HTTP connections per LLM provider")
+    LLM_KEEPALIVE_EXPIRY: float = Field(
+        default=60.0,
+        description="Seconds an idle LLM HTTP connection is kept alive")
+    LLM_TIMEOUT: float = Field(
+        default=120.0,
+        description="HTTP timeout in seconds for LLM requests")
+    LLM_CALL_TIMEOUT: float = Field(
+        default=60.0,
+        description="Deadline in seconds for a single async LLM call")
+    LLM_SINGLE_FLIGHT: bool = Field(
+        default=True,
+        description="Coalesce identical in-flight LLM, retrieval and embedding calls")
+    LLM_FALLBACKS: list[str] = Field(
+        default_factory=list,
+        description="Fallback routes as `provider:model`, tried in order after the primary")
+    LLM_HEDGE: bool = Field(
+        default=True,
+        description="Send a hedged duplicate to the next fallback when a route is slow")
+    LLM_HEDGE_DELAY: Optional[float] = Field(
+        default=None,
+        description="Fixed hedging delay in seconds, learned from route latencies if unset")
+    LLM_HEDGE_QUANTILE: float = Field(
+        default=0.95,
+        description="Route latency quantile used as the learned hedging delay")
+    LLM_HEDGE_INITIAL_DELAY: float = Field(
+        default=2.0,
+        description="Hedging delay in seconds until a route has enough latency samples")
+    LLM_ATTEMPT_TIMEOUT: float = Field(
+        default=30.0,
+        description="Seconds after which a routed LLM attempt fails over to the next route")
+    LLM_CACHE_CHAINS: list[str] = Field(
+        default_factory=lambda: ["ner", "condense", "planner"],
+        description="Chains whose LLM responses are cached")
+    LLM_CACHE_PATH: str = Field(
+        default=".llm_cache.sqlite",
+        description="SQLite file of the LLM response cache")
+    LLM_CACHE_MAX_ENTRIES: int = Field(
+        default=10_000,
+        description="Max cached LLM responses, least recently used are evicted")
+    LLM_CACHE_MAX_AGE: float = Field(
+        default=7 * 24 * 3600,
+        description="Seconds a cached LLM response stays valid")
+    LLM_CACHE_SEMANTIC: bool = Field(
+        default=False,
+        description="Enable the semantic (embedding similarity) cache tier")
+    LLM_CACHE_SIMILARITY_THRESHOLD: float = Field(
+        default=0.95,
+        description="Min cosine similarity for a semantic cache hit")
+    LLM_CACHE_SEMANTIC_CANDIDATES: int = Field(
+        default=1000,
+        description="Max recently used prompts compared on a semantic cache lookup")
+    WARMUP_ENABLED: bool = Field(
+        default=True,
+        description="Warm the store, Ollama models and chains on startup")
+    WARMUP_RETRY_INTERVAL: float = Field(
+        default=15.0,
+        description="Seconds between retries of failed warmup steps, 0 disables retries")
+    OLLAMA_KEEP_ALIVE: str = Field(
+        default="30m",
+        description="How long Ollama keeps warmed models loaded")
+    OLLAMA_KEEP_ALIVE_INTERVAL: float = Field(
+        default=600.0,
+        description="Seconds between Ollama keep-alive requests, 0 disables them")
+    PLAN_MAX_CONCURRENCY: int = Field(
+        default=4,
+        description="Maximum number of plan steps executed at the same time")
+    PLAN_TEMPLATES: bool = Field(
+        default=True,
+        description="Plan common query patterns from templates instead of the planner LLM")
+    PLAN_CACHE_SIZE: int = Field(
+        default=1000,
+        description="Max LLM plans cached by query shape, 0 disables the cache")
+    PATH_MAX_HOPS: int = Field(
+        default=5,
+        description="Maximum length of relationship paths between entities")
+    PATH_MAX_PATHS: int = Field(
+        default=5,
+        description="Maximum shortest paths returned per pair of entities")
+    PATH_MAX_DEGREE: int = Field(
+        default=200,
+        description="Paths never go through intermediate entities with more relationships")
+    PATH_QUERY_TIMEOUT: float = Field(
+        default=3.0,
+        description="Seconds before path search falls back to BFS over the cached adjacency")
+    PATH_ADJACENCY_MAX_EDGES: int = Field(
+        default=500_000,
+        description="Maximum relationships loaded into the cached entity adjacency")
+    STEP_MEMO_SIZE: int = Field(
+        default=256,
+        description="Max retrieval step results memoized per session, 0 disables reuse")
+    SYNTHESIS_STEP_MAX_TOKENS: int = Field(
+        default=1000,
+        description="Token budget of each step result in synthesis prompts")
+    EXECUTION_HISTORY_SIZE: int = Field(
+        default=100,
+        description="Max step results kept in a session execution history")
+    QUERY_BUDGET: float = Field(
+        default=120.0,
+        description="Latency budget in seconds of a complex query, 0 disables it")
+    QUERY_BUDGET_SPLIT: dict[str, float] = Field(
+        default_factory=lambda: {"planning": 0.25, "step": 0.4, "answer": 0.3},
+        description="Budget shares of planning, each plan step and the reserved answer")
+    SPECULATIVE_RETRIEVAL: bool = Field(
+        default=True,
+        description="Retrieve on the raw follow-up question while it is condensed")
+    SKIP_CONDENSE: bool = Field(
+        default=True,
+        description="Skip condensing follow-up questions classified as standalone")
+    MEMORY_MAX_TOKENS: int = Field(
+        default=2000,
+        description="Token budget of the conversation window, older turns are summarized")
+    CONVERSATION_STORE: str = Field(
+        default="sqlite",
+        description="Persistent conversation tier: `memory`, `sqlite` or `redis`")
+    CONVERSATION_STORE_PATH: str = Field(
+        default=".conversations.sqlite",
+        description="SQLite file of the sqlite conversation store")
+    CONVERSATION_TTL: float = Field(
+        default=24 * 3600,
+        description="Seconds an idle conversation is kept")
+    CONVERSATION_MAX_SESSIONS: int = Field(
+        default=1000,
+        description="Conversations kept in memory per worker, least recently used are dropped")
     NEO4J_VECTOR_INDEX: str = Field(
         default="vector",
         description="Neo4j vector index name")
@@ -131,6 +260,18 @@ class Config(BaseSettings):
     FOLDER_INGEST_DIR: str = Field(
         default="./src/data/docs", description="Directory for folder ingestion"
     )
+    REDIS_URL: str = Field(
+        default="redis://localhost:6379",
+        description="Redis URL for the redis vector store")
+    REDIS_INDEX_NAME: str = Field(
+        default="redis-index",
+        description="Redis vector index name")
+    REDIS_BATCH_SIZE: int = Field(
+        default=64,
+        description="Documents embedded and written per pipelined Redis batch")
+    EMBEDDING_CACHE_DIR: str = Field(
+        default=".embedding_cache",
+        description="Directory of the shared on-disk embedding cache")
 
     @property
     def PROVIDERS(self) -> dict:
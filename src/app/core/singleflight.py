@@ -0,0 +1,89 @@
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Hashable, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+def normalize(text: str) -> str:
+    """Normalize free text for use in a coalescing key."""
+    return " ".join(text.lower().split())
+
+
+class _Call:
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical calls into one in-flight execution.
+
+    The first caller for a key (the leader) runs the function; callers arriving with
+    the same key while it is running wait for and share its result or exception.
+    Nothing is cached once the call completes. `do` serves threads, `ado` serves
+    coroutines on the running event loop; an async call is cancelled once every caller
+    waiting on it has been cancelled.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.stats = {"leaders": 0, "followers": 0}
+        self._lock = threading.Lock()
+        self._calls: dict[Hashable, _Call] = {}
+        # (loop id, key) -> [task, number of waiting callers]
+        self._tasks: dict[tuple[int, Hashable], list] = {}
+
+    def do(self, key: Hashable, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = _Call()
+                leader = True
+                self.stats["leaders"] += 1
+            else:
+                leader = False
+                self.stats["followers"] += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    async def ado(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        # Tasks are bound to their loop, so keys are scoped per loop.
+        task_key = (id(asyncio.get_running_loop()), key)
+        entry = self._tasks.get(task_key)
+        if entry is None:
+            entry = self._tasks[task_key] = [asyncio.ensure_future(fn()), 0]
+            entry[0].add_done_callback(lambda _: self._tasks.pop(task_key, None))
+            self.stats["leaders"] += 1
+        else:
+            self.stats["followers"] += 1
+
+        task, _ = entry
+        entry[1] += 1
+        try:
+            # Shielded, so one cancelled caller does not cancel the call for the others.
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if entry[1] == 1 and not task.done():
+                # Last waiter gone, nobody needs the result anymore.
+                task.cancel()
+            raise
+        finally:
+            entry[1] -= 1
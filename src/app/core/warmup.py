@@ -0,0 +1,135 @@
+import asyncio
+import time
+from typing import Awaitable, Callable, Optional
+
+import httpx
+from loguru import logger
+
+from app.core.config import config
+
+
+class Readiness:
+    """
+    Tracks the warmup state of the components a worker needs to serve requests.
+
+    Every component is `pending` until its warmup step finished, then `ok` or the
+    error message. The worker is ready once every component is `ok`.
+    """
+
+    def __init__(self) -> None:
+        self.components: dict[str, str] = {}
+        self.durations: dict[str, float] = {}
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.finished_at is not None and all(
+            status == "ok" for status in self.components.values()
+        )
+
+    def report(self) -> dict:
+        return {
+            "ready": self.ready,
+            "components": dict(self.components),
+            "durations": {name: round(d, 3) for name, d in self.durations.items()},
+            "warmup_seconds": round(self.finished_at - self.started_at, 3)
+            if self.started_at and self.finished_at else None,
+        }
+
+    async def run(self, name: str, step: Callable[[], Awaitable[None]]) -> None:
+        self.components[name] = "pending"
+        started = time.perf_counter()
+        try:
+            await step()
+            self.components[name] = "ok"
+        except Exception as e:
+            logger.error(f"Warmup of {name} failed: {e!r}")
+            self.components[name] = f"error: {e}"
+        self.durations[name] = time.perf_counter() - started
+
+
+readiness = Readiness()
+
+
+def ollama_models() -> tuple[list[str], list[str]]:
+    """Return the configured Ollama chat models and embedding models."""
+    routes = [f"{config.LLM_API_PROVIDER}:{config.LLM_MODEL_ID}", *config.LLM_FALLBACKS]
+    chat = [
+        model for provider, model in (route.split(":", 1) for route in routes)
+        if provider == "ollama"
+    ]
+    return list(dict.fromkeys(chat)), [config.EMB_MODEL_ID]
+
+
+async def keep_alive(client: httpx.AsyncClient) -> None:
+    """
+    Load every configured Ollama model into memory and keep it there.
+
+    Chat models get an empty generate request, which only loads the model, and
+    embedding models a one word embed request, both with `config.OLLAMA_KEEP_ALIVE`.
+    """
+    chat, embedding = ollama_models()
+    requests = [
+        client.post("/api/generate", json={
+            "model": model, "prompt": "", "keep_alive": config.OLLAMA_KEEP_ALIVE})
+        for model in chat
+    ] + [
+        client.post("/api/embed", json={
+            "model": model, "input": "warmup", "keep_alive": config.OLLAMA_KEEP_ALIVE})
+        for model in embedding
+    ]
+    for response in await asyncio.gather(*requests):
+        response.raise_for_status()
+
+
+async def keep_alive_loop(client: httpx.AsyncClient, interval: float) -> None:
+    """Re-send the keep-alive requests every `interval` seconds."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await keep_alive(client)
+        except httpx.HTTPError as e:
+            logger.warning(f"Ollama keep-alive failed: {e!r}")
+
+
+def _warm_store() -> None:
+    from app.util.retrievers import hybrid_retriever
+    from data.store import get_default_store
+
+    store = get_default_store()
+    store.graph.query("RETURN 1")
+    store.ensure_indexes()
+    # Opens the retriever's driver and checks the vector/keyword indexes exist.
+    hybrid_retriever()
+
+
+def _warm_chains() -> None:
+    from app.util.shared import get_shared_chains
+
+    get_shared_chains()
+
+
+async def warmup(client: httpx.AsyncClient, retry_interval: float = 0.0) -> None:
+    """
+    Warm the store, the Ollama models and the chains concurrently.
+
+    Progress is recorded in `readiness`, which backs the readiness endpoint. Failed
+    components are retried every `retry_interval` seconds until they are warm, so a
+    worker started before its dependencies becomes ready once they come up.
+    """
+    steps: dict[str, Callable[[], Awaitable[None]]] = {
+        "store": lambda: asyncio.to_thread(_warm_store),
+        "ollama": lambda: keep_alive(client),
+        "chains": lambda: asyncio.to_thread(_warm_chains),
+    }
+    readiness.started_at = time.time()
+    while True:
+        await asyncio.gather(*(readiness.run(name, step) for name, step in steps.items()))
+        readiness.finished_at = time.time()
+        logger.info(f"Warmup finished :: {readiness.report()}")
+        steps = {name: step for name, step in steps.items()
+                 if readiness.components[name] != "ok"}
+        if not steps or retry_interval <= 0:
+            return
+        await asyncio.sleep(retry_interval)
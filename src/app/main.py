@@ -1,11 +1,15 @@
+import asyncio
+import time
 from contextlib import asynccontextmanager
 from pathlib import Path
 
+import httpx
 from chainlit.utils import mount_chainlit
 from fastapi import FastAPI
 from starlette.middleware.cors import CORSMiddleware
 
 from app.api.routes import api_router as api_router
+from app.core import warmup
 from app.core.config import config
 
 
@@ -13,8 +17,23 @@ from app.core.config import config
 async def lifespan(app: FastAPI):
     # Startup
     print("startup fastapi")
+    tasks: list[asyncio.Task] = []
+    ollama = httpx.AsyncClient(base_url=config.OLLAMA_API_BASE, timeout=config.LLM_TIMEOUT)
+    if config.WARMUP_ENABLED:
+        # Warm in the background, the readiness endpoint reports when it is done.
+        tasks.append(asyncio.create_task(
+            warmup.warmup(ollama, config.WARMUP_RETRY_INTERVAL)))
+        if config.OLLAMA_KEEP_ALIVE_INTERVAL > 0:
+            tasks.append(asyncio.create_task(
+                warmup.keep_alive_loop(ollama, config.OLLAMA_KEEP_ALIVE_INTERVAL)))
+    else:
+        warmup.readiness.started_at = warmup.readiness.finished_at = time.time()
     yield
     # shutdown
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    await ollama.aclose()
     print("shutdown fastapi")
 
 
@@ -1,20 +1,74 @@
 import asyncio
-from typing import Dict, List
+import json
+import time
+from collections import OrderedDict, deque
+from typing import AsyncIterator, Awaitable, Callable, Dict, Hashable, List, Optional, Union
 
+from langchain_core.messages import AIMessageChunk
 from langchain_core.runnables import Runnable
+from loguru import logger
 
-from app.util.chains import ConversationState, get_ner_chain
-from app.util.llm import get_llm_instance
+from app.core.config import config
+from app.core.singleflight import SingleFlight, normalize
+from app.util.budget import QueryBudget, record_latency, record_usage
+from app.util.chains import ConversationState, get_default_ner_chain
+from app.util.llm import ainvoke_with_deadline, astream_with_deadline, get_llm_instance
+from app.util.paths import find_paths
 from app.util.planner import (
+    ExecutionContext,
     ExecutionPlan,
     ExecutionStep,
     FinalResult,
+    PlanError,
     QueryPlanner,
+    StepEvent,
     StepResult,
 )
 from app.util.retrievers import structured_retriever
-from app.util.tools import graph_query_tool
+from app.util.serializer import SerializedResults, serialize_results
 from app.util.validators import ResponseValidator
+from data.store import get_default_store
+
+
+class StepMemo:
+    """
+    Bounded LRU of the data of successful steps, keyed by step invocation.
+
+    Identical invocations in flight at the same time share one execution, and
+    completed ones are reused until evicted by the `max_entries` most recent.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._data: OrderedDict[Hashable, Dict] = OrderedDict()
+        self._flight = SingleFlight("steps")
+        self.stats = {"hits": 0, "misses": 0}
+
+    async def run(self, key: Hashable, fn: Callable[[], Awaitable[Dict]]) -> Dict:
+        if key in self._data:
+            self._data.move_to_end(key)
+            self.stats["hits"] += 1
+            logger.info(f"Reusing step result :: {key}")
+            return self._data[key]
+
+        self.stats["misses"] += 1
+        data = await self._flight.ado(key, fn)
+        if self.max_entries > 0 and self.reusable(data):
+            self._data[key] = data
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+        return data
+
+    @staticmethod
+    def reusable(data: Dict) -> bool:
+        """
+        Return whether a step result may be reused.
+
+        Retrievers turn lookup failures into empty results, which are not kept so a
+        transient failure is retried by the next identical step.
+        """
+        return not data.get("error") and bool(data.get("result"))
 
 
 class AgenticGraphRAG:
@@ -26,37 +80,173 @@ class AgenticGraphRAG:
         planner: QueryPlanner,
         validator: ResponseValidator,
         memory: ConversationState,
+        llm_timeout: Optional[float] = None,
+        max_concurrency: Optional[int] = None,
     ):
         self.base_rag_chain = base_rag_chain
         self.planner = planner
         self.validator = validator
         self.memory = memory
-        self.execution_history = []
+        self.llm_timeout = llm_timeout
+        self.max_concurrency = max_concurrency or config.PLAN_MAX_CONCURRENCY
+        # Session level record of step results, capped so long sessions stay bounded.
+        # Steps only see the results of their own query, see `ExecutionContext`.
+        self.execution_history: deque[StepResult] = deque(maxlen=config.EXECUTION_HISTORY_SIZE)
+        self.step_memo = StepMemo(config.STEP_MEMO_SIZE)
 
-    async def create_execution_plan(
+    def stream_execution_plan(
         self, query: str, complexity_analysis: Dict
-    ) -> ExecutionPlan:
-        """Create execution plan for the query."""
-        return await self.planner.create_execution_plan(query, complexity_analysis)
+    ) -> AsyncIterator[Union[ExecutionStep, ExecutionPlan]]:
+        """Stream the steps of the execution plan as they are planned."""
+        return self.planner.stream_execution_plan(query, complexity_analysis)
+
+    async def execute_streamed_plan(
+        self,
+        planned: AsyncIterator[Union[ExecutionStep, ExecutionPlan]],
+        original_query: str,
+        budget: Optional[QueryBudget] = None,
+    ) -> AsyncIterator[StepEvent]:
+        """
+        Execute a plan while it is being planned, see `stream_execution_plan`.
+
+        Each step is dispatched as soon as it and its dependencies are planned and
+        its dependencies finished, successfully or not, so the first steps run while
+        the planner still generates the next ones and independent steps run
+        concurrently. Synthesis steps without declared dependencies wait for the
+        complete plan. At most `max_concurrency` steps run at the same time. With a
+        budget, planning gets the planning share of it and every step the step share,
+        and steps that would start once the budget left for steps is spent are
+        cancelled instead. The plan is validated once complete.
+
+        Args:
+            planned: The steps of the plan as they are planned, then the complete plan
+            original_query: The user query the plan answers
+            budget: The latency budget of the query
+
+        Yields:
+            A `planned` event for every step as it arrives and a `plan` event carrying
+            the complete plan. A `started` event when a step starts and a `finished`
+            event carrying its result when it completes, in completion order. Steps
+            cancelled by the budget yield a `cancelled` event carrying a failed result.
+
+        Raises:
+            PlanError: If the complete plan has cycles or unknown dependencies
+        """
+        async for event in self._schedule(planned, original_query, budget):
+            yield event
+
+    async def _schedule(
+        self,
+        planned: AsyncIterator[Union[ExecutionStep, ExecutionPlan]],
+        original_query: str,
+        budget: Optional[QueryBudget],
+    ) -> AsyncIterator[StepEvent]:
+        context = ExecutionContext(original_query)
+        steps: Dict[str, ExecutionStep] = {}
+        # Dependencies of every planned step, None until known
+        dependencies: Dict[str, Optional[List[str]]] = {}
+        started: set = set()
+        finished: set = set()
+        plan: Optional[ExecutionPlan] = None
+
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        events: asyncio.Queue = asyncio.Queue()
+        tasks: List[asyncio.Task] = []
+
+        async def run(step: ExecutionStep) -> None:
+            async with semaphore:
+                timeout = budget.timeout("step") if budget else None
+                if timeout is not None and timeout <= 0:
+                    result = self._cancelled_result(step, "query budget spent")
+                    await events.put(StepEvent(step=step, status="cancelled", result=result))
+                    return
+                await events.put(StepEvent(step=step, status="started"))
+                try:
+                    result = await self.execute_step(step, original_query, timeout, context)
+                except Exception as e:
+                    # Always report the step, or its dependents would wait forever.
+                    result = self._cancelled_result(step, f"failed: {e!r}")
+            await events.put(StepEvent(step=step, status="finished", result=result))
+
+        async def read_plan() -> None:
+            timeout = budget.timeout("planning") if budget else None
+            start_time = asyncio.get_event_loop().time()
+            try:
+                async with asyncio.timeout(timeout):
+                    async for item in planned:
+                        if isinstance(item, ExecutionPlan):
+                            elapsed = asyncio.get_event_loop().time() - start_time
+                            record_usage("planning", elapsed, timeout, False)
+                            await events.put(StepEvent(step=None, status="plan", plan=item))
+                        else:
+                            await events.put(StepEvent(step=item, status="planned"))
+            except Exception as e:
+                if isinstance(e, TimeoutError):
+                    elapsed = asyncio.get_event_loop().time() - start_time
+                    record_usage("planning", elapsed, timeout, True)
+                await events.put(e)
+
+        def start_ready() -> None:
+            for step_id, step in steps.items():
+                deps = dependencies[step_id]
+                if step_id not in started and deps is not None and finished.issuperset(deps):
+                    started.add(step_id)
+                    tasks.append(asyncio.create_task(run(step)))
+
+        tasks.append(asyncio.create_task(read_plan()))
+        try:
+            while plan is None or len(finished) < len(steps):
+                event = await events.get()
+                if isinstance(event, Exception):
+                    raise event
+                if event.status == "planned":
+                    if event.step.step_id in steps:
+                        raise PlanError(f"Duplicate step ids: ['{event.step.step_id}']")
+                    steps[event.step.step_id] = event.step
+                    implicit = not event.step.dependencies and event.step.query_type == "synthesis"
+                    dependencies[event.step.step_id] = (
+                        None if implicit else list(event.step.dependencies))
+                elif event.status == "plan":
+                    plan = event.plan
+                    # The complete plan is authoritative, and validated.
+                    dependencies.update(plan.dependencies())
+                    steps.update({s.step_id: s for s in plan.steps if s.step_id not in steps})
+                elif event.status != "started":
+                    finished.add(event.step.step_id)
+                start_ready()
+                yield event
+        finally:
+            for task in tasks:
+                task.cancel()
 
     async def execute_step(
-        self, step: ExecutionStep, original_query: str
+        self,
+        step: ExecutionStep,
+        original_query: str,
+        timeout: Optional[float] = None,
+        context: Optional[ExecutionContext] = None,
     ) -> StepResult:
-        """Execute a single step in the plan."""
+        """
+        Execute a single step in the plan, cancelling it after `timeout` seconds.
+
+        Retrieval steps are memoized per session, so an identical invocation, in the
+        same plan or a later one, reuses the result. The result is recorded in the
+        execution context of the query, which synthesis steps read from.
+        """
 
+        context = context or ExecutionContext(original_query)
         start_time = asyncio.get_event_loop().time()
+        timed_out = False
+
+        key = self._memo_key(step, original_query)
+        if key is None:
+            execution = self._dispatch_step(step, original_query, context)
+        else:
+            execution = self.step_memo.run(
+                key, lambda: self._dispatch_step(step, original_query, context))
 
         try:
-            if step.query_type == "entity_search":
-                result_data = await self._execute_entity_search(step, original_query)
-            elif step.query_type == "relationship_traverse":
-                result_data = await self._execute_relationship_traverse(
-                    step, original_query
-                )
-            elif step.query_type == "synthesis":
-                result_data = await self._execute_synthesis(step, original_query)
-            else:
-                raise ValueError(f"Unknown query type: {step.query_type}")
+            result_data = await asyncio.wait_for(execution, timeout)
 
             execution_time = asyncio.get_event_loop().time() - start_time
 
@@ -70,6 +260,12 @@ class AgenticGraphRAG:
                 execution_time=execution_time,
             )
 
+        except TimeoutError:
+            timed_out = True
+            execution_time = asyncio.get_event_loop().time() - start_time
+            result = self._cancelled_result(step, f"timed out after {timeout:.1f}s")
+            result.execution_time = execution_time
+
         except Exception as e:
             execution_time = asyncio.get_event_loop().time() - start_time
             result = StepResult(
@@ -82,44 +278,119 @@ class AgenticGraphRAG:
                 execution_time=execution_time,
             )
 
+        record_usage(step.query_type, execution_time, timeout, timed_out)
+        context.results[step.step_id] = result
         self.execution_history.append(result)
         return result
 
-    async def _execute_entity_search(self, step: ExecutionStep, query: str) -> Dict:
-        """Execute entity search using structured retriever."""
-        result = await asyncio.to_thread(structured_retriever, query)
-        return {"result": result}
+    @staticmethod
+    def _memo_key(step: ExecutionStep, original_query: str) -> Optional[Hashable]:
+        """
+        Return the key identifying a step invocation, None if it must always run.
+
+        Keys include the store generation, so results are not reused across ingestions.
+        """
+        if step.query_type == "synthesis":
+            # Depends on the results of the query, never reused.
+            return None
+        generation = get_default_store().generation
+        entities = step.parameters.get("entities")
+        if step.query_type == "entity_search" and entities:
+            # Searches on explicit entities do not depend on the query wording.
+            entity_key = tuple(sorted(normalize(str(e)) for e in entities))
+            return step.query_type, entity_key, generation
+        parameters = json.dumps(step.parameters, sort_keys=True, default=str)
+        return step.query_type, normalize(original_query), parameters, generation
+
+    async def _dispatch_step(
+        self, step: ExecutionStep, original_query: str, context: ExecutionContext
+    ) -> Dict:
+        if step.query_type == "entity_search":
+            return await self._execute_entity_search(step, original_query)
+        if step.query_type == "relationship_traverse":
+            return await self._execute_relationship_traverse(step, original_query)
+        if step.query_type == "synthesis":
+            return await self._execute_synthesis(step, original_query, context)
+        raise ValueError(f"Unknown query type: {step.query_type}")
 
-    async def _execute_relationship_traverse(self, query: str) -> Dict:
-        """Execute relationship traversal in knowledge graph."""
-        entities = await asyncio.to_thread(get_ner_chain().invoke, {"input": query})
-        if len(entities.names) < 2:
-            return {"result": "Not enough entities to find a path"}
+    @staticmethod
+    def _cancelled_result(step: ExecutionStep, reason: str) -> StepResult:
+        return StepResult(
+            step_id=step.step_id,
+            success=False,
+            data={"error": reason},
+            confidence=0,
+            summary=f"Cancelled {step.description}: {reason}",
+            sources=[],
+            execution_time=0.0,
+        )
 
-        query = f"""MATCH p=allShortestPaths((a)-[*..5]-(b))
-WHERE a.id = '{entities.names[0]}' AND b.id = '{entities.names[1]}'
-RETURN p"""
-        result = graph_query_tool(query)
+    async def _execute_entity_search(self, step: ExecutionStep, query: str) -> Dict:
+        """Execute entity search using structured retriever, on the step entities if any."""
+        entities = step.parameters.get("entities") or None
+        result = await asyncio.to_thread(structured_retriever, query, entities)
         return {"result": result}
 
-    async def _execute_synthesis(self, step: ExecutionStep, query: str) -> Dict:
-        """Synthesize results from previous steps."""
-        llm = get_llm_instance()
-        previous_results = [r.data for r in self.execution_history if r.success]
+    async def _execute_relationship_traverse(self, step: ExecutionStep, query: str) -> Dict:
+        """Find the relationship paths between the step entities, or the query entities."""
+        entities = step.parameters.get("entities") or []
+        if len(entities) < 2:
+            extracted = await ainvoke_with_deadline(
+                get_default_ner_chain(), {"input": query}, self.llm_timeout
+            )
+            entities = extracted.names
+        return await find_paths(entities, max_hops=step.parameters.get("max_hops"))
+
+    async def _execute_synthesis(
+        self, step: ExecutionStep, query: str, context: ExecutionContext
+    ) -> Dict:
+        """Synthesize the results of the steps this one depends on, for this query only."""
+        llm = get_llm_instance(chain="synthesis")
+        previous_results = self._serialize(
+            context.dependency_results(step), f"step {step.step_id} of {query!r}")
         prompt = f"""Synthesize the following results:
-{previous_results}
+{previous_results.text}
 
 into a coherent answer for the query: {query}"""
-        synthesis = await asyncio.to_thread(llm.invoke, prompt)
+        synthesis = await ainvoke_with_deadline(llm, prompt, self.llm_timeout)
         return {"synthesis": synthesis}
 
-    async def synthesize_results(
-        self, results: List[StepResult], original_query: str
-    ) -> FinalResult:
-        """Create final synthesized response."""
+    @staticmethod
+    def _serialize(results: List[StepResult], label: str) -> SerializedResults:
+        """Serialize step results compactly for a prompt, logging the size saved."""
+        serialized = serialize_results(results)
+        logger.info(
+            f"Synthesis prompt of {label} :: {serialized.raw_tokens} -> {serialized.tokens} "
+            f"tokens ({serialized.reduction:.0%} smaller), {serialized.duplicate_lines} "
+            f"duplicate and {serialized.truncated_lines} truncated lines"
+        )
+        return serialized
 
-        llm = get_llm_instance()
+    async def stream_synthesis(
+        self,
+        results: List[StepResult],
+        original_query: str,
+        budget: Optional[QueryBudget] = None,
+        started: Optional[float] = None,
+    ) -> AsyncIterator[Union[str, FinalResult]]:
+        """
+        Stream the final synthesized response.
+
+        Yields the answer tokens as they are generated, then the `FinalResult`. Failed
+        or cancelled steps are left out, and the answer is then marked as partial in
+        its limitations. The time to the first token and the total time are recorded
+        as `complex` query latencies.
+
+        Args:
+            results: Results of the plan steps
+            original_query: The user query
+            budget: Latency budget of the query, synthesis gets what is left of it
+            started: `time.monotonic()` when the query started, latencies are measured
+                from the start of synthesis otherwise
+        """
+        llm = get_llm_instance(chain="synthesis")
         successful_results = [r for r in results if r.success]
+        incomplete = [r.step_id for r in results if not r.success]
         all_sources = list(
             set([source for r in successful_results for source in r.sources])
         )
@@ -129,10 +400,39 @@ into a coherent answer for the query: {query}"""
         Query: {original_query}
 
         Analysis:
-        {[r.data for r in successful_results]}
+        {self._serialize(successful_results, repr(original_query)).text}
+        """
+        if incomplete:
+            prompt += """
+        Some analysis steps did not complete, answer with what the analysis covers
+        and say what remains uncertain.
         """
 
-        synthesized_answer = await asyncio.to_thread(llm.invoke, prompt)
+        timeout = budget.timeout("answer") if budget else self.llm_timeout
+        start_time = time.monotonic()
+        started = start_time if started is None else started
+        first_token: Optional[float] = None
+        synthesized_answer = AIMessageChunk(content="")
+        timed_out = False
+        try:
+            async for chunk in astream_with_deadline(llm, prompt, timeout):
+                synthesized_answer += chunk
+                if chunk.content:
+                    if first_token is None:
+                        first_token = time.monotonic() - started
+                    yield str(chunk.content)
+        except TimeoutError:
+            timed_out = True
+            raise
+        finally:
+            now = time.monotonic()
+            record_usage("answer", now - start_time, timeout, timed_out)
+            record_latency("complex", first_token, now - started)
+        logger.info(
+            f"Synthesized answer of {original_query!r} :: first token after "
+            f"{'-' if first_token is None else f'{first_token:.2f}'}s, "
+            f"done after {now - started:.2f}s"
+        )
 
         # Calculate overall confidence
         avg_confidence = (
@@ -141,9 +441,14 @@ into a coherent answer for the query: {query}"""
             else 0
         )
 
-        return FinalResult(
+        yield FinalResult(
             answer=synthesized_answer,
             confidence=avg_confidence,
             sources=all_sources,
+            limitations=(
+                f"Partial answer: {len(incomplete)} of {len(results)} analysis steps "
+                f"did not complete ({', '.join(incomplete)})."
+                if incomplete else None
+            ),
             reasoning_chain=[r.summary for r in successful_results],
         )
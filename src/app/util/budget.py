@@ -0,0 +1,98 @@
+import threading
+import time
+from typing import Any, Callable, Optional
+
+from app.core.config import config
+
+budget_stats: dict[str, dict[str, float]] = {}
+latency_stats: dict[str, dict[str, float]] = {}
+_stats_lock = threading.Lock()
+
+
+class QueryBudget:
+    """
+    Latency budget of one complex query, split between its phases.
+
+    Planning may use the `planning` share of the budget and every plan step the
+    `step` share. The `answer` share is reserved for the final synthesis, so plan
+    steps are cut off early enough to answer with the results that finished.
+    """
+
+    def __init__(
+        self,
+        seconds: float,
+        split: Optional[dict[str, float]] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.seconds = seconds
+        self.split = split or config.QUERY_BUDGET_SPLIT
+        self.clock = clock
+        self.deadline = clock() + seconds
+
+    def remaining(self) -> float:
+        return max(self.deadline - self.clock(), 0.0)
+
+    def timeout(self, phase: str) -> float:
+        """
+        Return the seconds a phase may use from now on.
+
+        Args:
+            phase: `planning`, `step` or `answer`
+
+        Returns:
+            The phase share of the budget, capped by what is left of the budget once
+            the answer reserve is set aside. The answer gets all that remains.
+        """
+        if phase == "answer":
+            return self.remaining()
+        reserve = 0.0 if phase == "planning" else self.seconds * self.split["answer"]
+        return max(min(self.seconds * self.split[phase], self.remaining() - reserve), 0.0)
+
+
+def record_usage(kind: str, elapsed: float, allotted: Optional[float], timed_out: bool) -> None:
+    """Record the time a step kind used out of the time it was allotted."""
+    with _stats_lock:
+        stats = budget_stats.setdefault(
+            kind, {"count": 0, "seconds": 0.0, "allotted": 0.0, "timeouts": 0}
+        )
+        stats["count"] += 1
+        stats["seconds"] += elapsed
+        stats["allotted"] += allotted or 0.0
+        stats["timeouts"] += int(timed_out)
+
+
+def budget_report() -> dict[str, dict[str, Any]]:
+    """Return the budget usage per step kind, with the share of allotted time used."""
+    with _stats_lock:
+        stats = {kind: dict(usage) for kind, usage in budget_stats.items()}
+    for usage in stats.values():
+        usage["used_share"] = usage["seconds"] / usage["allotted"] if usage["allotted"] else None
+    return stats
+
+
+def record_latency(kind: str, first_token: Optional[float], total: float) -> None:
+    """Record the time to first answer token and the total time of a query."""
+    with _stats_lock:
+        stats = latency_stats.setdefault(
+            kind, {"count": 0, "first_tokens": 0, "first_token_seconds": 0.0,
+                   "max_first_token_seconds": 0.0, "total_seconds": 0.0}
+        )
+        stats["count"] += 1
+        stats["total_seconds"] += total
+        if first_token is not None:
+            stats["first_tokens"] += 1
+            stats["first_token_seconds"] += first_token
+            stats["max_first_token_seconds"] = max(stats["max_first_token_seconds"], first_token)
+
+
+def latency_report() -> dict[str, dict[str, Any]]:
+    """Return the average time to first token and total time per query kind."""
+    with _stats_lock:
+        stats = {kind: dict(latency) for kind, latency in latency_stats.items()}
+    for latency in stats.values():
+        latency["average_first_token_seconds"] = (
+            latency["first_token_seconds"] / latency["first_tokens"]
+            if latency["first_tokens"] else None
+        )
+        latency["average_total_seconds"] = latency["total_seconds"] / latency["count"]
+    return stats
@@ -1,8 +1,18 @@
+import asyncio
+import functools
 import uuid
+from collections import deque
 from operator import itemgetter
-from typing import Any, Dict, List, Optional, Tuple
-
-from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from langchain_core.messages import (
+    AIMessage,
+    BaseMessage,
+    HumanMessage,
+    SystemMessage,
+    messages_from_dict,
+    messages_to_dict,
+)
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.runnables import (
     Runnable,
@@ -10,58 +20,178 @@ from langchain_core.runnables import (
     RunnableParallel,
     RunnablePassthrough,
 )
-from langgraph.checkpoint.memory import MemorySaver
 from loguru import logger
 
 from app.core.config import LLMSettings, config
 
 
+def count_tokens(text: str) -> int:
+    """Estimate the token count of a text, roughly four characters per token."""
+    return len(text) // 4 + 1
+
+
+def _render(message: BaseMessage) -> str:
+    if isinstance(message, HumanMessage):
+        return f"Human: {message.content}"
+    if isinstance(message, AIMessage):
+        return f"AI: {message.content}"
+    return ""
+
+
 # NEW: Modern conversation state replacing ConversationBufferMemory
 class ConversationState:
-    """Modern replacement for ConversationBufferMemory using LangGraph."""
+    """
+    Conversation history with a token-bounded window and a rolling summary.
 
-    def __init__(self, session_id: Optional[str] = None):
+    Messages are rendered once when added and appended to a string buffer, so loading
+    the history does not re-render it. Once the window exceeds `max_tokens`, the
+    oldest messages are evicted; with a `summarizer` (the summary chain) they are
+    folded into a rolling summary by a background task, off the request path.
+    """
+
+    def __init__(
+        self,
+        session_id: Optional[str] = None,
+        max_tokens: Optional[int] = None,
+        summarizer: Optional[Runnable] = None,
+    ):
         self.session_id = session_id or str(uuid.uuid4())
-        self._messages: List[BaseMessage] = []
-        self.memory_saver = MemorySaver()
+        self.max_tokens = config.MEMORY_MAX_TOKENS if max_tokens is None else max_tokens
+        self.summarizer = summarizer
+        self.summary = ""
+        self._messages: Deque[BaseMessage] = deque()
+        self._lines: Deque[str] = deque()
+        self._tokens: Deque[int] = deque()
+        self._total_tokens = 0
+        self._buffer = ""
+        self._evicted: List[BaseMessage] = []
+        self._compaction: Optional[asyncio.Task] = None
+        # Called after every change, used by the conversation store to persist.
+        self.on_change: Optional[Callable[["ConversationState"], None]] = None
         self.memory_key = "history"  # Default key for compatibility
         self.input_key = "human"
         self.output_key = "ai"
         self.return_messages = False
 
+    @property
+    def total_tokens(self) -> int:
+        """Estimated tokens of the messages in the window."""
+        return self._total_tokens
+
     def add_message(self, message: BaseMessage):
         """Add a message to conversation history."""
+        self._append(message)
+        self._changed()
+
+    def _changed(self) -> None:
+        if self.on_change is not None:
+            self.on_change(self)
+
+    def _append(self, message: BaseMessage) -> None:
+        line = _render(message)
+        if line:
+            self._buffer = f"{self._buffer}\n{line}" if self._buffer else line
+        tokens = count_tokens(str(message.content))
         self._messages.append(message)
+        self._lines.append(line)
+        self._tokens.append(tokens)
+        self._total_tokens += tokens
+        self._trim()
+
+    def _trim(self) -> None:
+        # Always keep the latest message, even if it alone exceeds the budget.
+        while self._total_tokens > self.max_tokens and len(self._messages) > 1:
+            message = self._messages.popleft()
+            line = self._lines.popleft()
+            self._total_tokens -= self._tokens.popleft()
+            if line:
+                self._buffer = self._buffer[len(line) + 1:]
+            self._evicted.append(message)
+        if self._evicted and self.summarizer is not None:
+            self._schedule_compaction()
+
+    def _schedule_compaction(self) -> None:
+        if self._compaction is not None and not self._compaction.done():
+            return  # The running compaction picks up the newly evicted messages.
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # No event loop, `compact` can be awaited explicitly.
+        self._compaction = loop.create_task(self.compact())
+
+    async def compact(self) -> None:
+        """Fold the evicted messages into the rolling summary."""
+        while self._evicted and self.summarizer is not None:
+            evicted, self._evicted = self._evicted, []
+            text = "\n".join(line for line in map(_render, evicted) if line)
+            if self.summary:
+                text = f"{self.summary}\n{text}"
+            try:
+                result = await self.summarizer.ainvoke({"question": text})
+            except Exception as e:
+                logger.warning(f"Conversation summary failed: {e!r}")
+                self._evicted = evicted + self._evicted
+                return
+            self.summary = str(getattr(result, "content", result)).strip()
+            self._changed()
 
     def get_messages(self) -> List[BaseMessage]:
-        """Get all messages in conversation."""
-        return self._messages.copy()
+        """Get the messages in the window, preceded by the rolling summary if any."""
+        messages = list(self._messages)
+        if self.summary:
+            messages.insert(
+                0, SystemMessage(content=f"Summary of the earlier conversation: {self.summary}"))
+        return messages
 
     def save_context(self, inputs: Dict[str, str], outputs: Dict[str, str]):
         """Save context (maintains API compatibility with ConversationBufferMemory)."""
         if self.input_key in inputs:
-            self.add_message(HumanMessage(content=inputs[self.input_key]))
+            self._append(HumanMessage(content=inputs[self.input_key]))
         if self.output_key in outputs:
-            self.add_message(AIMessage(content=outputs[self.output_key]))
+            self._append(AIMessage(content=outputs[self.output_key]))
+        self._changed()
 
     def load_memory_variables(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
         """Load memory variables (maintains API compatibility)."""
         if self.return_messages:
-            return {self.memory_key: self._messages}
-        else:
-            # Convert messages to string format like the old
-            # ConversationBufferMemory
-            history_str = ""
-            for message in self._messages:
-                if isinstance(message, HumanMessage):
-                    history_str += f"Human: {message.content}\n"
-                elif isinstance(message, AIMessage):
-                    history_str += f"AI: {message.content}\n"
-            return {self.memory_key: history_str.strip()}
+            return {self.memory_key: self.get_messages()}
+        if self.summary:
+            return {self.memory_key: f"Summary: {self.summary}\n{self._buffer}".strip()}
+        return {self.memory_key: self._buffer.strip()}
 
     def clear(self):
         """Clear conversation history."""
-        self._messages = []
+        if self._compaction is not None:
+            self._compaction.cancel()
+        self._messages.clear()
+        self._lines.clear()
+        self._tokens.clear()
+        self._total_tokens = 0
+        self._buffer = ""
+        self._evicted = []
+        self.summary = ""
+        self._changed()
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize the window, the summary and the messages awaiting compaction."""
+        return {
+            "session_id": self.session_id,
+            "summary": self.summary,
+            "messages": messages_to_dict(list(self._messages)),
+            "evicted": messages_to_dict(self._evicted),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], **kwargs: Any) -> "ConversationState":
+        """Restore a conversation serialized with `to_dict`."""
+        state = cls(session_id=data["session_id"], **kwargs)
+        state.summary = data.get("summary", "")
+        for message in messages_from_dict(data.get("messages", [])):
+            state._append(message)
+        state._evicted = messages_from_dict(data.get("evicted", [])) + state._evicted
+        if state._evicted and state.summarizer is not None:
+            state._schedule_compaction()
+        return state
 
     @property
     def chat_memory(self):
@@ -71,7 +201,7 @@ class ConversationState:
     @property
     def messages(self) -> List[BaseMessage]:
         """Compatibility property."""
-        return self._messages
+        return list(self._messages)
 
 
 def get_memory() -> Tuple[ConversationState, Runnable]:
@@ -106,26 +236,33 @@ def get_ner_chain(llm_settings: Optional[LLMSettings] = None) -> Runnable:
     logger.info(f"settings :: {settings}")
 
     if settings.provider == "ollama":
-        llm = get_ollama_instance(settings)
+        llm = get_ollama_instance(settings, chain="ner")
     else:
-        llm = get_llm_instance(settings)
+        llm = get_llm_instance(settings, chain="ner")
 
     return prompts.entities.messages | llm.bind_tools(
         tools=[prompts.entities.Entities])
 
 
+@functools.lru_cache(maxsize=1)
+def get_default_ner_chain() -> Runnable:
+    """Return the NER chain for the default settings, built once per process."""
+    return get_ner_chain()
+
+
 def get_rag_chain(llm_settings: Optional[LLMSettings] = None) -> Runnable:
-    from app.util import get_llm_instance, prompts, retrievers
+    from app.util import get_llm_instance, prompts
+    from app.util.speculation import get_context_retriever
 
     return (
         RunnableParallel(
             {
-                "context": prompts.rag._search_query | retrievers.super_retriever,
+                "context": get_context_retriever(config.SPECULATIVE_RETRIEVAL),
                 "question": RunnablePassthrough(),
             }
         )
         | prompts.rag.messages
-        | get_llm_instance(llm_settings)
+        | get_llm_instance(llm_settings, chain="rag")
         | StrOutputParser()
     )
 
@@ -133,7 +270,7 @@ def get_rag_chain(llm_settings: Optional[LLMSettings] = None) -> Runnable:
 def get_summary_chain(llm_settings: Optional[LLMSettings] = None) -> Runnable:
     from app.util import get_llm_instance, prompts
 
-    llm = get_llm_instance(llm_settings)
+    llm = get_llm_instance(llm_settings, chain="summary")
     return prompts.summary.messages | llm
 
 
@@ -143,9 +280,9 @@ def get_condense_chain(llm_settings: Optional[LLMSettings] = None) -> Runnable:
     settings = llm_settings or config.LLM_SETTINGS
 
     if settings.provider == "ollama":
-        llm = get_ollama_instance(settings)
+        llm = get_ollama_instance(settings, chain="condense")
     else:
-        llm = get_llm_instance(settings)
+        llm = get_llm_instance(settings, chain="condense")
 
     # Use the updated memory function
     _, memory_loader = get_memory()
@@ -0,0 +1,341 @@
+import asyncio
+import functools
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Optional
+
+from langchain_core.runnables import Runnable
+from loguru import logger
+
+from app.core.config import config
+from app.util.chains import ConversationState
+
+
+class ConversationStore(ABC):
+    """Persistent tier of the conversation manager, keyed by session id."""
+
+    @abstractmethod
+    def load(self, session_id: str) -> Optional[dict[str, Any]]:
+        """Return the serialized conversation, None if unknown or expired."""
+
+    @abstractmethod
+    def save(self, session_id: str, data: dict[str, Any]) -> None:
+        """Store the serialized conversation and refresh its TTL."""
+
+    @abstractmethod
+    def delete(self, session_id: str) -> None:
+        """Remove the conversation."""
+
+    def purge(self) -> int:
+        """Remove expired conversations, returning how many were removed."""
+        return 0
+
+    def revision(self, session_id: str) -> Optional[str]:
+        """Return the revision of the stored conversation, None if unknown or expired."""
+        data = self.load(session_id)
+        return data.get("revision") if data else None
+
+
+class NullConversationStore(ConversationStore):
+    """No persistent tier, conversations only live in the in-memory LRU."""
+
+    def load(self, session_id: str) -> Optional[dict[str, Any]]:
+        return None
+
+    def save(self, session_id: str, data: dict[str, Any]) -> None:
+        pass
+
+    def delete(self, session_id: str) -> None:
+        pass
+
+
+class SQLiteConversationStore(ConversationStore):
+    """
+    Conversations persisted as JSON rows in a SQLite file.
+
+    Shared by all workers on the host. Rows idle for longer than `ttl` seconds are
+    ignored on load and removed by `purge`.
+    """
+
+    def __init__(self, path: str | Path, ttl: float):
+        self.path = Path(path)
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        # WAL lets several worker processes read while one writes.
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS conversations (
+                session_id TEXT PRIMARY KEY,
+                data TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+
+    def load(self, session_id: str) -> Optional[dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM conversations WHERE session_id = ? AND updated_at >= ?",
+                (session_id, time.time() - self.ttl),
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def revision(self, session_id: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT json_extract(data, '$.revision') FROM conversations "
+                "WHERE session_id = ? AND updated_at >= ?",
+                (session_id, time.time() - self.ttl),
+            ).fetchone()
+        return row[0] if row else None
+
+    def save(self, session_id: str, data: dict[str, Any]) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO conversations VALUES (?, ?, ?)",
+                (session_id, json.dumps(data), time.time()),
+            )
+            self._conn.commit()
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM conversations WHERE session_id = ?", (session_id,))
+            self._conn.commit()
+
+    def purge(self) -> int:
+        with self._lock:
+            removed = self._conn.execute(
+                "DELETE FROM conversations WHERE updated_at < ?", (time.time() - self.ttl,)
+            ).rowcount
+            self._conn.commit()
+        return removed
+
+
+class RedisConversationStore(ConversationStore):
+    """
+    Conversations persisted as JSON strings in Redis, shared across hosts.
+
+    Every save refreshes the key expiry to `ttl` seconds, so Redis evicts idle
+    sessions itself.
+    """
+
+    def __init__(self, client: Any, ttl: float, prefix: str = "conversation"):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def _key(self, session_id: str) -> str:
+        return f"{self.prefix}:{session_id}"
+
+    def load(self, session_id: str) -> Optional[dict[str, Any]]:
+        data = self.client.get(self._key(session_id))
+        return json.loads(data) if data else None
+
+    def save(self, session_id: str, data: dict[str, Any]) -> None:
+        self.client.set(self._key(session_id), json.dumps(data), ex=int(self.ttl))
+
+    def delete(self, session_id: str) -> None:
+        self.client.delete(self._key(session_id))
+
+
+class ConversationManager:
+    """
+    In-memory LRU of conversations in front of a persistent `ConversationStore`.
+
+    At most `max_sessions` conversations are kept in memory per worker; the least
+    recently used, and those idle for longer than `ttl` seconds, are dropped. Every
+    change is written through to the store, so a dropped or unknown session is
+    loaded lazily from the store when it is resumed, possibly by another worker.
+
+    Writes run on a single writer thread, in order and off the event loop, and
+    changes made while a session waits to be written are coalesced into one write.
+    Every write stores a new revision of the conversation, and a session held in
+    memory is reloaded when the store has a revision written by another worker.
+    """
+
+    def __init__(
+        self,
+        store: ConversationStore,
+        max_sessions: int = 1000,
+        ttl: float = 24 * 3600,
+        summarizer: Optional[Runnable] = None,
+    ):
+        self.store = store
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.summarizer = summarizer
+        self._sessions: OrderedDict[str, tuple[ConversationState, float]] = OrderedDict()
+        # Revision of each session as last loaded or written by this worker.
+        self._revisions: dict[str, Optional[str]] = {}
+        # Latest data of the sessions waiting to be written, or being written.
+        self._unsaved: dict[str, dict[str, Any]] = {}
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="conversation-writer")
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "loads": 0, "created": 0, "evicted": 0, "expired": 0,
+                       "stale": 0}
+
+    def get(self, session_id: str) -> ConversationState:
+        """
+        Return the conversation of a session, loading or creating it on first use.
+
+        Blocks on the store to check the revision of a held session, see `aget`.
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            state = None
+            if session_id in self._sessions:
+                state, _ = self._sessions.pop(session_id)
+                self._sessions[session_id] = (state, now)
+            revision = self._revisions.get(session_id)
+            unsaved = self._unsaved.get(session_id)
+
+        # A session with unsaved changes is newer here than in the store.
+        if state is not None and (
+            unsaved is not None or self.store.revision(session_id) in (None, revision)
+        ):
+            self._stats["hits"] += 1
+            return state
+        stale = state
+        if stale is not None:
+            # Another worker changed the session since this one last saw it.
+            self._stats["stale"] += 1
+            logger.info(f"Reloading conversation {session_id} changed by another worker")
+
+        data = unsaved if unsaved is not None else self.store.load(session_id)
+        if data is not None:
+            state = ConversationState.from_dict(data, summarizer=self.summarizer)
+            self._stats["loads"] += 1
+        else:
+            state = ConversationState(session_id=session_id, summarizer=self.summarizer)
+            self._stats["created"] += 1
+        state.on_change = self._persist
+
+        with self._lock:
+            # Another caller may have loaded the session meanwhile, keep theirs.
+            current = self._sessions.get(session_id)
+            if current is not None and current[0] is not stale:
+                return current[0]
+            self._sessions[session_id] = (state, now)
+            self._sessions.move_to_end(session_id)
+            self._revisions[session_id] = data.get("revision") if data else None
+            while len(self._sessions) > self.max_sessions:
+                evicted, _ = self._sessions.popitem(last=False)
+                self._revisions.pop(evicted, None)
+                self._stats["evicted"] += 1
+        return state
+
+    async def aget(self, session_id: str) -> ConversationState:
+        """
+        Return the conversation of a session without blocking the event loop.
+
+        `get` checks the revision of a held session in the store and may load it, a
+        blocking SQLite or Redis round trip, so async callers use this instead.
+        """
+        return await asyncio.to_thread(self.get, session_id)
+
+    def _persist(self, state: ConversationState) -> None:
+        data = {**state.to_dict(), "revision": uuid.uuid4().hex}
+        with self._lock:
+            self._revisions[state.session_id] = data["revision"]
+            queued = state.session_id in self._unsaved
+            self._unsaved[state.session_id] = data
+        if not queued:
+            self._writer.submit(self._write, state.session_id)
+
+    def _write(self, session_id: str) -> None:
+        with self._lock:
+            data = self._unsaved.get(session_id)
+        if data is None:
+            return
+        try:
+            self.store.save(session_id, data)
+        except Exception as e:
+            logger.error(f"Failed to persist conversation {session_id}: {e!r}")
+        with self._lock:
+            if self._unsaved.get(session_id) is data:
+                del self._unsaved[session_id]
+                return
+        # Changed while it was written, write the latest data too.
+        self._writer.submit(self._write, session_id)
+
+    def flush(self) -> None:
+        """Wait until every change is written to the store."""
+        while True:
+            self._writer.submit(lambda: None).result()
+            with self._lock:
+                if not self._unsaved:
+                    return
+
+    def _expire(self, now: float) -> None:
+        # Sessions are ordered by last use, so expired ones are at the front.
+        while self._sessions:
+            session_id, (_, last_used) = next(iter(self._sessions.items()))
+            if now - last_used < self.ttl:
+                break
+            del self._sessions[session_id]
+            self._revisions.pop(session_id, None)
+            self._stats["expired"] += 1
+
+    def delete(self, session_id: str) -> None:
+        self.flush()
+        with self._lock:
+            self._sessions.pop(session_id, None)
+            self._revisions.pop(session_id, None)
+        self.store.delete(session_id)
+
+    def purge(self) -> int:
+        """Drop idle sessions from memory and expired ones from the store."""
+        with self._lock:
+            self._expire(time.monotonic())
+        return self.store.purge()
+
+    def stats(self) -> dict[str, int]:
+        """Return LRU counters plus the sessions, tokens and characters held in memory."""
+        with self._lock:
+            states = [state for state, _ in self._sessions.values()]
+        return {
+            **self._stats,
+            "sessions": len(states),
+            "tokens": sum(state.total_tokens for state in states),
+            "chars": sum(len(state.load_memory_variables({})[state.memory_key])
+                         for state in states),
+        }
+
+
+def create_conversation_store() -> ConversationStore:
+    """Create the persistent tier selected by `config.CONVERSATION_STORE`."""
+    if config.CONVERSATION_STORE == "sqlite":
+        return SQLiteConversationStore(config.CONVERSATION_STORE_PATH, config.CONVERSATION_TTL)
+    if config.CONVERSATION_STORE == "redis":
+        from redis import Redis
+
+        return RedisConversationStore(Redis.from_url(config.REDIS_URL), config.CONVERSATION_TTL)
+    if config.CONVERSATION_STORE == "memory":
+        return NullConversationStore()
+    raise ValueError(f"Unknown conversation store: {config.CONVERSATION_STORE}")
+
+
+@functools.lru_cache(maxsize=1)
+def get_conversation_manager() -> ConversationManager:
+    """Return the process-wide conversation manager configured from settings."""
+    from app.util.shared import get_shared_chains
+
+    store = create_conversation_store()
+    logger.info(f"Conversation store :: {config.CONVERSATION_STORE}, purged {store.purge()}")
+    return ConversationManager(
+        store,
+        max_sessions=config.CONVERSATION_MAX_SESSIONS,
+        ttl=config.CONVERSATION_TTL,
+        summarizer=get_shared_chains().summary_chain,
+    )
@@ -0,0 +1,388 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, AsyncIterator, Iterator, Optional, Sequence
+
+import numpy as np
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+from langchain_core.runnables import Runnable
+from loguru import logger
+from pydantic import ConfigDict, Field
+
+
+class LatencyStats:
+    """
+    Rolling per-provider latency and error statistics.
+
+    Keeps the last `window` successful call latencies of every route name, which
+    drive the hedging delay of `HedgedChatModel`.
+    """
+
+    def __init__(self, window: int = 200):
+        self.window = window
+        self._latencies: dict[str, deque[float]] = {}
+        self._counts: dict[str, dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def _route(self, name: str) -> dict[str, int]:
+        if name not in self._counts:
+            self._latencies[name] = deque(maxlen=self.window)
+            self._counts[name] = {"calls": 0, "errors": 0, "wins": 0, "hedged": 0}
+        return self._counts[name]
+
+    def record(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self._route(name)["calls"] += 1
+            self._latencies[name].append(seconds)
+
+    def record_error(self, name: str) -> None:
+        with self._lock:
+            self._route(name)["errors"] += 1
+
+    def record_win(self, name: str, hedged: bool) -> None:
+        with self._lock:
+            counts = self._route(name)
+            counts["wins"] += 1
+            counts["hedged"] += int(hedged)
+
+    def quantile(self, name: str, q: float, min_samples: int = 1) -> Optional[float]:
+        """Return the `q` latency quantile of a route, None below `min_samples` samples."""
+        with self._lock:
+            samples = list(self._latencies.get(name, ()))
+        if len(samples) < min_samples:
+            return None
+        return float(np.quantile(samples, q))
+
+    def snapshot(self) -> dict[str, dict[str, Any]]:
+        """Return counters and p50/p95/p99 latencies of every route."""
+        with self._lock:
+            routes = {name: (dict(counts), list(self._latencies[name]))
+                      for name, counts in self._counts.items()}
+        return {
+            name: {
+                **counts,
+                **({f"p{int(q * 100)}": round(float(np.quantile(samples, q)), 3)
+                    for q in (0.5, 0.95, 0.99)} if samples else {}),
+            }
+            for name, (counts, samples) in routes.items()
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._latencies.clear()
+            self._counts.clear()
+
+
+provider_latency = LatencyStats()
+
+# Sync hedging runs attempts on threads; losers finish in the background.
+_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="llm-hedge")
+
+
+class HedgedChatModel(BaseChatModel):
+    """
+    Chat model routing each call over an ordered list of provider/model routes.
+
+    The first route is called right away. If it has not answered after the hedging
+    delay, a duplicate request goes to the next route and the first response wins;
+    the losing async requests are cancelled. A route that errors or exceeds
+    `attempt_timeout` fails over to the next route immediately. Without a fixed
+    `hedge_delay`, the delay is the `hedge_quantile` latency of the route being
+    waited on, learned from `stats`, and `initial_hedge_delay` until enough samples
+    exist. Streaming calls are hedged on the first chunk: the route that starts
+    answering first streams the whole response, the sync API only fails over.
+
+    Attributes:
+        routes (list[BaseChatModel]): Chat models in order of preference.
+        names (list[str]): Route names used for the latency statistics.
+        hedge (bool): Whether to send hedged duplicates, or only fail over on errors.
+        hedge_delay (Optional[float]): Fixed hedging delay in seconds, learned if None.
+        hedge_quantile (float): Latency quantile used as the learned delay.
+        initial_hedge_delay (float): Delay used until a route has `min_samples` samples.
+        min_samples (int): Samples needed before the learned delay is used.
+        attempt_timeout (float): Seconds after which an attempt counts as failed.
+        stats (LatencyStats): Latency statistics shared by all hedged models.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    routes: list[BaseChatModel]
+    names: list[str]
+    hedge: bool = True
+    hedge_delay: Optional[float] = None
+    hedge_quantile: float = 0.95
+    initial_hedge_delay: float = 2.0
+    min_samples: int = 20
+    attempt_timeout: float = 30.0
+    stats: LatencyStats = Field(default=provider_latency, exclude=True)
+    # Call kwargs of each route, set by `bind_tools` as routes format tools differently.
+    route_kwargs: list[dict[str, Any]] = Field(default_factory=list)
+
+    @property
+    def _llm_type(self) -> str:
+        return "hedged-chat"
+
+    @property
+    def _identifying_params(self) -> dict[str, Any]:
+        return {"routes": self.names, "hedge": self.hedge, "route_kwargs": self.route_kwargs}
+
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any) -> Runnable:
+        # The primary may be an Ollama client and the fallbacks OpenAI compatible ones,
+        # so every route formats the tools with its own `bind_tools`.
+        return self.model_copy(update={
+            "route_kwargs": [route.bind_tools(tools, **kwargs).kwargs for route in self.routes]
+        })
+
+    def _kwargs(self, index: int, kwargs: dict[str, Any]) -> dict[str, Any]:
+        return {**kwargs, **self.route_kwargs[index]} if self.route_kwargs else kwargs
+
+    def delay_for(self, name: str) -> Optional[float]:
+        """Return the hedging delay while waiting on route `name`, None when disabled."""
+        if not self.hedge:
+            return None
+        if self.hedge_delay is not None:
+            return self.hedge_delay
+        learned = self.stats.quantile(name, self.hedge_quantile, self.min_samples)
+        return self.initial_hedge_delay if learned is None else learned
+
+    def _call_route(self, index: int, messages, stop, **kwargs) -> ChatResult:
+        name = self.names[index]
+        started = time.perf_counter()
+        try:
+            result = self.routes[index]._generate(messages, stop, **self._kwargs(index, kwargs))
+        except Exception:
+            self.stats.record_error(name)
+            raise
+        self.stats.record(name, time.perf_counter() - started)
+        return result
+
+    async def _acall_route(self, index: int, messages, stop, **kwargs) -> ChatResult:
+        name = self.names[index]
+        started = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(
+                self.routes[index]._agenerate(
+                    messages, stop, **self._kwargs(index, kwargs)
+                ),
+                self.attempt_timeout,
+            )
+        except Exception:
+            self.stats.record_error(name)
+            raise
+        self.stats.record(name, time.perf_counter() - started)
+        return result
+
+    def _won(self, index: int, launched: int) -> None:
+        hedged = launched > 1
+        self.stats.record_win(self.names[index], hedged)
+        if index > 0:
+            logger.info(f"LLM route {self.names[index]} answered (hedged={hedged})")
+
+    def _generate(
+        self,
+        messages: list[BaseMessage],
+        stop: Optional[list[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        pending: dict[Future, tuple[int, float]] = {}
+        errors: list[BaseException] = []
+        launched = 0
+        last_launch = 0.0
+
+        def launch() -> None:
+            nonlocal launched, last_launch
+            last_launch = time.monotonic()
+            future = _executor.submit(self._call_route, launched, messages, stop, **kwargs)
+            pending[future] = (launched, last_launch)
+            launched += 1
+
+        launch()
+        while pending:
+            delay = self.delay_for(self.names[launched - 1])
+            hedging = delay is not None and launched < len(self.routes)
+            deadlines = [started + self.attempt_timeout for _, started in pending.values()]
+            if hedging:
+                deadlines.append(last_launch + delay)
+            done, _ = wait(
+                pending,
+                timeout=max(0.0, min(deadlines) - time.monotonic()),
+                return_when=FIRST_COMPLETED,
+            )
+            for future in done:
+                index, _ = pending.pop(future)
+                if future.exception() is None:
+                    self._won(index, launched)
+                    return future.result()
+                errors.append(future.exception())
+                logger.warning(f"LLM route {self.names[index]} failed: {future.exception()!r}")
+                if launched < len(self.routes):
+                    launch()
+
+            now = time.monotonic()
+            for future, (index, started) in list(pending.items()):
+                if now - started >= self.attempt_timeout:
+                    # The thread cannot be interrupted, it finishes in the background.
+                    del pending[future]
+                    self.stats.record_error(self.names[index])
+                    errors.append(TimeoutError(f"LLM route {self.names[index]} timed out"))
+                    if launched < len(self.routes):
+                        launch()
+            if hedging and not done and launched < len(self.routes) and (
+                now - last_launch >= delay
+            ):
+                launch()
+        raise errors[-1]
+
+    async def _agenerate(
+        self,
+        messages: list[BaseMessage],
+        stop: Optional[list[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        pending: dict[asyncio.Task, int] = {}
+        errors: list[BaseException] = []
+        launched = 0
+
+        def launch() -> None:
+            nonlocal launched
+            task = asyncio.ensure_future(
+                self._acall_route(launched, messages, stop, **kwargs)
+            )
+            pending[task] = launched
+            launched += 1
+
+        launch()
+        try:
+            while pending:
+                delay = self.delay_for(self.names[launched - 1])
+                done, _ = await asyncio.wait(
+                    pending,
+                    timeout=delay if launched < len(self.routes) else None,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if not done:
+                    # The latest route is slower than usual, hedge on the next one.
+                    launch()
+                    continue
+                for task in done:
+                    index = pending.pop(task)
+                    if task.exception() is None:
+                        self._won(index, launched)
+                        return task.result()
+                    errors.append(task.exception())
+                    logger.warning(f"LLM route {self.names[index]} failed: {task.exception()!r}")
+                    if launched < len(self.routes):
+                        launch()
+            raise errors[-1]
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def _stream(
+        self,
+        messages: list[BaseMessage],
+        stop: Optional[list[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        errors: list[BaseException] = []
+        for index, name in enumerate(self.names):
+            started = time.perf_counter()
+            stream = self.routes[index]._stream(messages, stop, **self._kwargs(index, kwargs))
+            try:
+                first = next(stream, None)
+            except Exception as e:
+                self.stats.record_error(name)
+                errors.append(e)
+                logger.warning(f"LLM route {name} failed: {e!r}")
+                continue
+            self.stats.record(name, time.perf_counter() - started)
+            self._won(index, index + 1)
+            if first is not None:
+                yield first
+            yield from stream
+            return
+        raise errors[-1]
+
+    async def _afirst_chunk(
+        self, index: int, stream: AsyncIterator[ChatGenerationChunk]
+    ) -> Optional[ChatGenerationChunk]:
+        name = self.names[index]
+        started = time.perf_counter()
+        try:
+            first = await asyncio.wait_for(anext(stream, None), self.attempt_timeout)
+        except Exception:
+            self.stats.record_error(name)
+            raise
+        self.stats.record(name, time.perf_counter() - started)
+        return first
+
+    async def _astream(
+        self,
+        messages: list[BaseMessage],
+        stop: Optional[list[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        pending: dict[asyncio.Task, int] = {}
+        streams: dict[int, AsyncIterator[ChatGenerationChunk]] = {}
+        errors: list[BaseException] = []
+        launched = 0
+        winner: Optional[int] = None
+
+        def launch() -> None:
+            nonlocal launched
+            streams[launched] = self.routes[launched]._astream(
+                messages, stop, **self._kwargs(launched, kwargs)
+            )
+            task = asyncio.ensure_future(self._afirst_chunk(launched, streams[launched]))
+            pending[task] = launched
+            launched += 1
+
+        launch()
+        try:
+            while pending and winner is None:
+                delay = self.delay_for(self.names[launched - 1])
+                done, _ = await asyncio.wait(
+                    pending,
+                    timeout=delay if launched < len(self.routes) else None,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if not done:
+                    # The latest route is slower than usual to start, hedge on the next one.
+                    launch()
+                    continue
+                for task in done:
+                    index = pending.pop(task)
+                    if task.exception() is None:
+                        winner, first = index, task.result()
+                        break
+                    errors.append(task.exception())
+                    logger.warning(f"LLM route {self.names[index]} failed: {task.exception()!r}")
+                    if launched < len(self.routes):
+                        launch()
+            if winner is None:
+                raise errors[-1]
+        finally:
+            for task in pending:
+                task.cancel()
+            # Losing streams can only be closed once their first chunk is cancelled.
+            await asyncio.gather(*pending, return_exceptions=True)
+            for index, stream in streams.items():
+                if index != winner:
+                    await stream.aclose()
+
+        self._won(winner, launched)
+        try:
+            if first is not None:
+                yield first
+            async for chunk in streams[winner]:
+                yield chunk
+        finally:
+            await streams[winner].aclose()
@@ -1,58 +1,251 @@
-from typing import Optional
+import asyncio
+import hashlib
+import threading
+from typing import Any, AsyncIterator, Callable, Optional
 
+import httpx
+from langchain_core.language_models import BaseChatModel
+from langchain_core.load import dumps
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatResult
+from langchain_core.runnables import Runnable
 from langchain_ollama import ChatOllama
 from langchain_openai import ChatOpenAI
+from loguru import logger
 
 from app.core.config import LLMSettings, config
+from app.core.singleflight import SingleFlight
+from app.util.hedging import HedgedChatModel, provider_latency
+from app.util.llm_cache import cache_enabled, get_llm_cache
+
+PoolKey = tuple[str, str, Optional[str], Optional[float], bool]
+
+llm_flight = SingleFlight("llm")
+
+
+class SingleFlightChatMixin:
+    """
+    Coalesces concurrent identical generations of a chat model.
+
+    The key is the LLM string (model, temperature, bound tools) plus the rendered
+    messages, so concurrent sessions sending the same prompt share one request.
+    """
+
+    def _flight_key(
+        self, messages: list[BaseMessage], stop: Optional[list[str]], **kwargs: Any
+    ) -> str:
+        llm_string = self._get_llm_string(stop=stop, **kwargs)  # type: ignore[attr-defined]
+        return hashlib.sha256(f"{llm_string}{dumps(messages)}".encode()).hexdigest()
+
+    def _generate(
+        self,
+        messages: list[BaseMessage],
+        stop: Optional[list[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        return llm_flight.do(
+            self._flight_key(messages, stop, **kwargs),
+            super()._generate,  # type: ignore[misc]
+            messages,
+            stop,
+            run_manager,
+            **kwargs,
+        )
+
+    async def _agenerate(
+        self,
+        messages: list[BaseMessage],
+        stop: Optional[list[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        agenerate = super()._agenerate  # type: ignore[misc]
+        return await llm_flight.ado(
+            self._flight_key(messages, stop, **kwargs),
+            lambda: agenerate(messages, stop, run_manager, **kwargs),
+        )
+
+
+class SingleFlightChatOpenAI(SingleFlightChatMixin, ChatOpenAI):
+    pass
+
+
+class SingleFlightChatOllama(SingleFlightChatMixin, ChatOllama):
+    pass
 
 
 class LLMClientManager:
-    _instance: Optional[ChatOpenAI] = None
-    _ollama_instance: Optional[ChatOllama] = None
+    """
+    Process-wide pool of LLM clients.
+
+    Clients are keyed by (client kind, provider, model, temperature, cached), so chains
+    asking for different settings get their own client while equal settings share one.
+    All clients talking to the same base URL share a keep-alive HTTP transport with the
+    connection limits from config. Passing a `chain` name listed in
+    `config.LLM_CACHE_CHAINS` returns a client backed by the persistent response cache.
+    With `config.LLM_FALLBACKS` set, both getters return a `HedgedChatModel` that
+    hedges and fails over from the requested model to the fallback routes.
+    """
+
+    _pool: dict[PoolKey, BaseChatModel] = {}
+    _transports: dict[str, tuple[httpx.HTTPTransport, httpx.AsyncHTTPTransport]] = {}
+    _stats: dict[str, int] = {"hits": 0, "created": 0}
+    _lock = threading.Lock()
 
     @classmethod
     def get_instance(
             cls,
-            settings: Optional[LLMSettings] = None) -> ChatOpenAI:
-        if cls._instance is None:
-            cls._instance = cls._create_llm_client(settings)
-        return cls._instance
+            settings: Optional[LLMSettings] = None,
+            chain: Optional[str] = None) -> BaseChatModel:
+        settings = settings or config.LLM_SETTINGS
+        cached = cache_enabled(chain)
+        return cls._get_or_create(
+            ("openai", settings.provider, settings.model, settings.temperature, cached),
+            lambda: cls._create_routed_client(settings, cached),
+        )
 
     @classmethod
     def get_ollama_instance(
             cls,
-            settings: Optional[LLMSettings] = None) -> ChatOllama:
-        if cls._ollama_instance is None:
-            cls._ollama_instance = cls._create_ollama_client(settings)
-        return cls._ollama_instance
+            settings: Optional[LLMSettings] = None,
+            chain: Optional[str] = None) -> BaseChatModel:
+        settings = settings or config.LLM_SETTINGS
+        cached = cache_enabled(chain)
+        return cls._get_or_create(
+            ("ollama", settings.provider, settings.model, settings.temperature, cached),
+            lambda: cls._create_routed_client(settings, cached, cls._create_ollama_client),
+        )
+
+    @classmethod
+    def stats(cls) -> dict[str, int]:
+        """Return pool hits, created clients and the current pool size."""
+        return {**cls._stats, "size": len(cls._pool)}
+
+    @classmethod
+    def route_stats(cls) -> dict[str, dict[str, Any]]:
+        """Return call counts and latency quantiles per `provider:model` route."""
+        return provider_latency.snapshot()
+
+    @classmethod
+    def clear(cls) -> None:
+        """Drop all pooled clients and transports."""
+        with cls._lock:
+            cls._pool.clear()
+            cls._transports.clear()
+            cls._stats.update(hits=0, created=0)
+
+    @classmethod
+    def _get_or_create(cls, key: PoolKey, factory) -> BaseChatModel:
+        with cls._lock:
+            if key in cls._pool:
+                cls._stats["hits"] += 1
+                return cls._pool[key]
+            client = factory()
+            cls._pool[key] = client
+            cls._stats["created"] += 1
+        logger.info(f"Created LLM client {key} :: pool {cls.stats()}")
+        return client
+
+    @classmethod
+    def _get_transports(
+        cls, base_url: str
+    ) -> tuple[httpx.HTTPTransport, httpx.AsyncHTTPTransport]:
+        """Return the shared sync/async keep-alive transports for a base URL."""
+        if base_url not in cls._transports:
+            limits = httpx.Limits(
+                max_connections=config.LLM_MAX_CONNECTIONS,
+                max_keepalive_connections=config.LLM_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=config.LLM_KEEPALIVE_EXPIRY,
+            )
+            cls._transports[base_url] = (
+                httpx.HTTPTransport(limits=limits),
+                httpx.AsyncHTTPTransport(limits=limits),
+            )
+        return cls._transports[base_url]
+
+    @classmethod
+    def _create_routed_client(
+            cls,
+            settings: LLMSettings,
+            cached: bool = False,
+            primary: Optional[Callable[..., BaseChatModel]] = None) -> BaseChatModel:
+        """
+        Create a client for the settings, hedged over `config.LLM_FALLBACKS` if set.
+
+        Fallbacks are `provider:model` strings using the temperature of the primary.
+        The response cache sits on the routed client, so a cached answer skips every route.
+
+        Args:
+            settings: Settings of the primary route
+            cached: Whether the client is backed by the response cache
+            primary: Creates the primary client from settings and `cached`, defaults to
+                an OpenAI compatible client. Fallbacks always are.
+        """
+        primary = primary or cls._create_llm_client
+        routes = [settings]
+        for route in config.LLM_FALLBACKS:
+            provider, model = route.split(":", 1)
+            if (provider, model) != (settings.provider, settings.model):
+                routes.append(LLMSettings(
+                    provider=provider, model=model, temperature=settings.temperature))
+        if len(routes) == 1:
+            return primary(settings, cached)
+
+        return HedgedChatModel(
+            routes=[primary(settings)] + [cls._create_llm_client(route) for route in routes[1:]],
+            names=[f"{route.provider}:{route.model}" for route in routes],
+            hedge=config.LLM_HEDGE,
+            hedge_delay=config.LLM_HEDGE_DELAY,
+            hedge_quantile=config.LLM_HEDGE_QUANTILE,
+            initial_hedge_delay=config.LLM_HEDGE_INITIAL_DELAY,
+            attempt_timeout=config.LLM_ATTEMPT_TIMEOUT,
+            cache=get_llm_cache() if cached else None,
+        )
 
     @classmethod
     def _create_llm_client(
             cls,
-            settings: Optional[LLMSettings] = None) -> ChatOpenAI:
+            settings: Optional[LLMSettings] = None,
+            cached: bool = False) -> ChatOpenAI:
         settings = settings or config.LLM_SETTINGS
 
         provider = config.PROVIDERS[settings.provider]
+        transport, async_transport = cls._get_transports(provider["base_url"])
         options = {
             "base_url": provider["base_url"],
             "api_key": provider["api_key"],
             "model": settings.model,
             "temperature": settings.temperature,
+            "http_client": httpx.Client(
+                transport=transport, timeout=config.LLM_TIMEOUT),
+            "http_async_client": httpx.AsyncClient(
+                transport=async_transport, timeout=config.LLM_TIMEOUT),
+            "cache": get_llm_cache() if cached else None,
         }
+        if config.LLM_SINGLE_FLIGHT:
+            return SingleFlightChatOpenAI(**options)
         return ChatOpenAI(**options)
 
     @classmethod
     def _create_ollama_client(
             cls,
-            settings: Optional[LLMSettings] = None) -> ChatOllama:
+            settings: Optional[LLMSettings] = None,
+            cached: bool = False) -> ChatOllama:
         settings = settings or config.LLM_SETTINGS
 
         if settings.provider == "ollama":
+            transport, async_transport = cls._get_transports(config.OLLAMA_API_BASE)
             options = {
                 "base_url": config.OLLAMA_API_BASE,
                 "model": settings.model,
                 "temperature": settings.temperature,
+                "sync_client_kwargs": {"transport": transport},
+                "async_client_kwargs": {"transport": async_transport},
+                "cache": get_llm_cache() if cached else None,
             }
+            if config.LLM_SINGLE_FLIGHT:
+                return SingleFlightChatOllama(**options)
             return ChatOllama(**options)
         else:
             raise ValueError(
@@ -62,3 +255,51 @@ class LLMClientManager:
 get_llm_instance = LLMClientManager.get_instance
 
 get_ollama_instance = LLMClientManager.get_ollama_instance
+
+
+async def ainvoke_with_deadline(
+    runnable: Runnable, input: Any, timeout: Optional[float] = None, **kwargs: Any
+) -> Any:
+    """
+    Invoke a runnable natively on the event loop with a per-call deadline.
+
+    The call is cancelled (closing its HTTP request) when it exceeds `timeout` seconds,
+    defaulting to `config.LLM_CALL_TIMEOUT`, or when the awaiting task is cancelled.
+
+    Raises:
+        TimeoutError: If the deadline is exceeded.
+    """
+    timeout = config.LLM_CALL_TIMEOUT if timeout is None else timeout
+    try:
+        return await asyncio.wait_for(runnable.ainvoke(input, **kwargs), timeout)
+    except TimeoutError as e:
+        raise TimeoutError(f"LLM call exceeded its {timeout}s deadline") from e
+
+
+async def astream_with_deadline(
+    runnable: Runnable, input: Any, timeout: Optional[float] = None, **kwargs: Any
+) -> AsyncIterator[Any]:
+    """
+    Stream a runnable with a deadline on the whole call, like `ainvoke_with_deadline`.
+
+    The deadline only runs while waiting for the next chunk, so time the caller spends
+    on a chunk counts against it but is never interrupted.
+
+    Raises:
+        TimeoutError: If the deadline is exceeded.
+    """
+    timeout = config.LLM_CALL_TIMEOUT if timeout is None else timeout
+    deadline = asyncio.get_running_loop().time() + timeout
+    stream = aiter(runnable.astream(input, **kwargs))
+    try:
+        while True:
+            remaining = deadline - asyncio.get_running_loop().time()
+            try:
+                chunk = await asyncio.wait_for(anext(stream), max(remaining, 0))
+            except StopAsyncIteration:
+                return
+            except TimeoutError as e:
+                raise TimeoutError(f"LLM call exceeded its {timeout}s deadline") from e
+            yield chunk
+    finally:
+        await stream.aclose()
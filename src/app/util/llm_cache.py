@@ -0,0 +1,231 @@
+import functools
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Optional
+
+import numpy as np
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.embeddings import Embeddings
+from langchain_core.load import dumps, loads
+from langchain_core.messages import HumanMessage
+from loguru import logger
+
+from app.core.config import config
+
+
+def _split_prompt(prompt: str) -> tuple[str, str]:
+    """
+    Split a serialized message list into its context and its final human input.
+
+    The context is everything but the last human message, i.e. the system template
+    and the chat history, serialized. Prompts that are not message lists have no context.
+    """
+    try:
+        messages = loads(prompt)
+    except (ValueError, TypeError, json.JSONDecodeError):
+        return "", prompt
+    if not isinstance(messages, list):
+        return "", prompt
+    last = max(
+        (i for i, message in enumerate(messages) if isinstance(message, HumanMessage)),
+        default=None,
+    )
+    if last is None or not isinstance(messages[last].content, str):
+        return "", prompt
+    return dumps(messages[:last] + messages[last + 1:]), messages[last].content
+
+
+class SQLiteLLMCache(BaseCache):
+    """
+    Persistent LLM response cache with an exact and an optional semantic tier.
+
+    The exact tier is keyed by the LLM string (model, temperature and bound tools) and
+    the rendered messages. When `embeddings` is set, misses fall back to the cached
+    prompt whose final human input is the most similar, with a cosine similarity of
+    at least `similarity_threshold`. Only prompts of the same scope compete, i.e. with
+    the same LLM string and the same other messages, so the chain template and the
+    chat history must match exactly; the `max_candidates` most recently used of them
+    are compared. Entries older than `max_age` seconds are ignored and purged, and the
+    least recently used entries are evicted beyond `max_entries`.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        max_entries: int = 10_000,
+        max_age: float = 7 * 24 * 3600,
+        embeddings: Optional[Embeddings] = None,
+        similarity_threshold: float = 0.95,
+        max_candidates: int = 1000,
+    ):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.embeddings = embeddings
+        self.similarity_threshold = similarity_threshold
+        self.max_candidates = max_candidates
+        self.stats = {"exact_hits": 0, "semantic_hits": 0, "misses": 0, "evicted": 0}
+        self._last_embedding: Optional[tuple[str, np.ndarray]] = None
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                llm_string TEXT NOT NULL,
+                response TEXT NOT NULL,
+                embedding BLOB,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                scope TEXT
+            )
+            """
+        )
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(llm_cache)")]
+        if "scope" not in columns:
+            # Caches created before scopes, their entries only serve exact lookups.
+            self._conn.execute("ALTER TABLE llm_cache ADD COLUMN scope TEXT")
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS llm_cache_llm_string ON llm_cache (llm_string)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS llm_cache_scope ON llm_cache (scope, accessed_at)"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def _key(prompt: str, llm_string: str) -> str:
+        return hashlib.sha256(f"{llm_string}\x00{prompt}".encode()).hexdigest()
+
+    @classmethod
+    def _scope(cls, prompt: str, llm_string: str) -> str:
+        return cls._key(_split_prompt(prompt)[0], llm_string)
+
+    def _embed(self, prompt: str) -> Optional[np.ndarray]:
+        if self.embeddings is None:
+            return None
+        # A miss is followed by an update for the same prompt, embed it only once.
+        if self._last_embedding and self._last_embedding[0] == prompt:
+            return self._last_embedding[1]
+        text = _split_prompt(prompt)[1]
+        vector = np.array(self.embeddings.embed_query(text), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        vector = vector / norm if norm else vector
+        self._last_embedding = (prompt, vector)
+        return vector
+
+    def _semantic_lookup(self, query: np.ndarray, scope: str) -> Optional[tuple[str, str]]:
+        rows = self._conn.execute(
+            "SELECT key, response, embedding FROM llm_cache "
+            "WHERE scope = ? AND embedding IS NOT NULL AND created_at >= ? "
+            "ORDER BY accessed_at DESC LIMIT ?",
+            (scope, time.time() - self.max_age, self.max_candidates),
+        ).fetchall()
+        if not rows:
+            return None
+        matrix = np.stack([np.frombuffer(row[2], dtype=np.float32) for row in rows])
+        scores = matrix @ query
+        best = int(np.argmax(scores))
+        if scores[best] < self.similarity_threshold:
+            return None
+        return rows[best][0], rows[best][1]
+
+    def _touch(self, key: str) -> None:
+        self._conn.execute(
+            "UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (time.time(), key)
+        )
+        self._conn.commit()
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        key = self._key(prompt, llm_string)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response FROM llm_cache WHERE key = ? AND created_at >= ?",
+                (key, time.time() - self.max_age),
+            ).fetchone()
+            if row is not None:
+                self.stats["exact_hits"] += 1
+                self._touch(key)
+                return loads(row[0])
+
+        # Embed outside the lock, the embedding model is a network round trip.
+        query = self._embed(prompt)
+        with self._lock:
+            match = (
+                self._semantic_lookup(query, self._scope(prompt, llm_string))
+                if query is not None else None
+            )
+            if match is None:
+                self.stats["misses"] += 1
+                return None
+            self.stats["semantic_hits"] += 1
+            self._touch(match[0])
+        return loads(match[1])
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        embedding = self._embed(prompt)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache "
+                "(key, llm_string, response, embedding, created_at, accessed_at, scope) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    self._key(prompt, llm_string),
+                    llm_string,
+                    dumps(list(return_val)),
+                    embedding.tobytes() if embedding is not None else None,
+                    now,
+                    now,
+                    self._scope(prompt, llm_string),
+                ),
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now: float) -> None:
+        expired = self._conn.execute(
+            "DELETE FROM llm_cache WHERE created_at < ?", (now - self.max_age,)
+        ).rowcount
+        overflow = self._conn.execute(
+            "DELETE FROM llm_cache WHERE key IN ("
+            "SELECT key FROM llm_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        ).rowcount
+        self.stats["evicted"] += expired + overflow
+
+    def clear(self, **kwargs: Any) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+            self._conn.commit()
+
+
+@functools.lru_cache(maxsize=1)
+def get_llm_cache() -> SQLiteLLMCache:
+    """Return the process-wide LLM response cache configured from settings."""
+    embeddings = None
+    if config.LLM_CACHE_SEMANTIC:
+        from langchain_ollama import OllamaEmbeddings
+
+        embeddings = OllamaEmbeddings(
+            base_url=config.OLLAMA_API_BASE,
+            model=config.EMB_MODEL_ID,
+        )
+    logger.info(f"LLM cache :: {config.LLM_CACHE_PATH} (semantic={embeddings is not None})")
+    return SQLiteLLMCache(
+        config.LLM_CACHE_PATH,
+        max_entries=config.LLM_CACHE_MAX_ENTRIES,
+        max_age=config.LLM_CACHE_MAX_AGE,
+        embeddings=embeddings,
+        similarity_threshold=config.LLM_CACHE_SIMILARITY_THRESHOLD,
+        max_candidates=config.LLM_CACHE_SEMANTIC_CANDIDATES,
+    )
+
+
+def cache_enabled(chain: Optional[str]) -> bool:
+    """Return whether responses of the named chain should be cached."""
+    return chain is not None and chain in config.LLM_CACHE_CHAINS
@@ -0,0 +1,202 @@
+import asyncio
+import functools
+import itertools
+from collections import defaultdict
+from typing import Iterator, Optional
+
+from loguru import logger
+
+from app.core.config import config
+from app.util.retrievers import resolve_entity
+from data.store import get_default_store
+
+# An edge is (start id, relationship type, end id), a path alternates node ids and edges.
+# The degree of an entity counts its relationships to other entities, leaving out the
+# MENTIONS of source documents, in both the Cypher query and the BFS adjacency.
+Edge = tuple[str, str, str]
+Path = list
+
+PATH_QUERY = """
+MATCH (a:__Entity__ {{id: $source}}), (b:__Entity__ {{id: $target}})
+MATCH p = allShortestPaths((a)-[:!MENTIONS*..{max_hops}]-(b))
+WHERE all(n IN nodes(p)[1..-1]
+          WHERE n:__Entity__ AND COUNT {{ (n)-[:!MENTIONS]-(:__Entity__) }} <= $max_degree)
+RETURN [n IN nodes(p) | n.id] AS nodes,
+       [r IN relationships(p) | [startNode(r).id, type(r), endNode(r).id]] AS edges
+LIMIT $max_paths
+"""
+
+path_stats = {"cypher": 0, "bfs": 0, "unresolved": 0}
+
+
+def summarize(path: Path) -> str:
+    """Render a path compactly, e.g. `Mina Harker -[MARRIED_TO]-> Jonathan Harker`."""
+    parts = [path[0]]
+    for i in range(1, len(path), 2):
+        (start, rel_type, _), node = path[i], path[i + 1]
+        forward = start == path[i - 1]
+        parts.append(f"-[{rel_type}]->" if forward else f"<-[{rel_type}]-")
+        parts.append(node)
+    return " ".join(parts)
+
+
+def cypher_paths(store, source: str, target: str, max_hops: int, max_paths: int,
+                 max_degree: int, timeout: Optional[float] = None) -> list[Path]:
+    """Find the shortest paths between two entity ids with Neo4j, within `timeout` seconds."""
+    response = store.query(
+        PATH_QUERY.format(max_hops=int(max_hops)),
+        {"source": source, "target": target, "max_paths": max_paths, "max_degree": max_degree},
+        timeout=timeout,
+    )
+    paths = []
+    for row in response:
+        path: Path = [row["nodes"][0]]
+        for edge, node in zip(row["edges"], row["nodes"][1:]):
+            path.extend([tuple(edge), node])
+        paths.append(path)
+    return paths
+
+
+@functools.lru_cache(maxsize=1)
+def adjacency(store, generation: int) -> dict[str, list[tuple[str, Edge]]]:
+    """
+    Return the undirected adjacency of the entities, built once per store generation.
+
+    Capped at `config.PATH_ADJACENCY_MAX_EDGES` relationships.
+    """
+    response = store.graph.query(
+        """
+        MATCH (a:__Entity__)-[r]->(b:__Entity__)
+        RETURN a.id AS start, type(r) AS type, b.id AS end
+        LIMIT $limit
+        """,
+        {"limit": config.PATH_ADJACENCY_MAX_EDGES},
+    )
+    neighbors: dict[str, list[tuple[str, Edge]]] = defaultdict(list)
+    for row in response:
+        edge = (row["start"], row["type"], row["end"])
+        neighbors[row["start"]].append((row["end"], edge))
+        neighbors[row["end"]].append((row["start"], edge))
+    logger.info(f"Built entity adjacency :: {len(neighbors)} nodes, {len(response)} edges")
+    return dict(neighbors)
+
+
+def _walk(parents: dict[str, list[tuple[str, Edge]]], node: str) -> Iterator[Path]:
+    """Yield the paths from the BFS root to `node`, following the parent links."""
+    if not parents[node]:
+        yield [node]
+        return
+    for parent, edge in parents[node]:
+        for path in _walk(parents, parent):
+            yield path + [edge, node]
+
+
+def bidirectional_paths(
+    neighbors: dict[str, list[tuple[str, Edge]]],
+    source: str,
+    target: str,
+    max_hops: int,
+    max_paths: int,
+    max_degree: int,
+) -> list[Path]:
+    """
+    Find up to `max_paths` shortest paths of at most `max_hops` between two nodes.
+
+    Searches alternately from both ends, expanding the smaller frontier. Paths never
+    go through intermediate nodes with more than `max_degree` relationships.
+    """
+    if source not in neighbors or target not in neighbors:
+        return []
+    if source == target:
+        return [[source]]
+
+    parents = ({source: []}, {target: []})
+    frontiers: tuple[list[str], list[str]] = ([source], [target])
+    hops = 0
+    while frontiers[0] and frontiers[1] and hops < max_hops:
+        side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+        reached: dict[str, list[tuple[str, Edge]]] = {}
+        for node in frontiers[side]:
+            for neighbor, edge in neighbors[node]:
+                if neighbor in parents[side]:
+                    continue
+                if neighbor not in (source, target) and len(neighbors[neighbor]) > max_degree:
+                    continue
+                reached.setdefault(neighbor, []).append((node, edge))
+        parents[side].update(reached)
+        hops += 1
+
+        meeting = [node for node in reached if node in parents[1 - side]]
+        if meeting:
+            paths = (
+                left + list(reversed(right))[1:]
+                for node in meeting
+                for left in _walk(parents[0], node)
+                for right in _walk(parents[1], node)
+            )
+            return list(itertools.islice(paths, max_paths))
+        frontiers = (list(reached), frontiers[1]) if side == 0 else (frontiers[0], list(reached))
+    return []
+
+
+async def find_paths(
+    entities: list[str],
+    max_hops: Optional[int] = None,
+    max_paths: Optional[int] = None,
+) -> dict:
+    """
+    Find the shortest relationship paths between pairs of entity mentions.
+
+    Mentions are resolved to entities through the full-text index, and names are
+    passed to Neo4j as parameters so lookups go through the entity id index. Paths
+    skip high-degree intermediate nodes and are capped per pair. When the Cypher
+    query fails, or Neo4j aborts it after `config.PATH_QUERY_TIMEOUT`, a bidirectional
+    BFS over the cached entity adjacency finds the paths instead.
+
+    Args:
+        entities: Entity mentions, paths are searched between each pair of the first four
+        max_hops: Maximum path length, at most `config.PATH_MAX_HOPS`
+        max_paths: Maximum paths per pair, at most `config.PATH_MAX_PATHS`
+
+    Returns:
+        The compact path summaries as `result`, plus the resolved `entities` and the
+        `method` used for each pair
+    """
+    # Plan parameters come from the LLM, they can only tighten the configured bounds.
+    max_hops = min(int(max_hops or config.PATH_MAX_HOPS), config.PATH_MAX_HOPS)
+    max_paths = min(int(max_paths or config.PATH_MAX_PATHS), config.PATH_MAX_PATHS)
+    store = get_default_store()
+
+    resolved = {}
+    for mention in entities[:4]:
+        entity_id = await asyncio.to_thread(resolve_entity, store, mention)
+        if entity_id is None:
+            path_stats["unresolved"] += 1
+            logger.info(f"No entity found for {mention!r}")
+        else:
+            resolved[mention] = entity_id
+    if len(set(resolved.values())) < 2:
+        return {"result": "Not enough entities to find a path", "entities": resolved}
+
+    summaries, methods = [], {}
+    for source, target in itertools.combinations(dict.fromkeys(resolved.values()), 2):
+        args = (source, target, max_hops, max_paths, config.PATH_MAX_DEGREE)
+        try:
+            paths = await asyncio.to_thread(
+                cypher_paths, store, *args, timeout=config.PATH_QUERY_TIMEOUT
+            )
+            method = "cypher"
+        except Exception as e:
+            logger.warning(f"Cypher path search {source} -> {target} failed, using BFS: {e!r}")
+            neighbors = await asyncio.to_thread(adjacency, store, store.generation)
+            paths = await asyncio.to_thread(bidirectional_paths, neighbors, *args)
+            method = "bfs"
+        path_stats[method] += 1
+        methods[f"{source} -> {target}"] = method
+        summaries.extend(summarize(path) for path in paths)
+
+    return {
+        "result": "\n".join(summaries) or "No path found between the entities",
+        "entities": resolved,
+        "method": methods,
+    }
@@ -1,12 +1,23 @@
 import asyncio
 import json
-from dataclasses import dataclass
-from typing import Any, Dict, List, Optional
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, List, Optional, Union
 
-from langchain_core.messages import BaseMessage
-from util.llm import get_ollama_instance
+from langchain_core.caches import BaseCache
+from langchain_core.load import dumps
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
+from langchain_core.outputs import ChatGeneration
+from loguru import logger
 
-from app.core.config import LLMSettings
+from app.core.config import LLMSettings, config
+from app.core.singleflight import normalize
+from app.util.llm import get_ollama_instance
+from app.util.standalone import mentions
+
+planner_stats = {"template": 0, "cached": 0, "llm_cached": 0, "llm": 0}
 
 
 @dataclass
@@ -21,6 +32,10 @@ class ExecutionStep:
     expected_confidence: float
 
 
+class PlanError(ValueError):
+    """Raised when the steps of a plan do not form a valid dependency graph."""
+
+
 @dataclass
 class ExecutionPlan:
     """Complete execution plan for a complex query."""
@@ -30,6 +45,56 @@ class ExecutionPlan:
     estimated_time: float
     fallback_strategy: Optional[str] = None
 
+    def dependencies(self) -> Dict[str, List[str]]:
+        """
+        Return the validated dependencies of every step, keyed by step id.
+
+        Synthesis steps without declared dependencies depend on every other
+        non-synthesis step, since they synthesize their results.
+
+        Raises:
+            PlanError: On duplicate step ids, unknown dependencies or cycles
+        """
+        ids = [step.step_id for step in self.steps]
+        duplicates = sorted({i for i in ids if ids.count(i) > 1})
+        if duplicates:
+            raise PlanError(f"Duplicate step ids: {duplicates}")
+
+        dependencies = {}
+        for step in self.steps:
+            deps = list(dict.fromkeys(step.dependencies))
+            if not deps and step.query_type == "synthesis":
+                deps = [s.step_id for s in self.steps if s.query_type != "synthesis"]
+            missing = [d for d in deps if d not in dependencies and d not in ids]
+            if missing:
+                raise PlanError(f"Step {step.step_id} depends on unknown steps {missing}")
+            dependencies[step.step_id] = deps
+
+        self._check_acyclic(dependencies)
+        return dependencies
+
+    @staticmethod
+    def _check_acyclic(dependencies: Dict[str, List[str]]) -> None:
+        remaining = {step_id: set(deps) for step_id, deps in dependencies.items()}
+        while remaining:
+            ready = [step_id for step_id, deps in remaining.items() if not deps]
+            if not ready:
+                raise PlanError(f"Dependency cycle between steps {sorted(remaining)}")
+            for step_id in ready:
+                del remaining[step_id]
+            for deps in remaining.values():
+                deps.difference_update(ready)
+
+
+@dataclass
+class StepEvent:
+    """Progress of a step while a plan is executed."""
+
+    step: Optional[ExecutionStep]
+    status: str  # "planned", "started", "finished", "cancelled", "plan"
+    result: Optional["StepResult"] = None
+    plan: Optional[ExecutionPlan] = None  # The complete plan, on the "plan" event
+
 
 @dataclass
 class StepResult:
@@ -44,6 +109,19 @@ class StepResult:
     execution_time: float
 
 
+@dataclass
+class ExecutionContext:
+    """Results of the steps executed for one query."""
+
+    query: str
+    results: Dict[str, StepResult] = field(default_factory=dict)
+
+    def dependency_results(self, step: ExecutionStep) -> List[StepResult]:
+        """Return the successful results of the step dependencies, or of every step."""
+        ids = step.dependencies or list(self.results)
+        return [self.results[i] for i in ids if i in self.results and self.results[i].success]
+
+
 @dataclass
 class FinalResult:
     """Final synthesized result."""
@@ -55,25 +133,281 @@ class FinalResult:
     reasoning_chain: Optional[List[str]] = None
 
 
+def _step(step_id: str, description: str, query_type: str, parameters: Dict[str, Any],
+          dependencies: List[str], expected_confidence: float) -> ExecutionStep:
+    return ExecutionStep(step_id, description, query_type, parameters, dependencies,
+                         expected_confidence)
+
+
+def template_plan(complexity_analysis: Dict, entities: List[str]) -> Optional[ExecutionPlan]:
+    """
+    Build the plan of a common query pattern without the planner LLM.
+
+    Comparisons and relationship questions between two or more entities search
+    every entity, traverse the graph between them and synthesize the findings.
+    Other multi-step, comparison or relationship questions about entities search
+    them and synthesize.
+
+    Args:
+        complexity_analysis: The analysis of the query, see `analyze_query_complexity`
+        entities: The entities mentioned in the query
+
+    Returns:
+        The plan, or None when the query matches no template
+    """
+    relational = complexity_analysis.get("needs_comparison") or complexity_analysis.get(
+        "needs_relationship_analysis")
+    if not entities or not (relational or complexity_analysis.get("needs_multi_step")):
+        return None
+
+    steps = [
+        _step(f"search_{i}", f"Search the knowledge graph for {entity}", "entity_search",
+              {"entities": [entity]}, [], 85)
+        for i, entity in enumerate(entities)
+    ]
+    if relational and len(entities) >= 2:
+        steps.append(_step(
+            "traverse_relationships", f"Find the paths between {', '.join(entities)}",
+            "relationship_traverse", {"entities": entities, "max_hops": config.PATH_MAX_HOPS},
+            [step.step_id for step in steps], 75,
+        ))
+    steps.append(_step(
+        "synthesize", "Synthesize the findings into an answer", "synthesis", {},
+        [step.step_id for step in steps], 80,
+    ))
+    return ExecutionPlan(
+        steps=steps,
+        confidence_estimate=min(step.expected_confidence for step in steps),
+        estimated_time=5.0 * (len(steps) - len(entities) + 1),
+    )
+
+
+def query_shape(query: str, entities: List[str]) -> str:
+    """Normalize a query with its entity mentions replaced by numbered placeholders."""
+    return normalize(_replace(query, {entity: f"<e{i}>" for i, entity in enumerate(entities)}))
+
+
+def _replace(value: Any, replacements: Dict[str, str]) -> Any:
+    """Recursively apply string replacements, longest first, to a JSON value."""
+    if isinstance(value, str):
+        for old in sorted(replacements, key=len, reverse=True):
+            value = value.replace(old, replacements[old])
+        return value
+    if isinstance(value, list):
+        return [_replace(v, replacements) for v in value]
+    if isinstance(value, dict):
+        return {k: _replace(v, replacements) for k, v in value.items()}
+    return value
+
+
+class PlanCache:
+    """
+    Bounded LRU of LLM-produced plans, keyed by query shape.
+
+    Plans are stored with the entities of their query replaced by placeholders, so
+    a plan made for "Compare Mina and Lucy" is reused for "Compare Jonathan and
+    Arthur" with the new entities filled in.
+    """
+
+    def __init__(self, max_entries: int = 1000):
+        self.max_entries = max_entries
+        self._plans: OrderedDict[str, Dict[str, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, shape: str, entities: List[str]) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            plan_json = self._plans.get(shape)
+            if plan_json is None:
+                return None
+            self._plans.move_to_end(shape)
+        return _replace(plan_json, {f"<e{i}>": entity for i, entity in enumerate(entities)})
+
+    def put(self, shape: str, entities: List[str], plan_json: Dict[str, Any]) -> None:
+        if self.max_entries <= 0:
+            return
+        abstract = _replace(plan_json, {entity: f"<e{i}>" for i, entity in enumerate(entities)})
+        with self._lock:
+            self._plans[shape] = abstract
+            self._plans.move_to_end(shape)
+            while len(self._plans) > self.max_entries:
+                self._plans.popitem(last=False)
+
+
+class PlanStreamParser:
+    """
+    Incremental parser of a JSON plan streamed by the planner LLM.
+
+    Every chunk fed is scanned from where the previous one stopped, and each object
+    of the `steps` array is returned as soon as it is complete, so steps can be
+    dispatched while the rest of the plan is still generated. Think tags before the
+    plan are skipped.
+    """
+
+    def __init__(self) -> None:
+        self.text = ""
+        self._pos = 0  # Next character of the visible text to scan
+        self._in_steps = False
+        self._done = False
+        self._depth = 0
+        self._start = 0
+        self._in_string = False
+        self._escaped = False
+
+    def _visible(self) -> str:
+        text = re.sub(r"<think>.*?</think>", "", self.text, flags=re.DOTALL | re.IGNORECASE)
+        unclosed = text.lower().find("<think>")
+        return text if unclosed == -1 else text[:unclosed]
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        """Add a chunk of the response, returning the steps it completed."""
+        self.text += chunk
+        if self._done:
+            return []
+        text = self._visible()
+        if not self._in_steps:
+            match = re.search(r'"steps"\s*:\s*\[', text)
+            if match is None:
+                return []
+            self._in_steps = True
+            self._pos = match.end()
+
+        steps = []
+        for i in range(self._pos, len(text)):
+            char = text[i]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in "{[":
+                if self._depth == 0:
+                    self._start = i
+                self._depth += 1
+            elif char in "}]":
+                if self._depth == 0:
+                    # End of the steps array
+                    self._done = True
+                    break
+                self._depth -= 1
+                if self._depth == 0:
+                    steps.append(json.loads(text[self._start:i + 1]))
+        self._pos = len(text)
+        return steps
+
+
+def parse_plan_json(text: str) -> Dict[str, Any]:
+    """Parse the JSON plan of a planner response, ignoring think tags and code fences."""
+    text = re.sub(r"<think>.*?</think>", "", text, flags=re.DOTALL | re.IGNORECASE)
+    start, end = text.find("{"), text.rfind("}")
+    if start == -1 or end < start:
+        raise ValueError(f"No JSON plan in planner response: {text[:200]!r}")
+    return json.loads(text[start:end + 1])
+
+
 class QueryPlanner:
-    """Plans multi-step execution for complex queries."""
+    """
+    Plans multi-step execution for complex queries.
 
-    def __init__(self, settings: Optional[LLMSettings] = None):
-        self.llm = get_ollama_instance(settings)
+    Common query patterns get a template plan and queries shaped like a previously
+    planned one reuse its plan, so only the remaining queries need the planner LLM.
+    """
 
-    async def create_execution_plan(
-            self,
-            query: str,
-            complexity_analysis: Dict) -> ExecutionPlan:
-        """Create a step-by-step execution plan."""
+    def __init__(
+        self,
+        settings: Optional[LLMSettings] = None,
+        timeout: Optional[float] = None,
+        templates: Optional[bool] = None,
+        cache_size: Optional[int] = None,
+    ):
+        self.llm = get_ollama_instance(settings, chain="planner")
+        self.timeout = timeout
+        self.templates = config.PLAN_TEMPLATES if templates is None else templates
+        self.cache = PlanCache(config.PLAN_CACHE_SIZE if cache_size is None else cache_size)
 
-        planning_prompt = f"""
-        You are a query planner for a GraphRAG system with a generic knowledge graph.
+    async def stream_execution_plan(
+        self, query: str, complexity_analysis: Dict
+    ) -> AsyncIterator[Union[ExecutionStep, ExecutionPlan]]:
+        """
+        Stream the steps of the execution plan as soon as each one is planned.
+
+        Template and cached plans are known at once. LLM plans are streamed and
+        parsed incrementally, each step being yielded as soon as it is complete.
+        Streaming bypasses the LLM response cache of the planner client, so it is
+        looked up first and the response is written back once its plan is parsed.
+
+        Yields:
+            Every `ExecutionStep` of the plan, then the complete `ExecutionPlan`
+        """
+        entities = mentions(query)
+        shape = query_shape(query, entities)
+        plan = self._known_plan(complexity_analysis, entities, shape)
+        if plan is not None:
+            for step in plan.steps:
+                yield step
+            yield plan
+            return
+
+        parser = PlanStreamParser()
+        messages = self._planning_prompt(query, complexity_analysis)
+        # Keyed like `ainvoke` keys the cache, so both paths share responses.
+        cache = self.llm.cache if isinstance(self.llm.cache, BaseCache) else None
+        prompt, llm_string = dumps(messages), self.llm._get_llm_string()
+        cached = await cache.alookup(prompt, llm_string) if cache is not None else None
+        if cached:
+            planner_stats["llm_cached"] += 1
+            for step_json in parser.feed(cached[0].text):
+                yield self._build_step(step_json)
+        else:
+            planner_stats["llm"] += 1
+            async with asyncio.timeout(self.timeout or config.LLM_CALL_TIMEOUT):
+                async for chunk in self.llm.astream(messages):
+                    for step_json in parser.feed(getattr(chunk, "content", str(chunk))):
+                        yield self._build_step(step_json)
+        plan = self._cache_plan(shape, entities, parse_plan_json(parser.text))
+        if cache is not None and not cached:
+            generation = ChatGeneration(message=AIMessage(content=parser.text))
+            await cache.aupdate(prompt, llm_string, [generation])
+        yield plan
+
+    def _known_plan(
+        self, complexity_analysis: Dict, entities: List[str], shape: str
+    ) -> Optional[ExecutionPlan]:
+        """Return the template or cached plan of a query, if any."""
+        if self.templates:
+            plan = template_plan(complexity_analysis, entities)
+            if plan is not None:
+                planner_stats["template"] += 1
+                logger.info(f"Template plan for {entities} :: {len(plan.steps)} steps")
+                return plan
 
-        Query: {query}
-        Complexity Analysis: {json.dumps(complexity_analysis, indent=2)}
+        plan_json = self.cache.get(shape, entities)
+        if plan_json is not None:
+            planner_stats["cached"] += 1
+            logger.info(f"Cached plan for query shape {shape!r}")
+            return self._build_plan(plan_json)
+        return None
 
-        Create a step-by-step execution plan. Consider:
+    def _cache_plan(
+        self, shape: str, entities: List[str], plan_json: Dict[str, Any]
+    ) -> ExecutionPlan:
+        plan = self._build_plan(plan_json)
+        # Only plans that form a valid DAG are worth reusing.
+        plan.dependencies()
+        self.cache.put(shape, entities, plan_json)
+        return plan
+
+    @staticmethod
+    def _planning_prompt(query: str, complexity_analysis: Dict) -> List[BaseMessage]:
+        # The query comes last and alone in the human message, so semantic caching
+        # compares queries rather than the shared instructions.
+        instructions = """
+        You are a query planner for a GraphRAG system with a generic knowledge graph.
+
+        Create a step-by-step execution plan for the query of the user. Consider:
         - Entity extraction and search from the query
         - Relationship traversal in the knowledge graph
         - Multi-hop reasoning across connected concepts
@@ -88,39 +422,44 @@ class QueryPlanner:
         - expected_confidence: 0-100 estimate
 
         Example format:
-        {{
+        {
             "steps": [
-                {{
+                {
                     "step_id": "extract_entities",
                     "description": "Extract key entities and concepts from the query",
                     "query_type": "entity_search",
-                    "parameters": {{"entities": ["concept1", "concept2"]}},
+                    "parameters": {"entities": ["concept1", "concept2"]},
                     "dependencies": [],
                     "expected_confidence": 90
-                }}
+                }
             ],
             "confidence_estimate": 85,
             "estimated_time": 10.5
-        }}
+        }
         """
-
-        # Run blocking LLM call in a background thread
-        response = await asyncio.to_thread(self.llm.invoke, planning_prompt)
-
-        plan_json = json.loads(str(response))  # make sure it's stringified
-
-        steps = [
-            ExecutionStep(
-                step_id=step["step_id"],
-                description=step["description"],
-                query_type=step["query_type"],
-                parameters=step["parameters"],
-                dependencies=step["dependencies"],
-                expected_confidence=step["expected_confidence"],
-            )
-            for step in plan_json["steps"]
+        return [
+            SystemMessage(content=instructions),
+            HumanMessage(content=(
+                f"Query: {query}\n"
+                f"Complexity Analysis: {json.dumps(complexity_analysis, indent=2)}"
+            )),
         ]
 
+    @staticmethod
+    def _build_step(step: Dict[str, Any]) -> ExecutionStep:
+        return ExecutionStep(
+            step_id=step["step_id"],
+            description=step["description"],
+            query_type=step["query_type"],
+            parameters=step["parameters"],
+            dependencies=step.get("dependencies", []),
+            expected_confidence=step["expected_confidence"],
+        )
+
+    @classmethod
+    def _build_plan(cls, plan_json: Dict[str, Any]) -> ExecutionPlan:
+        steps = [cls._build_step(step) for step in plan_json["steps"]]
+
         return ExecutionPlan(
             steps=steps,
             confidence_estimate=plan_json["confidence_estimate"],
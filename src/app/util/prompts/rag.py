@@ -1,19 +1,21 @@
-from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
 from langchain_core.output_parsers import StrOutputParser
-from langchain_core.prompts import ChatPromptTemplate, PromptTemplate
+from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.runnables import RunnableBranch, RunnableLambda, RunnablePassthrough
 from loguru import logger
 
-from app.util import llm
+from app.util import llm, standalone
 
 _template = """Given the following conversation and a follow up question, rephrase the follow up question to be a standalone question,
-in its original language, which is English.
+in its original language, which is English. Reply with the standalone question only.
 Chat History:
-{chat_history}
-Follow Up Input: {question}
-Standalone question:"""  # noqa: E501
+{chat_history}"""  # noqa: E501
 
-CONDENSE_QUESTION_PROMPT = PromptTemplate.from_template(_template)
+# The follow up question comes alone in the human message, so the semantic tier of
+# the LLM cache compares questions, within the exact template and chat history.
+CONDENSE_QUESTION_PROMPT = ChatPromptTemplate.from_messages(
+    [("system", _template), ("human", "{question}")]
+)
 
 
 def _format_chat_history(chat_history: list[BaseMessage]) -> list:
@@ -24,6 +26,9 @@ def _format_chat_history(chat_history: list[BaseMessage]) -> list:
             buffer.append(message.content)
         elif isinstance(message, AIMessage):
             buffer.append(message.content)
+        elif isinstance(message, SystemMessage):
+            # Rolling summary of turns compacted out of the memory window
+            buffer.append(message.content)
         else:
             logger.warning(
                 f"Unexpected message type in chat_history: {
@@ -32,22 +37,26 @@ def _format_chat_history(chat_history: list[BaseMessage]) -> list:
     return buffer
 
 
+# Condense follow-up question and chat into a standalone_question
+condense_question = (
+    RunnablePassthrough.assign(
+        chat_history=lambda x: _format_chat_history(
+            x["chat_history"]))
+    | CONDENSE_QUESTION_PROMPT
+    | llm.get_llm_instance(chain="condense")
+    | StrOutputParser()
+).with_listeners(on_end=standalone.record_condense)
+
 _search_query = RunnableBranch(
-    # If input includes chat_history, we condense it with the follow-up
-    # question
+    # If input includes chat_history and the follow-up question refers to it,
+    # we condense it with the follow-up question
     (
-        RunnableLambda(lambda x: bool(x.get("chat_history"))).with_config(  # type: ignore
-            run_name="HasChatHistoryCheck"
+        RunnableLambda(standalone.needs_condensation).with_config(  # type: ignore
+            run_name="NeedsCondensationCheck"
         ),
-        # Condense follow-up question and chat into a standalone_question
-        RunnablePassthrough.assign(
-            chat_history=lambda x: _format_chat_history(
-                x["chat_history"]))
-        | CONDENSE_QUESTION_PROMPT
-        | llm.get_llm_instance()
-        | StrOutputParser(),
+        condense_question,
     ),
-    # Else, we have no chat history, so just pass through the question
+    # Else, the question is standalone, so just pass through the question
     RunnableLambda(lambda x: x["question"]),
 )
 
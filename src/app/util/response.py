@@ -1,5 +1,5 @@
 import re
-from typing import Optional, Tuple
+from typing import AsyncIterator, Optional, Tuple
 
 import chainlit as cl
 
@@ -44,22 +44,65 @@ class ResponseParser:
             return str(response)
 
 
-async def display_response_with_thinking_step(
-        response_content: str,
-        step_name: str = "Analysis"):
-    """Display response with thinking as a separate chainlit step"""
+async def stream_response_with_thinking_step(chunks: AsyncIterator[str]) -> str:
+    """
+    Stream a response as it is generated, with thinking as a separate chainlit step.
 
-    thinking, answer = ResponseParser.extract_think_and_answer(
-        response_content)
+    Returns:
+        The full response, think tags included
+    """
+    full_response = ""
+    current_content = ""
+    thinking_step = None
+    main_msg = None
+    in_think_tags = False
 
-    if thinking:
-        step_title = (
-            f"🧠 {step_name} - Reasoning" if "Reasoning" not in step_name else f"🧠 {step_name}")
-        async with cl.Step(name=step_title, type="tool") as thinking_step:
-            thinking_step.output = thinking
+    async for chunk in chunks:
+        full_response += chunk
+        current_content += chunk
 
-        # Then show the main answer
-        await cl.Message(content=answer).send()
-    else:
-        # No thinking process, just show answer
-        await cl.Message(content=answer).send()
+        # Check if we're entering think tags
+        if "<think>" in current_content and not in_think_tags:
+            in_think_tags = True
+            thinking_step = cl.Step(name="🧠 Reasoning...", type="tool")
+            await thinking_step.__aenter__()
+            # Remove the <think> tag from display
+            current_content = current_content.replace("<think>", "")
+            # Non-streaming models send the whole response as one chunk
+            if "</think>" not in current_content:
+                continue
+
+        # Check if we're exiting think tags
+        if "</think>" in current_content and in_think_tags:
+            in_think_tags = False
+            # Extract thinking content and close step
+            think_content, _, answer = current_content.partition("</think>")
+            thinking_step.output = think_content
+            await thinking_step.__aexit__(None, None, None)
+
+            # Start main message for the answer
+            main_msg = cl.Message(content="")
+            current_content = ""  # Reset for answer content
+            if answer:
+                await main_msg.stream_token(answer)
+            continue
+
+        # Stream to appropriate destination
+        if in_think_tags and thinking_step:
+            # Update thinking step (note: chainlit steps don't support
+            # streaming)
+            thinking_step.output = current_content
+        elif main_msg:
+            # Stream to main answer
+            await main_msg.stream_token(chunk)
+        elif not in_think_tags and not main_msg:
+            # No thinking tags detected, create main message if not exists
+            if not main_msg:
+                main_msg = cl.Message(content="")
+            await main_msg.stream_token(chunk)
+
+    # Finalize main message
+    if main_msg:
+        await main_msg.update()
+
+    return full_response
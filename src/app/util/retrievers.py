@@ -1,11 +1,19 @@
+import functools
+import json
+import re
+from typing import Optional
+
 from langchain_neo4j import Neo4jVector
 from langchain_neo4j.vectorstores.neo4j_vector import remove_lucene_chars
 from loguru import logger
 
-from app.core.config import LLMSettings
-from app.util.chains import get_ner_chain
+from app.core.config import LLMSettings, config
+from app.core.singleflight import SingleFlight, normalize
+from app.util.chains import get_default_ner_chain
 from data.store import get_default_store
 
+retrieval_flight = SingleFlight("structured_retriever")
+
 
 def get_graph_instance():
     store = get_default_store()
@@ -30,12 +38,13 @@ def generate_full_text_query(input: str) -> str:
     return full_text_query.strip()
 
 
-def structured_retriever(question: str) -> str:
+def structured_retriever(question: str, entities: Optional[list[str]] = None) -> str:
     """
     Collects the neighborhood of entities mentioned in the question.
 
     Args:
         question: The input question to extract entities from
+        entities: Entities to look up instead of extracting them from the question
 
     Returns:
         Formatted string containing entity neighborhoods, or empty string on error
@@ -48,8 +57,22 @@ def structured_retriever(question: str) -> str:
 
     store = get_default_store()
 
+    if not config.LLM_SINGLE_FLIGHT:
+        return _structured_retriever(store, question, entities)
+
+    # Concurrent sessions asking the same question share one NER + graph lookup.
+    key = (
+        normalize(question),
+        tuple(entities) if entities is not None else None,
+        config.LLM_SETTINGS.model,
+        store.generation,
+    )
+    return retrieval_flight.do(key, _structured_retriever, store, question, entities)
+
+
+def _structured_retriever(store, question: str, entities: Optional[list[str]] = None) -> str:
     try:
-        entity_names = _extract_entities_from_question(question)
+        entity_names = entities if entities is not None else extract_entities(question)
         logger.info(f"Extracted entities: {entity_names}")
 
         if not entity_names:
@@ -63,10 +86,15 @@ def structured_retriever(question: str) -> str:
         return ""
 
 
+def extract_entities(question: str) -> list[str]:
+    """Extract the cleaned entity names of a question with the NER chain."""
+    return _extract_entities_from_question(question)
+
+
 def _extract_entities_from_question(question: str) -> list[str]:
     """Extract named entities from the question using various strategies."""
     try:
-        entities = get_ner_chain().invoke({"input": question})
+        entities = get_default_ner_chain().invoke({"input": question})
         entity_names = _parse_entity_response(entities)
 
         # Fallback: extract from question itself if no entities found
@@ -241,7 +269,46 @@ def _query_entity_neighborhoods(store, entity_names: list[str]) -> str:
     return "\n".join(results).strip()
 
 
+def link_entities(mentions: list[str]) -> list[str]:
+    """
+    Return the mentions that match an entity of the graph.
+
+    Lookups go through the entity full-text index and are cached per store
+    generation, so re-ingestion invalidates them.
+
+    Args:
+        mentions: Candidate entity mentions, e.g. capitalized spans of a question
+
+    Returns:
+        The mentions linked to at least one entity
+    """
+    store = get_default_store()
+    return [m for m in mentions if resolve_entity(store, m) is not None]
+
+
+def resolve_entity(store, mention: str) -> Optional[str]:
+    """Return the id of the best matching entity of a mention, None if there is none."""
+    return _resolve_entity(store, mention.strip(), store.generation)
+
+
+@functools.lru_cache(maxsize=4096)
+def _resolve_entity(store, mention: str, generation: int) -> Optional[str]:
+    if not remove_lucene_chars(mention).strip():
+        return None
+    response = store.graph.query(
+        """
+        CALL db.index.fulltext.queryNodes('entity', $query, {limit: 1})
+        YIELD node
+        RETURN node.id AS id
+        """,
+        {"query": generate_full_text_query(mention)},
+    )
+    return response[0]["id"] if response else None
+
+
+@functools.lru_cache(maxsize=1)
 def hybrid_retriever() -> Neo4jVector:
+    """Return the vector/keyword retriever, sharing one driver across queries."""
     from data.store import get_default_store
 
     store = get_default_store()
@@ -250,10 +317,10 @@ def hybrid_retriever() -> Neo4jVector:
     )
 
 
-def super_retriever(question: str) -> str:
+def super_retriever(question: str, entities: Optional[list[str]] = None) -> str:
     logger.info(f"Search query: {question}")
 
-    structured_data = structured_retriever(question)
+    structured_data = structured_retriever(question, entities)
 
     hybrid_result = hybrid_retriever().similarity_search(question, k=2)
     unstructured_data = [el.page_content for el in hybrid_result]
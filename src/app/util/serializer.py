@@ -0,0 +1,133 @@
+import re
+import threading
+from dataclasses import dataclass
+from typing import Any, Iterable, Optional
+
+from langchain_core.messages import BaseMessage
+
+from app.core.config import config
+from app.util.chains import count_tokens
+
+# Keys of step result data holding text for the LLM, in the order they are rendered.
+TEXT_KEYS = ("result", "synthesis", "answer", "content")
+
+_THINK = re.compile(r"<think>.*?</think>", re.DOTALL | re.IGNORECASE)
+_SPACES = re.compile(r"\s+")
+_HEADER = re.compile(r"^-+ Entity: .* -+$")
+
+serializer_stats = {"prompts": 0, "raw_tokens": 0, "tokens": 0, "duplicate_lines": 0,
+                    "truncated_lines": 0}
+_stats_lock = threading.Lock()
+
+
+@dataclass
+class SerializedResults:
+    """Compact text of step results, with the sizes before and after compaction."""
+
+    text: str
+    raw_tokens: int
+    tokens: int
+    duplicate_lines: int
+    truncated_lines: int
+
+    @property
+    def reduction(self) -> float:
+        """Share of the raw prompt tokens saved by the compact text."""
+        return 1 - self.tokens / self.raw_tokens if self.raw_tokens else 0.0
+
+
+def step_text(data: Any) -> str:
+    """
+    Return the text of a step result for the LLM.
+
+    Messages are reduced to their content without think tags, and result dicts to
+    their text values, leaving out sources, errors and bookkeeping such as the
+    resolved entities or the path search method.
+    """
+    if isinstance(data, BaseMessage):
+        return _THINK.sub("", str(data.content))
+    if isinstance(data, dict):
+        texts = [step_text(data[key]) for key in TEXT_KEYS if data.get(key)]
+        return "\n".join(texts)
+    if data is None:
+        return ""
+    return _THINK.sub("", str(data))
+
+
+def _lines(text: str) -> Iterable[str]:
+    for line in text.splitlines():
+        # Document snippets come with the layout whitespace of their source.
+        line = _SPACES.sub(" ", line).strip()
+        if line:
+            yield line
+
+
+def serialize_results(results: list, max_tokens_per_step: Optional[int] = None) -> SerializedResults:
+    """
+    Serialize step results into compact text for a synthesis prompt.
+
+    Each step is rendered under its step id as lines of text: entity neighborhood
+    lines, path summaries, document snippets or the answer of a previous synthesis.
+    Lines already rendered for an earlier step are dropped, as are entity headers
+    left without lines, and each step is cut at `max_tokens_per_step`.
+
+    Args:
+        results: `StepResult`s, in the order they should be rendered
+        max_tokens_per_step: Token budget of each step, defaults to
+            `config.SYNTHESIS_STEP_MAX_TOKENS`
+
+    Returns:
+        The compact text, with the token counts of the raw results repr it replaces
+    """
+    budget = max_tokens_per_step or config.SYNTHESIS_STEP_MAX_TOKENS
+    seen: set[str] = set()
+    sections, duplicates, truncated = [], 0, 0
+
+    for result in results:
+        kept: list[str] = []
+        header: Optional[str] = None
+        tokens = 0
+        lines = list(_lines(step_text(result.data)))
+        for i, line in enumerate(lines):
+            if _HEADER.match(line):
+                header = line
+                continue
+            if line in seen:
+                duplicates += 1
+                continue
+            block = [header, line] if header else [line]
+            cost = sum(count_tokens(b) for b in block)
+            if tokens + cost > budget:
+                truncated += sum(1 for rest in lines[i:] if not _HEADER.match(rest))
+                kept.append("[truncated]")
+                break
+            seen.add(line)
+            kept.extend(block)
+            tokens += cost
+            header = None
+        if kept:
+            sections.append(f"[{result.step_id}]\n" + "\n".join(kept))
+
+    text = "\n\n".join(sections)
+    serialized = SerializedResults(
+        text=text,
+        raw_tokens=count_tokens(str([r.data for r in results])),
+        tokens=count_tokens(text),
+        duplicate_lines=duplicates,
+        truncated_lines=truncated,
+    )
+    with _stats_lock:
+        serializer_stats["prompts"] += 1
+        serializer_stats["raw_tokens"] += serialized.raw_tokens
+        serializer_stats["tokens"] += serialized.tokens
+        serializer_stats["duplicate_lines"] += duplicates
+        serializer_stats["truncated_lines"] += truncated
+    return serialized
+
+
+def serializer_report() -> dict[str, Any]:
+    """Return the serializer counters with the overall share of prompt tokens saved."""
+    with _stats_lock:
+        stats = dict(serializer_stats)
+    stats["reduction"] = 1 - stats["tokens"] / stats["raw_tokens"] if stats["raw_tokens"] else None
+    return stats
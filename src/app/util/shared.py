@@ -0,0 +1,40 @@
+import functools
+from dataclasses import dataclass
+
+from langchain_core.runnables import Runnable
+from loguru import logger
+
+from app.util.chains import get_default_ner_chain, get_rag_chain, get_summary_chain
+from app.util.planner import QueryPlanner
+from app.util.validators import ResponseValidator
+
+
+@dataclass(frozen=True)
+class SharedChains:
+    """
+    Stateless runnables shared by every chat session of the process.
+
+    None of these hold conversation state (history is passed in with each call), so
+    they are built once and reused. Per-session state lives in `ConversationState`
+    and `AgenticGraphRAG`.
+    """
+
+    rag_chain: Runnable
+    summary_chain: Runnable
+    ner_chain: Runnable
+    planner: QueryPlanner
+    validator: ResponseValidator
+
+
+@functools.lru_cache(maxsize=1)
+def get_shared_chains() -> SharedChains:
+    """Build the shared chains on first use and return the same instance afterwards."""
+    shared = SharedChains(
+        rag_chain=get_rag_chain(),
+        summary_chain=get_summary_chain(),
+        ner_chain=get_default_ner_chain(),
+        planner=QueryPlanner(),
+        validator=ResponseValidator(),
+    )
+    logger.info("Built shared chains")
+    return shared
@@ -0,0 +1,143 @@
+import asyncio
+import threading
+from collections import OrderedDict
+from typing import Any, Optional
+
+from langchain_core.messages import BaseMessage, HumanMessage
+from langchain_core.runnables import Runnable, RunnableConfig, RunnableLambda
+from loguru import logger
+
+from app.core.singleflight import normalize
+from app.util import retrievers, standalone
+from app.util.prompts import rag
+
+speculation_stats = {"speculated": 0, "hits": 0, "misses": 0}
+
+
+class EntityMemory:
+    """
+    Bounded LRU of the entities resolved for recent questions.
+
+    Keyed by conversation and raw question text, so the next turn finds the entities
+    of the previous one through the last human message of its chat history. The
+    entities resolved for a question depend on the history of its conversation, so
+    conversations asking the same question never share them.
+    """
+
+    def __init__(self, max_entries: int = 10_000):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[tuple[str, str], list[str]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def remember(self, session_id: str, question: str, entities: list[str]) -> None:
+        key = (session_id, normalize(question))
+        with self._lock:
+            self._entries[key] = entities
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def previous(self, session_id: str, chat_history: list[BaseMessage]) -> list[str]:
+        """Return the entities of the last human question of the conversation history."""
+        last = next(
+            (m for m in reversed(chat_history) if isinstance(m, HumanMessage)), None
+        )
+        if last is None:
+            return []
+        with self._lock:
+            key = (session_id, normalize(str(last.content)))
+            return list(self._entries.get(key, []))
+
+
+entity_memory = EntityMemory()
+
+
+def _merge(*groups: list[str]) -> list[str]:
+    merged: dict[str, str] = {}
+    for entity in (e for group in groups for e in group):
+        merged.setdefault(entity.lower(), entity)
+    return list(merged.values())
+
+
+def hit_rate() -> Optional[float]:
+    """Return the share of speculative retrievals that were kept."""
+    total = speculation_stats["hits"] + speculation_stats["misses"]
+    return speculation_stats["hits"] / total if total else None
+
+
+def _session_id(config: Optional[RunnableConfig]) -> Optional[str]:
+    return (config or {}).get("configurable", {}).get("session_id")
+
+
+async def _retrieve(question: str, session_id: Optional[str]) -> str:
+    entities = await asyncio.to_thread(retrievers.extract_entities, question)
+    if session_id:
+        entity_memory.remember(session_id, question, entities)
+    return await asyncio.to_thread(retrievers.super_retriever, question, entities)
+
+
+async def _speculate(
+    question: str, history: list[BaseMessage], session_id: Optional[str]
+) -> tuple[list[str], str]:
+    previous = entity_memory.previous(session_id, history) if session_id else []
+    entities = _merge(
+        await asyncio.to_thread(retrievers.extract_entities, question), previous
+    )
+    context = await asyncio.to_thread(retrievers.super_retriever, question, entities)
+    return entities, context
+
+
+async def speculative_context(
+    inputs: dict[str, Any], config: Optional[RunnableConfig] = None
+) -> str:
+    """
+    Retrieve the context of a question, speculating while the question is condensed.
+
+    Standalone questions are retrieved directly. For follow-up questions that need
+    condensation, retrieval starts right away on the raw question with its
+    entities plus the entities of the previous turn, while the LLM condenses the
+    chat history into a standalone question. The speculative context is kept if the
+    entities of the standalone question are among the speculated ones; otherwise
+    retrieval is re-run for the standalone question.
+
+    The entities of the previous turn are only known for conversations passing their
+    id as the `session_id` configurable of the run.
+    """
+    question, history = inputs["question"], inputs.get("chat_history")
+    session_id = _session_id(config)
+    if not await asyncio.to_thread(standalone.needs_condensation, inputs):
+        return await _retrieve(question, session_id)
+
+    speculation = asyncio.ensure_future(_speculate(question, history, session_id))
+    try:
+        condensed = await rag.condense_question.ainvoke(inputs)
+        resolved = await asyncio.to_thread(retrievers.extract_entities, condensed)
+        speculated, context = await speculation
+    finally:
+        speculation.cancel()
+
+    if session_id:
+        entity_memory.remember(session_id, question, resolved)
+    hit = {e.lower() for e in resolved} <= {e.lower() for e in speculated}
+    speculation_stats["speculated"] += 1
+    speculation_stats["hits" if hit else "misses"] += 1
+    logger.info(
+        f"Speculative retrieval {'hit' if hit else 'miss'} :: resolved {resolved}, "
+        f"speculated {speculated}, hit rate {hit_rate():.2f}"
+    )
+    if hit:
+        return context
+    return await asyncio.to_thread(retrievers.super_retriever, condensed, resolved)
+
+
+def _sequential_context(inputs: dict[str, Any]) -> str:
+    return retrievers.super_retriever(rag._search_query.invoke(inputs))
+
+
+def get_context_retriever(speculative: bool) -> Runnable:
+    """Return the runnable retrieving the context of a rag chain input."""
+    if speculative:
+        return RunnableLambda(
+            _sequential_context, afunc=speculative_context, name="SpeculativeContext"
+        )
+    return rag._search_query | retrievers.super_retriever
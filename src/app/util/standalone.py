@@ -0,0 +1,149 @@
+import re
+import threading
+import time
+from typing import Any, Callable, Optional
+
+from loguru import logger
+
+from app.core.config import config
+
+# Words that only make sense with an antecedent from the chat history.
+ANAPHORA = frozenset(
+    """
+    he him his himself she her hers herself it its itself they them their theirs
+    themselves this that these those there then former latter same other others
+    else also too either neither one ones
+    """.split()
+)
+
+# Openers of elliptical follow-ups such as "And Lucy?" or "What about Whitby?".
+ELLIPTICAL_OPENERS = ("and ", "but ", "so ", "or ", "what about ", "how about ", "why not")
+
+# Capitalized words that start questions or requests rather than name entities.
+FUNCTION_WORDS = frozenset(
+    """
+    who whom whose what which when where why how is are was were do does did can
+    could would should will shall may might has have had tell describe explain list
+    give name show find compare contrast trace analyze analyse summarize discuss
+    the a an in on of for to from with by at and or i
+    """.split()
+)
+
+_WORD = re.compile(r"[A-Za-z][\w'-]*")
+
+condense_stats = {"skipped": 0, "condensed": 0, "condense_runs": 0, "condense_seconds": 0.0,
+                  "classify_seconds": 0.0}
+_stats_lock = threading.Lock()
+
+
+def mentions(question: str) -> list[str]:
+    """
+    Return the candidate entity mentions of a question.
+
+    Mentions are runs of capitalized words, such as "Mina Harker", ignoring the
+    capitalized question words that start a sentence.
+    """
+    spans: list[list[str]] = []
+    previous_end = -1
+    for match in _WORD.finditer(question):
+        word = match.group()
+        if not word[0].isupper() or word.lower() in FUNCTION_WORDS:
+            previous_end = -1
+            continue
+        if spans and match.start() == previous_end + 1:
+            spans[-1].append(word)
+        else:
+            spans.append([word])
+        previous_end = match.end()
+    return [" ".join(span) for span in spans]
+
+
+def _link(candidates: list[str]) -> list[str]:
+    from app.util.retrievers import link_entities
+
+    return link_entities(candidates)
+
+
+def classify(
+    question: str, linker: Optional[Callable[[list[str]], list[str]]] = None
+) -> tuple[bool, str]:
+    """
+    Decide locally whether a follow-up question is already standalone.
+
+    A question is standalone when it has no pronoun or other reference to the chat
+    history, does not open like an elliptical follow-up, and mentions at least one
+    entity known to the graph. Any doubt falls back to condensation.
+
+    Args:
+        question: The follow-up question
+        linker: Returns the mentions linked to graph entities, defaults to the
+            entity full-text index
+
+    Returns:
+        Whether the question is standalone, and the reason of the decision
+    """
+    words = [w.lower() for w in _WORD.findall(question)]
+    references = sorted(ANAPHORA.intersection(words))
+    if references:
+        return False, f"references {references}"
+    if len(words) < 3 or question.strip().lower().startswith(ELLIPTICAL_OPENERS):
+        return False, "elliptical"
+
+    candidates = mentions(question)
+    if not candidates:
+        return False, "no entity mention"
+    try:
+        linked = (linker or _link)(candidates)
+    except Exception as e:
+        logger.warning(f"Entity linking failed, condensing: {e!r}")
+        return False, "linking failed"
+    if not linked:
+        return False, f"no linked entity in {candidates}"
+    return True, f"linked {linked}"
+
+
+def needs_condensation(inputs: dict[str, Any]) -> bool:
+    """
+    Return whether a rag chain input must be condensed before retrieval.
+
+    Inputs without chat history never are; with `config.SKIP_CONDENSE`, neither are
+    follow-ups classified as standalone. Decisions are logged and counted in
+    `condense_stats`.
+    """
+    if not inputs.get("chat_history"):
+        return False
+    if not config.SKIP_CONDENSE:
+        return True
+
+    started = time.perf_counter()
+    standalone, reason = classify(inputs["question"])
+    elapsed = time.perf_counter() - started
+    with _stats_lock:
+        condense_stats["skipped" if standalone else "condensed"] += 1
+        condense_stats["classify_seconds"] += elapsed
+    logger.info(
+        f"Condense {'skipped' if standalone else 'needed'} :: {reason} "
+        f"({elapsed * 1000:.1f}ms) :: {inputs['question']!r}"
+    )
+    return not standalone
+
+
+def record_condense(run: Any) -> None:
+    """Listener recording the latency of a condensation run."""
+    if run.end_time is None:
+        return
+    with _stats_lock:
+        condense_stats["condense_runs"] += 1
+        condense_stats["condense_seconds"] += (run.end_time - run.start_time).total_seconds()
+
+
+def condense_report() -> dict[str, Any]:
+    """Return the condense counters and the latency saved by skipped condensations."""
+    with _stats_lock:
+        stats = dict(condense_stats)
+    average = stats["condense_seconds"] / stats["condense_runs"] if stats["condense_runs"] else None
+    return {
+        **stats,
+        "average_condense_seconds": average,
+        "estimated_saved_seconds": stats["skipped"] * average if average is not None else None,
+    }
@@ -1,8 +1,7 @@
 from typing import Any, Dict, Optional
 
-from util.llm import get_ollama_instance
-
 from app.core.config import LLMSettings
+from app.util.llm import get_ollama_instance
 from app.util.planner import FinalResult, StepResult
 
 
@@ -11,7 +10,7 @@ class ResponseValidator:
     """Validates quality and completeness of agentic responses."""
 
     def __init__(self, settings: Optional[LLMSettings] = None):
-        self.llm = get_ollama_instance(settings)
+        self.llm = get_ollama_instance(settings, chain="validator")
 
     async def validate_step_result(self, result: StepResult) -> float:
         """Validate individual step result quality."""
@@ -6,13 +6,14 @@ from .graph_transformer_settings import (
     dracula_settings,
     ms_graphrag_settings,
 )
-from .processors import semantic_split, split
+from .processors import batched, semantic_split, split
 from .store import Neo4jGraph, Neo4jVector, Store
 
 __all__ = [
     "Neo4jVector",
     "Store",
     "Neo4jGraph",
+    "batched",
     "semantic_split",
     "split",
     "GraphTransformerSettings",
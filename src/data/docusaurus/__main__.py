@@ -1,20 +1,28 @@
 import os
-
-# from datetime import date
-from typing import Generator
+from datetime import date
+from typing import Generator, Optional
 
 import click
 from langchain.docstore.document import Document
+from loguru import logger
 
 from data.docusaurus import extract, transform
+from data.processors import batched
 from data.store import get_default_store
 
 
-def pipeline(pages: Generator[Document, None, None]) -> None:
+def pipeline(
+    pages: Generator[Document, None, None],
+    batch_size: int = 16,
+    max_workers: int = 10,
+) -> None:
     db = get_default_store()
-    pages_list = list(pages)
-    if docs := transform.as_graph_documents(pages_list):
-        db.store_graph(docs)
+    for i, batch in enumerate(batched(pages, batch_size), 1):
+        if docs := transform.as_graph_documents(batch, max_workers):
+            logger.info(
+                f"Batch {i} :: storing {len(docs)} graph documents from {len(batch)} pages"
+            )
+            db.store_graph(docs)
 
 
 @click.command()
@@ -32,9 +40,41 @@ def pipeline(pages: Generator[Document, None, None]) -> None:
     required=False,
     default=lambda: os.environ.get("DOCS_FILTER", [""]),
 )
-def ingest(base_url: str, filter_urls: list[str]) -> None:
-    """Ingest files from folder as documents."""
-    pipeline(extract.load_pages(base_url, filter_urls))
+@click.option(
+    "-s",
+    "--since",
+    "since",
+    type=click.DateTime(formats=[extract.DATE_FORMAT]),
+    required=False,
+    default=lambda: os.environ.get("DOCS_SINCE", "0001-01-01"),
+    help="Only re-process pages whose sitemap lastmod is on or after this date.",
+)
+@click.option(
+    "-b",
+    "--batch-size",
+    "batch_size",
+    type=int,
+    required=False,
+    default=lambda: int(os.environ.get("DOCS_BATCH_SIZE", 16)),
+)
+@click.option(
+    "-w",
+    "--max-workers",
+    "max_workers",
+    type=int,
+    required=False,
+    default=lambda: int(os.environ.get("DOCS_MAX_WORKERS", 10)),
+)
+def ingest(
+    base_url: str,
+    filter_urls: list[str],
+    since: Optional[date],
+    batch_size: int,
+    max_workers: int,
+) -> None:
+    """Ingest pages from a Docusaurus site as graph documents."""
+    since_date = since.date() if since else date.min
+    pipeline(extract.load_pages(base_url, filter_urls, since_date), batch_size, max_workers)
 
 
 if __name__ == "__main__":
@@ -1,27 +1,100 @@
-from typing import Generator
+from datetime import date, datetime
+from typing import Any, Generator, Iterator, Optional
 
 from langchain_community.document_loaders import DocusaurusLoader
 from langchain_core.documents import Document
+from loguru import logger
+
+from data.processors import batched
+
+DATE_FORMAT: str = "%Y-%m-%d"
+
+
+def _lastmod_date(lastmod: Optional[str]) -> Optional[date]:
+    """Parse a sitemap `lastmod` (W3C datetime) into a date, None if missing or invalid."""
+    if not lastmod:
+        return None
+    try:
+        return datetime.fromisoformat(lastmod.strip()).date()
+    except ValueError:
+        return None
+
+
+class IncrementalDocusaurusLoader(DocusaurusLoader):
+    """
+    DocusaurusLoader that skips pages by sitemap `lastmod` and fetches in blocks.
+
+    Sitemap entries with a `lastmod` older than `since` are dropped before any page is
+    fetched; entries without a `lastmod` are always kept. Pages are fetched
+    `fetch_blocksize` at a time so memory stays bounded on large sites.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        since: date = date.min,
+        fetch_blocksize: int = 32,
+        **kwargs: Any,
+    ):
+        super().__init__(url, **kwargs)
+        self.since = since
+        self.fetch_blocksize = fetch_blocksize
+
+    def parse_sitemap(self, soup: Any, *, depth: int = 0) -> list[dict]:
+        els = super().parse_sitemap(soup, depth=depth)
+        if depth > 0 or self.since == date.min:
+            return els
+
+        changed = [
+            el
+            for el in els
+            if (lastmod := _lastmod_date(el.get("lastmod"))) is None or lastmod >= self.since
+        ]
+        logger.info(
+            f"Sitemap :: {len(changed)}/{len(els)} pages modified since {self.since}"
+        )
+        return changed
+
+    def lazy_load(self) -> Iterator[Document]:
+        if self.is_local:
+            yield from super().lazy_load()
+            return
+
+        soup = self._scrape(self.web_path, parser="xml")
+        els = [el for el in self.parse_sitemap(soup) if "loc" in el]
+
+        for block in batched(els, self.fetch_blocksize):
+            results = self.scrape_all([el["loc"].strip() for el in block])
+            for el, result in zip(block, results):
+                yield Document(
+                    page_content=self.parsing_function(result),
+                    metadata=self.meta_function(el, result),
+                )
 
 
 def get_docusaurus_client(
         base_url: str,
-        filter_urls: list[str]) -> DocusaurusLoader:
+        filter_urls: list[str],
+        since: date = date.min) -> DocusaurusLoader:
     """
     Returns a DocusaurusLoader configured to scrape documentation from the specified base URL.
 
     Parameters:
     - base_url (str): The base URL of the Docusaurus website.
     - filter_urls (List[str]): List of URLs to filter and scrape.
+    - since (date): Only pages with a sitemap `lastmod` on or after this date are loaded.
 
     Returns:
     - DocusaurusLoader: Configured loader instance.
     """
-    return DocusaurusLoader(url=base_url, filter_urls=filter_urls)
+    return IncrementalDocusaurusLoader(
+        url=base_url, filter_urls=filter_urls, since=since
+    )
 
 
 def load_pages(
-        base_url: str, filter_urls: list[str]) -> Generator[Document, None, None]:
-    docusaurus_client = get_docusaurus_client(base_url, filter_urls)
-    results = docusaurus_client.aload()
-    yield from results
+        base_url: str,
+        filter_urls: list[str],
+        since: date = date.min) -> Generator[Document, None, None]:
+    docusaurus_client = get_docusaurus_client(base_url, filter_urls, since)
+    yield from docusaurus_client.lazy_load()
@@ -1,12 +1,71 @@
+import functools
+import hashlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
 from langchain.docstore.document import Document
 from langchain_community.graphs.graph_document import GraphDocument
 from langchain_experimental.graph_transformers import LLMGraphTransformer
+from loguru import logger
+from tqdm import tqdm
+
+from data.processors import split
 
 
-def as_graph_documents(pages: list[Document]) -> list[GraphDocument]:
+@functools.lru_cache(maxsize=1)
+def get_llm_transformer() -> LLMGraphTransformer:
     from app.util import get_llm_instance
 
     llm = get_llm_instance()
-    llm_transformer = LLMGraphTransformer(llm=llm)
-    graph_docs = llm_transformer.convert_to_graph_documents(pages)
-    return graph_docs
+    return LLMGraphTransformer(llm=llm)
+
+
+def chunk(page: Document) -> list[Document]:
+    """Split a page into chunks, tagging each with its checksum and the page metadata."""
+    return [
+        Document(
+            page_content=part.page_content,
+            metadata={
+                "content_checksum": hashlib.md5(part.page_content.encode()).hexdigest(),
+                **page.metadata,
+            },
+        )
+        for part in split(page)
+    ]
+
+
+def process_document(
+    document: Document, llm_transformer: LLMGraphTransformer
+) -> list[GraphDocument]:
+    return llm_transformer.convert_to_graph_documents([document])
+
+
+def as_graph_documents(
+    pages: list[Document], max_workers: int = 10
+) -> list[GraphDocument]:
+    """Chunk pages and extract GraphDocuments from the chunks with bounded concurrency."""
+    docs = [doc for page in pages for doc in chunk(page)]
+    if not docs:
+        return []
+
+    llm_transformer = get_llm_transformer()
+    graph_documents = []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(
+                process_document,
+                doc,
+                llm_transformer) for doc in docs]
+
+        for future in tqdm(
+            as_completed(futures),
+            total=len(futures),
+            desc="Processing documents for neo4j",
+            leave=False,
+        ):
+            try:
+                graph_document = future.result()
+                graph_documents.extend(graph_document)
+            except Exception as e:
+                logger.error(f"Error processing document: {e}")
+
+    return graph_documents
@@ -1,7 +1,12 @@
+from itertools import islice
+from typing import Iterable, Iterator, TypeVar
+
 from langchain_core.documents import Document
 from langchain_experimental.text_splitter import SemanticChunker
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 
+T = TypeVar("T")
+
 """Recursive splitter of text to max chunk size with overlap."""
 text_splitter = RecursiveCharacterTextSplitter(
     chunk_size=512,
@@ -29,3 +34,12 @@ def semantic_split(doc: Document) -> list[Document]:
     """split using semantic similarity"""
     chunks = semantic_text_splitter.split_documents([doc])
     return chunks
+
+
+def batched(items: Iterable[T], size: int) -> Iterator[list[T]]:
+    """Lazily group items into lists of at most `size` elements."""
+    if size < 1:
+        raise ValueError("batch size must be at least 1")
+    iterator = iter(items)
+    while batch := list(islice(iterator, size)):
+        yield batch
@@ -1,13 +1,24 @@
+import os
+from typing import Optional
+
 import click
 from loguru import logger
 
+from data.scrape.cache import CrawlCache
 from data.scrape.extract import DocURLs
-from data.scrape.scrape_etl import ScrapeETL
+from data.scrape.scrape_etl import DEFAULT_BATCH_SIZE, ScrapeETL
 from data.store import StoreEnum
 
 
-def pipeline(docURLs: DocURLs, database: StoreEnum) -> None:
-    etl = ScrapeETL(docURLs, database)
+def pipeline(
+    docURLs: DocURLs,
+    database: StoreEnum,
+    cache_dir: Optional[str] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    main_content: bool = False,
+) -> None:
+    cache = CrawlCache(cache_dir) if cache_dir else None
+    etl = ScrapeETL(docURLs, database, cache, batch_size, main_content)
     etl.run()
 
 
@@ -23,12 +34,55 @@ def pipeline(docURLs: DocURLs, database: StoreEnum) -> None:
     type=click.Choice([e.value for e in StoreEnum]),
     default=StoreEnum.neo4j,
 )
-def scrape(doc_urls: str, database: str) -> None:
+@click.option(
+    "-c",
+    "--cache-dir",
+    "cache_dir",
+    type=str,
+    required=False,
+    default=lambda: os.environ.get("SCRAPE_CACHE_DIR", ".scrape_cache"),
+)
+@click.option(
+    "--no-cache",
+    "no_cache",
+    is_flag=True,
+    default=False,
+    help="Re-scrape every page, ignoring the crawl cache.",
+)
+@click.option(
+    "-b",
+    "--batch-size",
+    "batch_size",
+    type=int,
+    required=False,
+    default=lambda: int(os.environ.get("SCRAPE_BATCH_SIZE", DEFAULT_BATCH_SIZE)),
+)
+@click.option(
+    "-m",
+    "--main-content",
+    "main_content",
+    is_flag=True,
+    default=False,
+    help="Keep only the main content of pages, dropping nav/aside/footer boilerplate.",
+)
+def scrape(
+    doc_urls: str,
+    database: str,
+    cache_dir: str,
+    no_cache: bool,
+    batch_size: int,
+    main_content: bool,
+) -> None:
     """
     Command-line interface for scraping and processing documentation.
 
     Args:
         doc_urls (str): The name of the documentation source to scrape.
+        database (str): The target store.
+        cache_dir (str): Directory of the crawl cache used for incremental re-crawls.
+        no_cache (bool): Disable the crawl cache.
+        batch_size (int): Number of documents transformed and loaded per batch.
+        main_content (bool): Use main-content extraction instead of the full page text.
     """
     try:
         doc_urls_enum = DocURLs[doc_urls]
@@ -41,7 +95,13 @@ def scrape(doc_urls: str, database: str) -> None:
         logger.error(f"{database} is not supported")
         return
 
-    pipeline(doc_urls_enum, db_enum)
+    pipeline(
+        doc_urls_enum,
+        db_enum,
+        None if no_cache else cache_dir,
+        batch_size,
+        main_content,
+    )
 
 
 if __name__ == "__main__":
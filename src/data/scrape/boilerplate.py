@@ -0,0 +1,90 @@
+import re
+import time
+from typing import Any
+
+from bs4 import BeautifulSoup, FeatureNotFound, Tag
+
+BOILERPLATE_TAGS: list[str] = [
+    "nav",
+    "aside",
+    "footer",
+    "header",
+    "script",
+    "style",
+    "noscript",
+    "template",
+    "svg",
+    "iframe",
+    "form",
+]
+BOILERPLATE_ROLES: list[str] = ["navigation", "banner", "contentinfo", "complementary"]
+HEADING_TAGS: list[str] = ["h1", "h2", "h3", "h4", "h5", "h6"]
+
+
+def _parse(html: str) -> BeautifulSoup:
+    """Parse with the C-based `lxml` backend, falling back to `html.parser`."""
+    try:
+        return BeautifulSoup(html, "lxml")
+    except FeatureNotFound:
+        return BeautifulSoup(html, "html.parser")
+
+
+def _main_element(soup: BeautifulSoup) -> Tag | BeautifulSoup:
+    for candidate in (
+        soup.find("main"),
+        soup.find(attrs={"role": "main"}),
+        soup.find("article"),
+        soup.body,
+    ):
+        if isinstance(candidate, Tag):
+            return candidate
+    return soup
+
+
+def _clean_text(text: str) -> str:
+    lines = (line.strip() for line in text.splitlines())
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(lines)).strip()
+
+
+def extract_main_content(html: str) -> dict[str, Any]:
+    """
+    Extract the main content of a documentation page.
+
+    Drops navigation, sidebars, footers, scripts and similar boilerplate and keeps the
+    text of the `<main>`/`<article>` element. Headings are kept as markdown-style
+    strings so the page structure survives as metadata.
+
+    Args:
+        html (str): The raw page source.
+
+    Returns:
+        dict[str, Any]: `content`, `title`, `headings` and the `raw_length`, `length` and
+        `parse_time_ms` statistics of the extraction.
+    """
+    start = time.perf_counter()
+
+    soup = _parse(html)
+    title = soup.title.string if soup.title and soup.title.string else "No title"
+    raw_length = len(soup.get_text())
+
+    for element in soup.find_all(BOILERPLATE_TAGS):
+        element.decompose()
+    for element in soup.find_all(attrs={"role": BOILERPLATE_ROLES}):
+        element.decompose()
+
+    main = _main_element(soup)
+    headings = [
+        f"{'#' * int(heading.name[1])} {heading.get_text(' ', strip=True)}"
+        for heading in main.find_all(HEADING_TAGS)
+        if heading.get_text(strip=True)
+    ]
+    content = _clean_text(main.get_text())
+
+    return {
+        "content": content,
+        "title": title,
+        "headings": headings,
+        "raw_length": raw_length,
+        "length": len(content),
+        "parse_time_ms": round((time.perf_counter() - start) * 1000, 2),
+    }
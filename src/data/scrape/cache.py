@@ -0,0 +1,81 @@
+import hashlib
+import json
+import os
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Optional
+
+
+def content_hash(content: str) -> str:
+    """Return the MD5 checksum of scraped page content."""
+    return hashlib.md5(content.encode()).hexdigest()
+
+
+@dataclass
+class CacheEntry:
+    """Cached state of a single crawled URL."""
+
+    url: str
+    content_hash: str
+    body: str
+    metadata: dict[str, Any]
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    links: list[str] = field(default_factory=list)
+    fetched_at: float = field(default_factory=time.time)
+
+
+class CrawlCache:
+    """
+    On-disk crawl cache keyed by URL.
+
+    Every URL is stored as one JSON file holding the scraped body, the HTTP
+    validators (ETag/Last-Modified) and a content hash, so a re-crawl can send
+    conditional requests and skip pages that did not change.
+
+    Attributes:
+        directory (Path): Directory holding the cache files.
+    """
+
+    def __init__(self, directory: str | Path):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, url: str) -> Path:
+        key = hashlib.sha256(url.encode()).hexdigest()
+        return self.directory / f"{key}.json"
+
+    def get(self, url: str) -> Optional[CacheEntry]:
+        """Return the cached entry for the URL, or None if missing or unreadable."""
+        path = self._path(url)
+        if not path.exists():
+            return None
+        try:
+            return CacheEntry(**json.loads(path.read_text()))
+        except (OSError, TypeError, json.JSONDecodeError):
+            return None
+
+    def put(self, entry: CacheEntry) -> None:
+        """Write the entry atomically so an interrupted crawl never leaves partial files."""
+        path = self._path(entry.url)
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(asdict(entry)))
+        os.replace(tmp_path, path)
+
+    def update(self, url: str, **fields: Any) -> None:
+        """Update fields of an existing entry, no-op if the URL is not cached."""
+        if entry := self.get(url):
+            for key, value in fields.items():
+                setattr(entry, key, value)
+            self.put(entry)
+
+    def conditional_headers(self, url: str) -> dict[str, str]:
+        """Return `If-None-Match`/`If-Modified-Since` headers for the cached URL."""
+        headers: dict[str, str] = {}
+        if entry := self.get(url):
+            if entry.etag:
+                headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                headers["If-Modified-Since"] = entry.last_modified
+        return headers
@@ -1,13 +1,18 @@
 import time
 from enum import Enum
-from typing import Any, Generator
+from typing import Any, Generator, Iterable, Optional
 
+import httpx
 from bs4 import BeautifulSoup
+from loguru import logger
 from selenium import webdriver
 from selenium.webdriver.chrome.webdriver import WebDriver
 from selenium.webdriver.common.by import By
 from tqdm import tqdm
 
+from data.scrape.boilerplate import extract_main_content
+from data.scrape.cache import CacheEntry, CrawlCache, content_hash
+
 
 class DocURLs(Enum):
     angular = [
@@ -35,21 +40,50 @@ class DocScraper:
     Attributes:
         doc_urls (DocURLs): An enumeration of documentation URLs to scrape.
         driver (WebDriver): The Selenium WebDriver instance for browsing web pages.
+        cache (Optional[CrawlCache]): Crawl cache used to skip unchanged pages.
+        main_content (bool): Keep only the main content of pages, dropping boilerplate.
+        stats (dict[str, float]): Counters of fetched, not modified, unchanged and changed pages
+            plus main-content extraction totals.
 
     Methods:
         scrape(): Public method to scrape content from the specified documentation URLs.
         close_driver(): Closes the Selenium WebDriver instance.
     """
 
-    def __init__(self, doc_urls: DocURLs):
+    def __init__(
+        self,
+        doc_urls: DocURLs,
+        cache: Optional[CrawlCache] = None,
+        main_content: bool = False,
+    ):
         """
         Initializes the DocScraper with the specified documentation URLs.
 
         Args:
             doc_urls (DocURLs): An enumeration value specifying the documentation URLs to scrape.
+            cache (Optional[CrawlCache]): When set, pages are revalidated with conditional
+                requests and only changed pages are yielded. Changed pages are only cached
+                once `mark_loaded` reports them loaded.
+            main_content (bool): Strip nav/aside/footer/script elements and keep headings as
+                metadata instead of the full page text.
         """
         self.doc_urls = doc_urls
         self.driver = self._initialize_driver()
+        self.cache = cache
+        self.main_content = main_content
+        self.http = httpx.Client(follow_redirects=True, timeout=10.0) if cache else None
+        self.stats = {
+            "fetched": 0,
+            "not_modified": 0,
+            "unchanged": 0,
+            "changed": 0,
+            "raw_chars": 0,
+            "kept_chars": 0,
+            "parse_ms": 0.0,
+        }
+        self._not_modified: set[str] = set()
+        # Entries of changed pages, written to the cache once the pages are loaded.
+        self._pending: dict[str, CacheEntry] = {}
 
     def _initialize_driver(self) -> WebDriver:
         """Initializes and returns a Selenium WebDriver instance with headless configuration."""
@@ -79,6 +113,9 @@ class DocScraper:
         self.driver.get(url)
         time.sleep(2)  # Wait for the page to load
 
+        if self.main_content:
+            return self._extract_main_content(url, self.driver.page_source)
+
         soup = BeautifulSoup(self.driver.page_source, "html.parser")
         page_content = soup.get_text()
         metadata = {
@@ -91,6 +128,119 @@ class DocScraper:
             "metadata": metadata,
         }
 
+    def _extract_main_content(self, url: str, html: str) -> dict[str, Any]:
+        """Extracts the main content of the page source, logging parse time and size reduction."""
+        extracted = extract_main_content(html)
+        reduction = (
+            1 - extracted["length"] / extracted["raw_length"] if extracted["raw_length"] else 0
+        )
+        logger.debug(
+            f"Extracted {url} :: {extracted['raw_length']} -> {extracted['length']} chars "
+            f"({reduction:.0%} smaller) in {extracted['parse_time_ms']} ms"
+        )
+        self.stats["raw_chars"] += extracted["raw_length"]
+        self.stats["kept_chars"] += extracted["length"]
+        self.stats["parse_ms"] += extracted["parse_time_ms"]
+        metadata = {
+            "title": extracted["title"],
+            "url": url,
+            "length": extracted["length"],
+            "raw_length": extracted["raw_length"],
+            "headings": extracted["headings"],
+            "parse_time_ms": extracted["parse_time_ms"],
+        }
+        return {
+            "content": extracted["content"],
+            "metadata": metadata,
+        }
+
+    def _revalidate(self, url: str) -> Optional[httpx.Headers]:
+        """
+        Sends a conditional request for the URL.
+
+        Returns:
+            Optional[httpx.Headers]: The response headers, or None if the server answered
+            `304 Not Modified`. Network errors fall through to a full scrape.
+        """
+        if self.cache is None or self.http is None:
+            return httpx.Headers()
+        try:
+            response = self.http.get(url, headers=self.cache.conditional_headers(url))
+        except httpx.HTTPError as e:
+            logger.warning(f"Conditional request failed for {url}: {e}")
+            return httpx.Headers()
+        if response.status_code == httpx.codes.NOT_MODIFIED:
+            return None
+        return response.headers
+
+    def _scrape_page(self, url: str) -> Optional[dict[str, Any]]:
+        """Scrapes the URL, returning None when the crawl cache shows it is unchanged."""
+        if self.cache is None:
+            self.stats["fetched"] += 1
+            return self._scrape_page_content(url)
+
+        cached = self.cache.get(url)
+        headers = self._revalidate(url)
+        if headers is None:
+            self.stats["not_modified"] += 1
+            self._not_modified.add(url)
+            return None
+
+        self.stats["fetched"] += 1
+        page = self._scrape_page_content(url)
+        page_hash = content_hash(page["content"])
+        etag = headers.get("etag")
+        last_modified = headers.get("last-modified")
+
+        if cached and cached.content_hash == page_hash:
+            # Validators changed (or were missing) but the content did not.
+            self.stats["unchanged"] += 1
+            self.cache.update(url, etag=etag, last_modified=last_modified)
+            return None
+
+        self.stats["changed"] += 1
+        self._pending[url] = (
+            CacheEntry(
+                url=url,
+                content_hash=page_hash,
+                body=page["content"],
+                metadata=page["metadata"],
+                etag=etag,
+                last_modified=last_modified,
+                links=cached.links if cached else [],
+            )
+        )
+        return page
+
+    def _subpage_links(self, url: str, subpage_patterns: list[str]) -> list[str | None]:
+        """Returns the subpage links of the URL, reusing cached links for unmodified pages."""
+        if self.cache is None:
+            return self._get_subpage_links(url, subpage_patterns)
+
+        cached = self.cache.get(url)
+        if url in self._not_modified and cached and cached.links:
+            return list(cached.links)
+
+        links = self._get_subpage_links(url, subpage_patterns)
+        if url in self._pending:
+            self._pending[url].links = [link for link in links if link]
+        else:
+            self.cache.update(url, links=[link for link in links if link])
+        return links
+
+    def mark_loaded(self, urls: Iterable[str]) -> None:
+        """
+        Writes the crawl cache entries of changed pages whose documents were loaded.
+
+        Pages that fail to transform or load are never marked, so the next crawl
+        scrapes them again.
+        """
+        if self.cache is None:
+            return
+        for url in urls:
+            if entry := self._pending.pop(url, None):
+                self.cache.put(entry)
+
     def _scrape_angular(
             self, urls: list[str]) -> Generator[dict[str, Any], None, None]:
         """Scrapes content specifically from Angular documentation URLs."""
@@ -112,10 +262,11 @@ class DocScraper:
     ) -> Generator[dict[str, Any], None, None]:
         """Scrapes content generically based on the given URLs and subpage patterns."""
         for url in tqdm(urls, desc="Scraping main pages"):
-            main_page_content = self._scrape_page_content(url)
-            yield main_page_content
+            main_page_content = self._scrape_page(url)
+            if main_page_content is not None:
+                yield main_page_content
 
-            subpage_links = self._get_subpage_links(url, subpage_patterns)
+            subpage_links = self._subpage_links(url, subpage_patterns)
             for subpage_url in tqdm(
                     subpage_links,
                     desc="Scraping subpages",
@@ -123,8 +274,11 @@ class DocScraper:
                 if subpage_url is None:
                     continue
 
-                subpage_content = self._scrape_page_content(subpage_url)
-                yield subpage_content
+                subpage_content = self._scrape_page(subpage_url)
+                if subpage_content is not None:
+                    yield subpage_content
+
+        logger.info(f"Crawl stats :: {self.stats}")
 
     def scrape(self) -> Generator[dict[str, Any], None, None]:
         """
@@ -138,7 +292,7 @@ class DocScraper:
         """
         if self.doc_urls == DocURLs.angular:
             yield from self._scrape_angular(self.doc_urls.value)
-        if self.doc_urls == DocURLs.react:
+        elif self.doc_urls == DocURLs.react:
             yield from self._scrape_react(self.doc_urls.value)
         else:
             supported_sources = ", ".join([e.name for e in DocURLs])
@@ -148,5 +302,7 @@ class DocScraper:
             )
 
     def close_driver(self):
-        """Closes the Selenium WebDriver instance."""
+        """Closes the Selenium WebDriver instance and the revalidation HTTP client."""
         self.driver.quit()
+        if self.http is not None:
+            self.http.close()
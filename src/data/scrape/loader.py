@@ -1,12 +1,14 @@
 import os
-from typing import Union
+from typing import Optional, Union
 
 from langchain_community.graphs.graph_document import GraphDocument
-from langchain_community.vectorstores import Redis
 from langchain_community.vectorstores.neo4j_vector import SearchType
 from langchain_core.documents import Document
+from redis import Redis
 
-from data.store import get_default_store
+from app.core.config import config
+from data.scrape.redis_loader import RedisBulkLoader
+from data.store import get_cached_embeddings, get_default_store
 
 
 class DataLoader:
@@ -16,19 +18,36 @@ class DataLoader:
 
     def __init__(self) -> None:
         self.db = get_default_store()
+        self._redis_loader: Optional[RedisBulkLoader] = None
+
+    @property
+    def redis_loader(self) -> RedisBulkLoader:
+        if self._redis_loader is None:
+            self._redis_loader = RedisBulkLoader(
+                client=Redis.from_url(config.REDIS_URL),
+                embeddings=get_cached_embeddings(),
+                index_name=config.REDIS_INDEX_NAME,
+                batch_size=config.REDIS_BATCH_SIZE,
+            )
+        return self._redis_loader
 
     def load(self,
              transformed_data: Union[list[GraphDocument],
                                      list[Document]]) -> None:
         """
-        Loads the transformed data into the target storage.
+        Loads a batch of transformed data into the target storage.
+
+        Batches are homogeneous (the Transformer emits one type per database), so only the
+        first element is inspected to pick the target.
 
         Args:
-            transformed_data (Union[List[GraphDocument], List[Document]]): The data to load.
+            transformed_data (Union[List[GraphDocument], List[Document]]): The batch to load.
         """
-        if all(isinstance(doc, GraphDocument) for doc in transformed_data):
+        if not transformed_data:
+            return
+        if isinstance(transformed_data[0], GraphDocument):
             self._load_graph_documents(transformed_data)  # type: ignore
-        elif all(isinstance(doc, Document) for doc in transformed_data):
+        elif isinstance(transformed_data[0], Document):
             self._load_documents(transformed_data)  # type: ignore
         else:
             raise ValueError(
@@ -36,15 +55,12 @@ class DataLoader:
             )
 
     def _load_documents(self, docs: list[Document]) -> None:
-        _ = Redis.from_documents(
-            documents=docs,
-            embedding=self.db.embeddings,
-            redis_url=os.getenv("REDIS_URL", "redis://localhost:6379"),
-            index_name="redis-index",
-            schema="../schema.yaml",
-        )
+        self.redis_loader.load(docs)
 
-    def _load_graph_documents(self):
+    def _load_graph_documents(self, docs: list[GraphDocument]) -> None:
+        self.db.store_graph(docs)  # type: ignore
+        # Only embeds Document nodes without an embedding, so each batch is searchable
+        # as soon as it is written.
         self.db.vectorstore.from_existing_graph(
             self.db.embeddings,
             search_type=SearchType.HYBRID,
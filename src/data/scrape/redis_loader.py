@@ -0,0 +1,120 @@
+import hashlib
+import json
+from pathlib import Path
+from typing import Any, Iterable
+
+import numpy as np
+from langchain_community.vectorstores.redis.schema import RedisModel, read_schema
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from loguru import logger
+from redis import Redis
+from redis.commands.search.index_definition import IndexDefinition, IndexType
+from redis.exceptions import ResponseError
+
+from data.processors import batched
+
+SCHEMA_PATH: Path = Path(__file__).resolve().parent.parent / "schema.yaml"
+
+
+class RedisBulkLoader:
+    """
+    Bulk loader writing Documents to a Redis vector index.
+
+    Documents are embedded `batch_size` at a time and written with one pipelined
+    round trip of `HSET` commands per batch. Keys are derived from the
+    `content_checksum` metadata, so re-loading the same chunk overwrites it instead
+    of adding a duplicate. The hash layout matches LangChain's `Redis` vectorstore,
+    so the index can be queried with `Redis.from_existing_index`.
+
+    Attributes:
+        client (Redis): The Redis client, any object with the same `pipeline`/`ft` API works.
+        embeddings (Embeddings): Embeddings used for the `content_vector` field.
+        index_name (str): Name of the search index.
+        key_prefix (str): Prefix of the document keys covered by the index.
+        batch_size (int): Number of documents embedded and written per round trip.
+    """
+
+    def __init__(
+        self,
+        client: Redis,
+        embeddings: Embeddings,
+        index_name: str = "redis-index",
+        batch_size: int = 64,
+        schema_path: Path = SCHEMA_PATH,
+    ):
+        self.client = client
+        self.embeddings = embeddings
+        self.index_name = index_name
+        self.key_prefix = f"doc:{index_name}"
+        self.batch_size = batch_size
+        self.schema = RedisModel(**read_schema(schema_path))
+        self.schema.add_content_field()
+        self._index_ready = False
+
+    def key(self, doc: Document) -> str:
+        """Return the Redis key of the document, stable across re-scrapes."""
+        checksum = doc.metadata.get("content_checksum") or hashlib.md5(
+            doc.page_content.encode()
+        ).hexdigest()
+        return f"{self.key_prefix}:{checksum}"
+
+    def ensure_index(self, dim: int) -> None:
+        """Create the search index for the key prefix if it does not exist yet."""
+        if self._index_ready:
+            return
+        try:
+            self.client.ft(self.index_name).info()
+        except ResponseError:
+            self.schema.content_vector.dims = dim
+            self.client.ft(self.index_name).create_index(
+                fields=self.schema.get_fields(),
+                definition=IndexDefinition(
+                    prefix=[self.key_prefix], index_type=IndexType.HASH
+                ),
+            )
+            logger.info(f"Created redis index {self.index_name} (dim={dim})")
+        self._index_ready = True
+
+    @staticmethod
+    def _metadata_fields(metadata: dict[str, Any]) -> dict[str, Any]:
+        fields = {}
+        for name, value in metadata.items():
+            if value is None:
+                continue
+            if isinstance(value, (str, int, float)):
+                fields[name] = value
+            else:
+                fields[name] = json.dumps(value)
+        return fields
+
+    def load(self, docs: Iterable[Document]) -> int:
+        """
+        Embed and write documents in pipelined batches.
+
+        Args:
+            docs (Iterable[Document]): Documents to load, consumed lazily.
+
+        Returns:
+            int: The number of documents written.
+        """
+        written = 0
+        for batch in batched(docs, self.batch_size):
+            vectors = self.embeddings.embed_documents([doc.page_content for doc in batch])
+            self.ensure_index(len(vectors[0]))
+
+            pipe = self.client.pipeline(transaction=False)
+            for doc, vector in zip(batch, vectors):
+                pipe.hset(
+                    self.key(doc),
+                    mapping={
+                        **self._metadata_fields(doc.metadata),
+                        self.schema.content_key: doc.page_content,
+                        self.schema.content_vector_key: np.array(
+                            vector, dtype=self.schema.vector_dtype
+                        ).tobytes(),
+                    },
+                )
+            pipe.execute()
+            written += len(batch)
+        return written
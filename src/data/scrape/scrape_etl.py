@@ -1,34 +1,88 @@
-from typing import Any, Generator, Union
+from typing import Any, Generator, Optional, Union
 
 from langchain_community.graphs.graph_document import GraphDocument
 from langchain_core.documents import Document
+from loguru import logger
 
 from data.etl_base import ETLBase
+from data.scrape.cache import CrawlCache
 from data.scrape.extract import DocScraper, DocURLs
 from data.scrape.loader import DataLoader
 from data.scrape.transform import Transformer
 from data.store import StoreEnum
 
+DEFAULT_BATCH_SIZE: int = 32
+
 
 class ScrapeETL(ETLBase):
-    def __init__(self, doc_urls: DocURLs, database: StoreEnum):
-        self.scraper = DocScraper(doc_urls)
+    """
+    Streaming scrape ETL.
+
+    Pages are transformed as they are scraped and loaded in fixed-size batches, so memory
+    stays bounded by `batch_size` and the first batches are searchable while the crawl is
+    still running. A partially filled batch is flushed on shutdown. Pages are recorded
+    in the crawl cache once all their documents are loaded.
+    """
+
+    def __init__(
+        self,
+        doc_urls: DocURLs,
+        database: StoreEnum,
+        cache: Optional[CrawlCache] = None,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        main_content: bool = False,
+    ):
+        self.scraper = DocScraper(doc_urls, cache, main_content)
         self.transformer = Transformer(database)
         self.loader = DataLoader()
+        self.batch_size = batch_size
+        # Page whose documents may continue in the next batch.
+        self._open_page: Optional[str] = None
 
     def extract(self) -> Generator[dict[str, Any], None, None]:
         return self.scraper.scrape()
 
     def transform(
         self, data: Generator[dict[str, Any], None, None]
-    ) -> Union[list[GraphDocument], list[Document]]:
-        return self.transformer.as_documents(data)
+    ) -> Generator[Document, None, None]:
+        return self.transformer.transform_all(data)
 
-    def load(
-        self,
-        transformed_data: Union[list[GraphDocument], list[Document]],
-    ) -> None:
-        self.loader.load(transformed_data)
+    def load(self, transformed_data: Generator[Document, None, None]) -> None:
+        batch: list[Document] = []
+        exhausted = False
+        try:
+            for doc in transformed_data:
+                batch.append(doc)
+                if len(batch) >= self.batch_size:
+                    # Cleared first, so a failed flush is not retried on shutdown.
+                    full, batch = batch, []
+                    self._flush(full)
+            exhausted = True
+        finally:
+            if batch:
+                logger.info(f"Flushing final batch of {len(batch)} documents")
+                # An interrupted crawl may have stopped in the middle of the last page.
+                self._flush(batch, final=exhausted)
+            elif exhausted and self._open_page:
+                # The last batch was full, so its last page was left open.
+                self._mark_loaded({self._open_page})
+                self._open_page = None
+
+    def _flush(self, docs: list[Document], final: bool = False) -> None:
+        converted: Union[list[GraphDocument], list[Document]] = self.transformer.convert(docs)
+        self.loader.load(converted)
+        logger.info(f"Loaded batch :: {len(docs)} documents -> {len(converted)} records")
+
+        # Pages are split into consecutive documents, so only the last page of a batch
+        # may have documents left for the next one.
+        loaded = {doc.metadata.get("url") for doc in docs} | {self._open_page}
+        self._open_page = None if final else docs[-1].metadata.get("url")
+        self._mark_loaded(loaded - {self._open_page})
+
+    def _mark_loaded(self, urls: set[Optional[str]]) -> None:
+        # Pages with documents the transformer failed to extract are scraped again next run.
+        failed = self.transformer.failed_urls
+        self.scraper.mark_loaded([url for url in urls if url and url not in failed])
 
     def run(self) -> None:
         try:
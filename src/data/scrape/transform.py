@@ -23,6 +23,9 @@ class Transformer:
     def __init__(self, database: StoreEnum) -> None:
         self.database = database
         self.llm = get_llm_instance()
+        self._llm_transformers: dict[str, LLMGraphTransformer] = {}
+        # Source urls of documents whose graph extraction failed.
+        self.failed_urls: set[str] = set()
 
     @staticmethod
     def get_checksum(obj: object) -> str:
@@ -54,51 +57,73 @@ class Transformer:
         data: Generator[dict[str, Any], None, None],
         settings: GraphTransformerSettings = default_settings,
     ) -> Union[list[GraphDocument], list[Document]]:
+        return self.convert(list(self.transform_all(data)), settings)
+
+    def convert(
+        self,
+        docs: list[Document],
+        settings: GraphTransformerSettings = default_settings,
+    ) -> Union[list[GraphDocument], list[Document]]:
+        """
+        Convert a batch of Documents into the representation of the target database.
+
+        Args:
+            docs (list[Document]): The batch of transformed page chunks.
+            settings (GraphTransformerSettings): Graph extraction settings, used for neo4j.
+
+        Returns:
+            Union[list[GraphDocument], list[Document]]: Documents for redis, GraphDocuments for neo4j.
+        """
         if self.database == StoreEnum.redis:
-            return self._as_documents(data)
+            return docs
         elif self.database == StoreEnum.neo4j:
-            return self._as_graph_documents(data, settings)
+            return self._as_graph_documents(docs, settings)
         else:
             raise ValueError("Database not supported")
 
-    def _as_documents(
-            self, data: Generator[dict[str, Any], None, None]) -> list[Document]:
-        return list(self.transform_all(data))
+    def _get_llm_transformer(
+        self, settings: GraphTransformerSettings
+    ) -> LLMGraphTransformer:
+        key = json.dumps(settings, sort_keys=True)
+        if key not in self._llm_transformers:
+            self._llm_transformers[key] = LLMGraphTransformer(
+                llm=self.llm,
+                allowed_nodes=settings["allowed_nodes"],
+                allowed_relationships=settings["allowed_relationships"],
+                node_properties=settings["node_properties"],
+                relationship_properties=settings["relationship_properties"],
+            )
+        return self._llm_transformers[key]
 
     def _as_graph_documents(
         self,
-        data: Generator[dict[str, Any], None, None],
+        docs: list[Document],
         settings: GraphTransformerSettings = default_settings,
     ) -> list[GraphDocument]:
-        docs = self.transform_all(data)
-
-        llm_transformer = LLMGraphTransformer(
-            llm=self.llm,
-            allowed_nodes=settings["allowed_nodes"],
-            allowed_relationships=settings["allowed_relationships"],
-            node_properties=settings["node_properties"],
-            relationship_properties=settings["relationship_properties"],
-        )
+        llm_transformer = self._get_llm_transformer(settings)
 
         max_workers = 10
         graph_documents = []
         with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            futures = [
+            futures = {
                 executor.submit(
                     self.process_document,
                     doc,
-                    llm_transformer) for doc in docs]
+                    llm_transformer): doc for doc in docs}
 
             for future in tqdm(
                 as_completed(futures),
                 total=len(futures),
                 desc="Processing documents for neo4j",
+                leave=False,
             ):
                 try:
                     graph_document = future.result()
                     graph_documents.extend(graph_document)
                 except Exception as e:
                     logger.error(f"Error processing document: {e}")
+                    if url := futures[future].metadata.get("url"):
+                        self.failed_urls.add(url)
 
         return graph_documents
 
@@ -1,12 +1,40 @@
 import functools
 from enum import Enum
+from typing import Any, Optional
 
 from langchain_core.embeddings import Embeddings
 from langchain_neo4j import Neo4jGraph, Neo4jVector
 from langchain_neo4j.graphs.graph_document import GraphDocument
 from loguru import logger
+from neo4j import Driver, GraphDatabase, Query, RoutingControl
 
 from app.core.config import config
+from app.core.singleflight import SingleFlight
+
+embedding_flight = SingleFlight("embeddings")
+
+
+class SingleFlightEmbeddings(Embeddings):
+    """
+    Embeddings wrapper coalescing identical concurrent embedding calls.
+
+    Keys are the model and the exact text, concurrent callers embedding the same text
+    share one request to the embedding model.
+    """
+
+    def __init__(self, embeddings: Embeddings, model: str):
+        self.embeddings = embeddings
+        self.model = model
+
+    def embed_query(self, text: str) -> list[float]:
+        return embedding_flight.do(
+            (self.model, "query", text), self.embeddings.embed_query, text
+        )
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return embedding_flight.do(
+            (self.model, "documents", tuple(texts)), self.embeddings.embed_documents, texts
+        )
 
 
 class StoreEnum(str, Enum):
@@ -24,15 +52,61 @@ class Store:
         self.graph = graph
         self.vectorstore = vectorstore
         self.embeddings = embeddings
+        # Bumped on every write, so results computed against an older graph are not
+        # shared with callers that started after the write.
+        self.generation = 0
 
     def store_graph(self, docs: list[GraphDocument]) -> None:
         self.graph.add_graph_documents(
             docs, baseEntityLabel=True, include_source=True)
+        self.generation += 1
+        self.ensure_indexes()
+        self.graph.refresh_schema()
+        logger.info(f"Graph schema :: {self.graph.schema}")
+
+    def query(self, query: str, params: Optional[dict] = None,
+              timeout: Optional[float] = None) -> list[dict[str, Any]]:
+        """
+        Run a read query in a transaction bounded by `timeout` seconds.
+
+        Unlike a client-side timeout, the server aborts the transaction when it runs out,
+        so a slow query does not keep running in Neo4j and holding the calling thread.
+
+        Raises:
+            neo4j.exceptions.ClientError: If the transaction timed out.
+        """
+        records, _, _ = self.driver.execute_query(
+            Query(text=query, timeout=timeout),
+            parameters_=params or {},
+            routing_=RoutingControl.READ,
+        )
+        return [record.data() for record in records]
+
+    @functools.cached_property
+    def driver(self) -> Driver:
+        """
+        Neo4j driver for queries with per-transaction settings, created from config.
+
+        `Neo4jGraph.query` applies one timeout to every query of the graph, so queries
+        with their own timeout go through this driver instead.
+        """
+        return GraphDatabase.driver(
+            config.NEO4J_URI, auth=(config.NEO4J_USERNAME, config.NEO4J_PASSWORD)
+        )
+
+    def ensure_indexes(self) -> None:
+        """
+        Create the entity indexes used by retrieval.
+
+        The full-text index resolves mentions to entities, and the id constraint
+        (also created by ingestion) backs the index lookups of path-finding.
+        """
         self.graph.query(
             "CREATE FULLTEXT INDEX entity IF NOT EXISTS FOR (e:__Entity__) ON EACH [e.id]"
         )
-        self.graph.refresh_schema()
-        logger.info(f"Graph schema :: {self.graph.schema}")
+        self.graph.query(
+            "CREATE CONSTRAINT entity_id IF NOT EXISTS FOR (e:__Entity__) REQUIRE e.id IS UNIQUE"
+        )
 
 
 @functools.lru_cache(maxsize=1)
@@ -45,10 +119,12 @@ def get_default_store() -> Store:
         password=config.NEO4J_PASSWORD,
     )
 
-    embeddings = OllamaEmbeddings(
+    embeddings: Embeddings = OllamaEmbeddings(
         base_url=config.OLLAMA_API_BASE,
         model=config.EMB_MODEL_ID,
     )
+    if config.LLM_SINGLE_FLIGHT:
+        embeddings = SingleFlightEmbeddings(embeddings, config.EMB_MODEL_ID)
 
     vectorstore = Neo4jVector(
         url=config.NEO4J_URI,
@@ -62,3 +138,21 @@ def get_default_store() -> Store:
         embeddings=embeddings,
         vectorstore=vectorstore,
     )
+
+
+@functools.lru_cache(maxsize=1)
+def get_cached_embeddings() -> Embeddings:
+    """
+    Return the default embeddings wrapped in a shared on-disk cache.
+
+    Vectors are keyed by text hash and namespaced by embedding model, so re-ingesting
+    unchanged chunks does not call the embedding model again.
+    """
+    from langchain.embeddings import CacheBackedEmbeddings
+    from langchain.storage import LocalFileStore
+
+    return CacheBackedEmbeddings.from_bytes_store(
+        get_default_store().embeddings,
+        LocalFileStore(config.EMBEDDING_CACHE_DIR),
+        namespace=config.EMB_MODEL_ID,
+    )
@@ -0,0 +1,3 @@
+from .server import FakeBackend, FakeLLMSettings, create_app
+
+__all__ = ["FakeBackend", "FakeLLMSettings", "create_app"]
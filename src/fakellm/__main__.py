@@ -0,0 +1,91 @@
+import json
+import os
+
+import click
+import uvicorn
+
+from fakellm.server import FakeLLMSettings, create_app
+
+
+@click.command()
+@click.option(
+    "-h",
+    "--host",
+    "host",
+    type=str,
+    default=lambda: os.environ.get("FAKELLM_HOST", "127.0.0.1"),
+)
+@click.option(
+    "-p",
+    "--port",
+    "port",
+    type=int,
+    default=lambda: int(os.environ.get("FAKELLM_PORT", 11435)),
+)
+@click.option(
+    "-d",
+    "--distribution",
+    "ttft_distribution",
+    type=click.Choice(["fixed", "uniform", "normal", "lognormal"]),
+    default=lambda: os.environ.get("FAKELLM_TTFT_DISTRIBUTION", "fixed"),
+)
+@click.option(
+    "-t",
+    "--ttft",
+    "ttft_mean",
+    type=float,
+    default=lambda: float(os.environ.get("FAKELLM_TTFT", 0.0)),
+    help="Mean time to first token in seconds.",
+)
+@click.option(
+    "-s",
+    "--spread",
+    "ttft_spread",
+    type=float,
+    default=lambda: float(os.environ.get("FAKELLM_TTFT_SPREAD", 0.0)),
+    help="Half width, stddev or sigma of the TTFT distribution.",
+)
+@click.option(
+    "--tps",
+    "tokens_per_second",
+    type=float,
+    default=lambda: float(os.environ.get("FAKELLM_TOKENS_PER_SECOND", 0.0)),
+    help="Generation speed per request, 0 generates instantly.",
+)
+@click.option(
+    "-c",
+    "--max-concurrency",
+    "max_concurrency",
+    type=int,
+    default=lambda: int(os.environ.get("FAKELLM_MAX_CONCURRENCY", 0)),
+    help="Requests served at once, excess requests queue; 0 is unlimited.",
+)
+@click.option(
+    "--dim",
+    "embedding_dim",
+    type=int,
+    default=lambda: int(os.environ.get("FAKELLM_EMBEDDING_DIM", 768)),
+)
+@click.option(
+    "--canned",
+    "canned",
+    type=click.Path(exists=True, dir_okay=False),
+    required=False,
+    help="JSON file mapping prompt substrings to fixed responses.",
+)
+@click.option(
+    "--seed",
+    "seed",
+    type=int,
+    default=lambda: int(os.environ.get("FAKELLM_SEED", 0)),
+)
+def serve(host: str, port: int, canned: str, **settings) -> None:
+    """Serve fake OpenAI-compatible and Ollama endpoints for load testing."""
+    if canned:
+        with open(canned) as f:
+            settings["canned"] = json.load(f)
+    uvicorn.run(create_app(FakeLLMSettings(**settings)), host=host, port=port)
+
+
+if __name__ == "__main__":
+    serve()
@@ -0,0 +1,137 @@
+import hashlib
+import random
+import re
+from typing import Any, Optional
+
+import numpy as np
+
+WORDS = [
+    "the", "graph", "node", "relation", "of", "and", "entity", "document", "castle",
+    "count", "letter", "journey", "night", "is", "a", "to", "in", "with", "source",
+    "answer", "context", "which", "describes", "connected", "through", "was", "by",
+    "knowledge", "query", "result", "from", "that", "chapter", "found", "between",
+]
+
+STOPWORDS = {
+    "A", "An", "And", "Are", "Can", "Create", "Does", "Explain", "For", "How", "I",
+    "In", "Is", "It", "Of", "On", "Please", "The", "Tell", "Use", "What", "When",
+    "Where", "Which", "Who", "Why",
+}
+
+ENTITY_PATTERN = re.compile(r"\b[A-Z][\w'-]*(?:\s+[A-Z][\w'-]*)*")
+
+QUERY_PATTERN = re.compile(r"^\s*Query:\s*(.+)$", re.MULTILINE)
+
+
+def seed(text: str) -> int:
+    """Return a stable 64 bit seed derived from the text."""
+    return int.from_bytes(hashlib.sha256(text.encode()).digest()[:8], "big")
+
+
+def count_tokens(text: str) -> int:
+    """Approximate the token count of a text by its whitespace separated words."""
+    return len(text.split())
+
+
+def hashed_text(prompt: str, tokens: int) -> str:
+    """Return `tokens` words chosen deterministically from the prompt hash."""
+    rng = random.Random(seed(prompt))
+    return " ".join(rng.choice(WORDS) for _ in range(tokens))
+
+
+def embedding(text: str, dim: int) -> list[float]:
+    """Return a deterministic unit vector for the text."""
+    vector = np.random.default_rng(seed(text)).standard_normal(dim)
+    return (vector / np.linalg.norm(vector)).tolist()
+
+
+def entities(text: str) -> list[str]:
+    """Extract capitalized phrases as entities, falling back to the longest words."""
+    found: list[str] = []
+    for match in ENTITY_PATTERN.findall(text):
+        words = match.split()
+        while words and words[0] in STOPWORDS:
+            words = words[1:]
+        name = " ".join(words)
+        if name and name not in found:
+            found.append(name)
+    if found:
+        return found
+    return sorted(set(re.findall(r"\w+", text)), key=len, reverse=True)[:2]
+
+
+def tool_arguments(schema: dict[str, Any], text: str, defs: Optional[dict] = None) -> Any:
+    """
+    Generate arguments matching a JSON schema from the text.
+
+    Lists of strings are filled with the entities of the text, so extraction tools
+    such as `Entities` receive plausible values. Other types get deterministic
+    placeholders derived from the text hash.
+    """
+    defs = defs if defs is not None else schema.get("$defs", schema.get("definitions", {}))
+    if "$ref" in schema:
+        return tool_arguments(defs[schema["$ref"].split("/")[-1]], text, defs)
+    if "anyOf" in schema:
+        return tool_arguments(schema["anyOf"][0], text, defs)
+    if "enum" in schema:
+        return schema["enum"][0]
+
+    kind = schema.get("type", "object")
+    if kind == "object":
+        return {
+            name: tool_arguments(prop, text, defs)
+            for name, prop in schema.get("properties", {}).items()
+        }
+    if kind == "array":
+        items = schema.get("items", {"type": "string"})
+        if items.get("type", "string") == "string":
+            return entities(text)
+        return [tool_arguments(items, text, defs)]
+    if kind == "string":
+        return hashed_text(text, 3)
+    if kind in ("number", "integer"):
+        return seed(text) % 100
+    if kind == "boolean":
+        return True
+    return None
+
+
+def is_plan_request(prompt: str) -> bool:
+    """Return whether the prompt asks for a query planner JSON plan."""
+    return "query planner" in prompt.lower() and '"steps"' in prompt
+
+
+def plan(prompt: str) -> dict[str, Any]:
+    """Return a valid execution plan for the `Query:` line of a planner prompt."""
+    match = QUERY_PATTERN.search(prompt)
+    found = entities(match.group(1) if match else prompt)
+    return {
+        "steps": [
+            {
+                "step_id": "extract_entities",
+                "description": "Extract key entities and concepts from the query",
+                "query_type": "entity_search",
+                "parameters": {"entities": found},
+                "dependencies": [],
+                "expected_confidence": 90,
+            },
+            {
+                "step_id": "traverse_relationships",
+                "description": "Traverse relationships between the entities",
+                "query_type": "relationship_traverse",
+                "parameters": {"entities": found, "max_hops": 2},
+                "dependencies": ["extract_entities"],
+                "expected_confidence": 80,
+            },
+            {
+                "step_id": "synthesize",
+                "description": "Synthesize the findings into an answer",
+                "query_type": "synthesis",
+                "parameters": {},
+                "dependencies": ["extract_entities", "traverse_relationships"],
+                "expected_confidence": 85,
+            },
+        ],
+        "confidence_estimate": 85,
+        "estimated_time": 3.0,
+    }
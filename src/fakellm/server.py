@@ -0,0 +1,435 @@
+import asyncio
+import base64
+import json
+import math
+import random
+import re
+import time
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Literal, Optional
+
+import numpy as np
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+
+from fakellm import outputs
+
+
+class FakeLLMSettings(BaseModel):
+    """Latency, throughput and output settings of the fake LLM server."""
+
+    ttft_distribution: Literal["fixed", "uniform", "normal", "lognormal"] = Field(
+        default="fixed",
+        description="Distribution of the time to first token")
+    ttft_mean: float = Field(
+        default=0.0,
+        description="Mean time to first token in seconds")
+    ttft_spread: float = Field(
+        default=0.0,
+        description="Half width (uniform), stddev (normal) or sigma (lognormal) of the TTFT")
+    tokens_per_second: float = Field(
+        default=0.0,
+        description="Generation speed per request, 0 generates instantly")
+    max_concurrency: int = Field(
+        default=0,
+        description="Requests served at once, excess requests queue; 0 is unlimited")
+    completion_tokens: int = Field(
+        default=64,
+        description="Words in a hashed completion")
+    embedding_dim: int = Field(
+        default=768,
+        description="Dimension of the returned embeddings")
+    embedding_latency: float = Field(
+        default=0.0,
+        description="Seconds spent per embedding request")
+    seed: int = Field(
+        default=0,
+        description="Seed of the latency sampling")
+    canned: dict[str, str] = Field(
+        default_factory=dict,
+        description="Fixed responses for prompts containing the key")
+    models: list[str] = Field(
+        default_factory=lambda: ["qwen3:30b", "nomic-embed-text"],
+        description="Models listed by the model endpoints")
+
+
+def _text(content: Any) -> str:
+    """Return the text of an OpenAI/Ollama message content, which may be a part list."""
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return "\n".join(
+            part.get("text", "") if isinstance(part, dict) else str(part) for part in content
+        )
+    return "" if content is None else str(content)
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class FakeBackend:
+    """
+    Deterministic completion and embedding backend shared by both API flavours.
+
+    Completions are, in order of precedence, a canned response whose key occurs in
+    the prompt, a valid execution plan for planner prompts, or words chosen from the
+    prompt hash. With tools bound, the requested (or first) tool is called with
+    arguments generated from its JSON schema.
+    """
+
+    def __init__(self, settings: FakeLLMSettings):
+        self.settings = settings
+        self.stats = {"requests": 0, "in_flight": 0, "queued": 0, "tokens": 0}
+        self._rng = random.Random(settings.seed)
+        self._slots = (
+            asyncio.Semaphore(settings.max_concurrency) if settings.max_concurrency else None
+        )
+
+    def ttft(self) -> float:
+        """Sample a time to first token in seconds."""
+        s = self.settings
+        if s.ttft_distribution == "uniform":
+            value = self._rng.uniform(s.ttft_mean - s.ttft_spread, s.ttft_mean + s.ttft_spread)
+        elif s.ttft_distribution == "normal":
+            value = self._rng.gauss(s.ttft_mean, s.ttft_spread)
+        elif s.ttft_distribution == "lognormal" and s.ttft_mean > 0:
+            mu = math.log(s.ttft_mean) - s.ttft_spread**2 / 2
+            value = self._rng.lognormvariate(mu, s.ttft_spread)
+        else:
+            value = s.ttft_mean
+        return max(0.0, value)
+
+    @property
+    def token_delay(self) -> float:
+        tps = self.settings.tokens_per_second
+        return 1 / tps if tps > 0 else 0.0
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Hold one of the `max_concurrency` request slots."""
+        self.stats["requests"] += 1
+        self.stats["queued"] += 1
+        try:
+            if self._slots is not None:
+                await self._slots.acquire()
+        finally:
+            self.stats["queued"] -= 1
+        self.stats["in_flight"] += 1
+        try:
+            yield
+        finally:
+            self.stats["in_flight"] -= 1
+            if self._slots is not None:
+                self._slots.release()
+
+    def complete(self, prompt: str) -> str:
+        for key, response in self.settings.canned.items():
+            if key in prompt:
+                return response
+        if outputs.is_plan_request(prompt):
+            return json.dumps(outputs.plan(prompt))
+        return outputs.hashed_text(prompt, self.settings.completion_tokens)
+
+    def respond(
+        self,
+        messages: list[dict],
+        tools: Optional[list[dict]] = None,
+        tool_choice: Any = None,
+        schema: Optional[dict] = None,
+    ) -> tuple[str, list[tuple[str, dict]]]:
+        """
+        Return the completion text and tool calls for a chat request.
+
+        Args:
+            messages (list[dict]): Chat messages with `role` and `content`.
+            tools (Optional[list[dict]]): Bound function tools.
+            tool_choice (Any): OpenAI tool choice, a named choice selects the tool.
+            schema (Optional[dict]): JSON schema the content must follow.
+
+        Returns:
+            tuple[str, list[tuple[str, dict]]]: The content and (name, arguments) calls.
+        """
+        prompt = "\n".join(_text(m.get("content")) for m in messages)
+        user = [_text(m.get("content")) for m in messages if m.get("role") == "user"]
+        last = user[-1] if user else prompt
+
+        if tools and tool_choice != "none":
+            functions = [tool["function"] for tool in tools]
+            function = functions[0]
+            if isinstance(tool_choice, dict):
+                name = tool_choice.get("function", {}).get("name")
+                function = next((f for f in functions if f["name"] == name), function)
+            arguments = outputs.tool_arguments(function.get("parameters", {}), last)
+            return "", [(function["name"], arguments)]
+        if schema is not None:
+            return json.dumps(outputs.tool_arguments(schema, last)), []
+        return self.complete(prompt), []
+
+    async def generate(self, content: str) -> AsyncIterator[str]:
+        """Yield the content word by word at the configured TTFT and token rate."""
+        await asyncio.sleep(self.ttft())
+        pieces = re.findall(r"\s*\S+", content) or [content]
+        for i, piece in enumerate(pieces):
+            if i and self.token_delay:
+                await asyncio.sleep(self.token_delay)
+            self.stats["tokens"] += 1
+            yield piece
+
+    async def embed(self, texts: list[str]) -> list[list[float]]:
+        async with self.slot():
+            await asyncio.sleep(self.settings.embedding_latency)
+            return [outputs.embedding(text, self.settings.embedding_dim) for text in texts]
+
+
+def _as_json(content: str) -> str:
+    """Wrap a plain completion in a JSON object, for JSON mode requests."""
+    return content if content.startswith("{") else json.dumps({"response": content})
+
+
+def _openai_tool_calls(calls: list[tuple[str, dict]]) -> list[dict]:
+    return [
+        {
+            "index": i,
+            "id": f"call_{uuid.uuid4().hex[:24]}",
+            "type": "function",
+            "function": {"name": name, "arguments": json.dumps(arguments)},
+        }
+        for i, (name, arguments) in enumerate(calls)
+    ]
+
+
+def _usage(prompt: str, content: str) -> dict[str, int]:
+    prompt_tokens = outputs.count_tokens(prompt)
+    completion_tokens = outputs.count_tokens(content)
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+    }
+
+
+def create_app(settings: Optional[FakeLLMSettings] = None) -> FastAPI:
+    """
+    Create the fake LLM server app.
+
+    Serves the OpenAI-compatible `/v1/chat/completions`, `/v1/embeddings` and
+    `/v1/models` endpoints, and the Ollama `/api/chat`, `/api/generate`, `/api/embed`,
+    `/api/embeddings` and `/api/tags` endpoints, both streaming and non-streaming.
+
+    Args:
+        settings (Optional[FakeLLMSettings]): Latency and output settings.
+
+    Returns:
+        FastAPI: The app, its backend is available as `app.state.backend`.
+    """
+    backend = FakeBackend(settings or FakeLLMSettings())
+    app = FastAPI(title="fakellm")
+    app.state.backend = backend
+
+    @app.get("/stats")
+    async def stats() -> dict[str, int]:
+        return backend.stats
+
+    # OpenAI compatible API
+
+    @app.get("/v1/models")
+    async def models() -> dict:
+        return {
+            "object": "list",
+            "data": [
+                {"id": model, "object": "model", "created": 0, "owned_by": "fakellm"}
+                for model in backend.settings.models
+            ],
+        }
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        messages = body.get("messages", [])
+        response_format = body.get("response_format") or {}
+        schema = response_format.get("json_schema", {}).get("schema")
+        content, calls = backend.respond(
+            messages, body.get("tools"), body.get("tool_choice"), schema)
+        if response_format.get("type") == "json_object" and not calls:
+            content = _as_json(content)
+        prompt = "\n".join(_text(m.get("content")) for m in messages)
+        finish_reason = "tool_calls" if calls else "stop"
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        created = int(time.time())
+        model = body.get("model", "fakellm")
+
+        if body.get("stream"):
+            def chunk(delta: dict, finish: Optional[str] = None) -> str:
+                return "data: " + json.dumps({
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": model,
+                    "choices": [{"index": 0, "delta": delta, "finish_reason": finish}],
+                }) + "\n\n"
+
+            async def stream() -> AsyncIterator[str]:
+                async with backend.slot():
+                    yield chunk({"role": "assistant", "content": ""})
+                    if calls:
+                        await asyncio.sleep(backend.ttft())
+                        yield chunk({"tool_calls": _openai_tool_calls(calls)})
+                    else:
+                        async for piece in backend.generate(content):
+                            yield chunk({"content": piece})
+                    yield chunk({}, finish_reason)
+                    yield "data: [DONE]\n\n"
+
+            return StreamingResponse(stream(), media_type="text/event-stream")
+
+        async with backend.slot():
+            async for _ in backend.generate(content):
+                pass
+        message: dict[str, Any] = {"role": "assistant", "content": content or None}
+        if calls:
+            message["tool_calls"] = _openai_tool_calls(calls)
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}],
+            "usage": _usage(prompt, content),
+        }
+
+    @app.post("/v1/embeddings")
+    async def embeddings(request: Request) -> dict:
+        body = await request.json()
+        inputs = body["input"]
+        if isinstance(inputs, str) or (inputs and isinstance(inputs[0], int)):
+            inputs = [inputs]
+        # Clients may send token ids, embed their string form.
+        texts = [item if isinstance(item, str) else " ".join(map(str, item)) for item in inputs]
+        vectors = await backend.embed(texts)
+        if body.get("encoding_format") == "base64":
+            vectors = [
+                base64.b64encode(np.array(v, dtype=np.float32).tobytes()).decode()
+                for v in vectors
+            ]
+        tokens = sum(outputs.count_tokens(text) for text in texts)
+        return {
+            "object": "list",
+            "data": [
+                {"object": "embedding", "index": i, "embedding": vector}
+                for i, vector in enumerate(vectors)
+            ],
+            "model": body.get("model", "fakellm"),
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+        }
+
+    # Ollama API
+
+    @app.get("/api/tags")
+    async def tags() -> dict:
+        return {
+            "models": [
+                {"name": model, "model": model, "modified_at": _now(), "size": 0,
+                 "digest": outputs.hashed_text(model, 1), "details": {}}
+                for model in backend.settings.models
+            ]
+        }
+
+    def ollama_stream(
+        model: str, prompt: str, content: str, calls: list[tuple[str, dict]], key: str
+    ) -> StreamingResponse:
+        def line(payload: dict) -> str:
+            return json.dumps({"model": model, "created_at": _now(), **payload}) + "\n"
+
+        def piece_payload(piece: str, tool_calls: Optional[list] = None) -> dict:
+            if key == "message":
+                message: dict[str, Any] = {"role": "assistant", "content": piece}
+                if tool_calls:
+                    message["tool_calls"] = tool_calls
+                return {"message": message}
+            return {"response": piece}
+
+        async def stream() -> AsyncIterator[str]:
+            started = time.perf_counter_ns()
+            async with backend.slot():
+                if calls:
+                    await asyncio.sleep(backend.ttft())
+                    tool_calls = [{"function": {"name": name, "arguments": arguments}}
+                                  for name, arguments in calls]
+                    yield line({**piece_payload("", tool_calls), "done": False})
+                else:
+                    async for piece in backend.generate(content):
+                        yield line({**piece_payload(piece), "done": False})
+                yield line({
+                    **piece_payload(""),
+                    "done": True,
+                    "done_reason": "stop",
+                    "total_duration": time.perf_counter_ns() - started,
+                    "load_duration": 0,
+                    "prompt_eval_count": outputs.count_tokens(prompt),
+                    "prompt_eval_duration": 0,
+                    "eval_count": outputs.count_tokens(content),
+                    "eval_duration": time.perf_counter_ns() - started,
+                })
+
+        return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+    async def ollama_response(response: StreamingResponse, stream: bool, key: str):
+        if stream:
+            return response
+        # Collapse the stream into the single final object Ollama returns.
+        lines = [json.loads(line) async for line in response.body_iterator]
+        final = lines[-1]
+        content = "".join(
+            line["message"]["content"] if key == "message" else line["response"]
+            for line in lines
+        )
+        if key == "message":
+            tool_calls = [c for line in lines for c in line["message"].get("tool_calls", [])]
+            final["message"] = {"role": "assistant", "content": content}
+            if tool_calls:
+                final["message"]["tool_calls"] = tool_calls
+        else:
+            final["response"] = content
+        return final
+
+    @app.post("/api/chat")
+    async def ollama_chat(request: Request):
+        body = await request.json()
+        messages = body.get("messages", [])
+        schema = body.get("format") if isinstance(body.get("format"), dict) else None
+        content, calls = backend.respond(messages, body.get("tools"), schema=schema)
+        if body.get("format") == "json" and not calls:
+            content = _as_json(content)
+        prompt = "\n".join(_text(m.get("content")) for m in messages)
+        response = ollama_stream(body.get("model", ""), prompt, content, calls, "message")
+        return await ollama_response(response, body.get("stream", True), "message")
+
+    @app.post("/api/generate")
+    async def ollama_generate(request: Request):
+        body = await request.json()
+        prompt = body.get("prompt") or ""
+        # An empty prompt only loads the model, as used for keep-alive pings.
+        content = backend.complete(prompt) if prompt else ""
+        response = ollama_stream(body.get("model", ""), prompt, content, [], "response")
+        return await ollama_response(response, body.get("stream", True), "response")
+
+    @app.post("/api/embed")
+    async def ollama_embed(request: Request) -> dict:
+        body = await request.json()
+        inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        return {
+            "model": body.get("model", ""),
+            "embeddings": await backend.embed(inputs),
+            "prompt_eval_count": sum(outputs.count_tokens(text) for text in inputs),
+        }
+
+    @app.post("/api/embeddings")
+    async def ollama_embeddings(request: Request) -> dict:
+        body = await request.json()
+        return {"embedding": (await backend.embed([body.get("prompt", "")]))[0]}
+
+    return app
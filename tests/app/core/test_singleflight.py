@@ -0,0 +1,86 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.core.singleflight import SingleFlight, normalize
+
+
+def test_do_coalesces_concurrent_threads():
+    flight = SingleFlight("test")
+    calls = []
+    started = threading.Event()
+
+    def slow(value):
+        calls.append(value)
+        started.set()
+        time.sleep(0.1)
+        return value * 2
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        leader = executor.submit(flight.do, "key", slow, 21)
+        started.wait()
+        followers = [executor.submit(flight.do, "key", slow, 21) for _ in range(3)]
+        results = [leader.result()] + [f.result() for f in followers]
+
+    assert results == [42, 42, 42, 42]
+    assert calls == [21]
+    assert flight.stats == {"leaders": 1, "followers": 3}
+
+
+def test_do_shares_exceptions_and_forgets_completed_calls():
+    flight = SingleFlight("test")
+
+    def fail():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        flight.do("key", fail)
+    assert flight.do("key", lambda: "ok") == "ok"
+
+
+def test_ado_coalesces_concurrent_coroutines():
+    flight = SingleFlight("test")
+    calls = 0
+
+    async def slow():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return "answer"
+
+    async def run():
+        return await asyncio.gather(*(flight.ado("key", slow) for _ in range(5)))
+
+    assert asyncio.run(run()) == ["answer"] * 5
+    assert calls == 1
+
+
+def test_normalize():
+    assert normalize("  Who is   Mina Harker? ") == "who is mina harker?"
+
+
+def test_ado_cancels_call_when_last_waiter_is_cancelled():
+    flight = SingleFlight("test")
+    cancelled = False
+
+    async def slow():
+        nonlocal cancelled
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled = True
+            raise
+
+    async def run():
+        waiter = asyncio.ensure_future(flight.ado("key", slow))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        await asyncio.sleep(0.01)
+
+    asyncio.run(run())
+    assert cancelled
@@ -0,0 +1,62 @@
+import asyncio
+
+import httpx
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.endpoints import health
+from app.core import warmup
+from fakellm import create_app
+
+
+def test_readiness_requires_every_component_ok():
+    readiness = warmup.Readiness()
+
+    async def ok():
+        pass
+
+    async def broken():
+        raise ConnectionError("neo4j is down")
+
+    async def run():
+        readiness.started_at = 0.0
+        await asyncio.gather(readiness.run("chains", ok), readiness.run("store", broken))
+        readiness.finished_at = 1.0
+
+    assert not readiness.ready
+    asyncio.run(run())
+    assert not readiness.ready
+    assert readiness.components == {"chains": "ok", "store": "error: neo4j is down"}
+
+
+def test_ready_endpoint_reports_503_until_warm(monkeypatch):
+    readiness = warmup.Readiness()
+    monkeypatch.setattr(health, "readiness", readiness)
+    app = FastAPI()
+    app.include_router(health.router, prefix="/health")
+    client = TestClient(app)
+
+    assert client.get("/health/").status_code == 200
+    assert client.get("/health/ready").status_code == 503
+
+    readiness.components["store"] = "ok"
+    readiness.started_at = readiness.finished_at = 1.0
+    response = client.get("/health/ready")
+    assert response.status_code == 200
+    assert response.json()["ready"]
+
+
+def test_keep_alive_loads_chat_and_embedding_models(monkeypatch):
+    monkeypatch.setattr(warmup.config, "LLM_API_PROVIDER", "ollama")
+    monkeypatch.setattr(warmup.config, "LLM_MODEL_ID", "qwen3:30b")
+    fake = create_app()
+
+    async def run():
+        async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=fake), base_url="http://ollama"
+        ) as client:
+            await warmup.keep_alive(client)
+
+    asyncio.run(run())
+    assert warmup.ollama_models() == (["qwen3:30b"], [warmup.config.EMB_MODEL_ID])
+    assert fake.state.backend.stats["requests"] == 2
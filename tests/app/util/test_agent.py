@@ -0,0 +1,264 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from app.util.agent import AgenticGraphRAG
+from app.util import agent as agent_module
+from app.util.budget import QueryBudget, budget_stats, latency_stats
+from app.util.planner import ExecutionPlan, ExecutionStep, FinalResult, PlanError, StepResult
+
+
+@pytest.fixture(autouse=True)
+def store(monkeypatch):
+    store = SimpleNamespace(generation=0)
+    monkeypatch.setattr(agent_module, "get_default_store", lambda: store)
+    return store
+
+
+def _step(step_id, query_type="entity_search", dependencies=(), parameters=None):
+    return ExecutionStep(
+        step_id=step_id,
+        description=step_id,
+        query_type=query_type,
+        parameters={"entities": [step_id]} if parameters is None else parameters,
+        dependencies=list(dependencies),
+        expected_confidence=90,
+    )
+
+
+def _plan(*steps):
+    return ExecutionPlan(steps=list(steps), confidence_estimate=80, estimated_time=1.0)
+
+
+class SleepyAgent(AgenticGraphRAG):
+    def __init__(self, max_concurrency=4):
+        super().__init__(None, None, None, None, max_concurrency=max_concurrency)
+        self.running = self.peak = 0
+
+    async def execute_step(self, step, original_query, timeout=None, context=None):
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        await asyncio.sleep(0.05)
+        self.running -= 1
+        return StepResult(step.step_id, True, {}, 90, step.description, [], 0.05)
+
+
+async def _executed(agent, plan, query="query", budget=None):
+    """Execute an already planned plan, yielding the events of its steps."""
+    async def planned():
+        for step in plan.steps:
+            yield step
+        yield plan
+
+    async for event in agent.execute_streamed_plan(planned(), query, budget):
+        if event.status not in ("planned", "plan"):
+            yield event
+
+
+async def _events(agent, plan):
+    return [(e.status, e.step.step_id) async for e in _executed(agent, plan)]
+
+
+def test_independent_steps_run_concurrently():
+    agent = SleepyAgent()
+    plan = _plan(
+        _step("mina"), _step("lucy"), _step("van_helsing"),
+        _step("compare", "relationship_traverse", ["mina", "lucy"]),
+        _step("answer", "synthesis"),
+    )
+
+    started = time.perf_counter()
+    events = asyncio.run(_events(agent, plan))
+    elapsed = time.perf_counter() - started
+
+    finished = [step_id for status, step_id in events if status == "finished"]
+    assert finished.index("compare") > max(finished.index("mina"), finished.index("lucy"))
+    assert finished[-1] == "answer"
+    assert agent.peak == 3
+    # Three levels of 50ms rather than five sequential steps.
+    assert elapsed < 0.2
+
+
+def test_concurrency_cap():
+    agent = SleepyAgent(max_concurrency=2)
+    asyncio.run(_events(agent, _plan(*(_step(f"s{i}") for i in range(5)))))
+    assert agent.peak == 2
+
+
+@pytest.mark.parametrize(
+    "steps, message",
+    [
+        ([_step("a", dependencies=["b"]), _step("b", dependencies=["a"])], "cycle"),
+        ([_step("a", dependencies=["missing"])], "unknown"),
+        ([_step("a"), _step("a")], "Duplicate"),
+    ],
+)
+def test_invalid_plans_are_rejected(steps, message):
+    with pytest.raises(PlanError, match=message):
+        asyncio.run(_events(SleepyAgent(), _plan(*steps)))
+
+
+def test_steps_run_after_their_dependencies():
+    plan = _plan(_step("answer", "synthesis"), _step("b", dependencies=["a"]), _step("a"))
+    events = asyncio.run(_events(SleepyAgent(), plan))
+    finished = [step_id for status, step_id in events if status == "finished"]
+    assert finished == ["a", "b", "answer"]
+
+
+class SlowAgent(SleepyAgent):
+    def __init__(self, max_concurrency=4):
+        super().__init__(max_concurrency)
+        self.dispatched = []
+
+    async def _dispatch_step(self, step, original_query, context):
+        self.dispatched.append(step.step_id)
+        await asyncio.sleep(0.3 if step.step_id == "slow" else 0.01)
+        if step.query_type == "synthesis":
+            return {"synthesis": [r.data["result"] for r in context.dependency_results(step)]}
+        return {"result": step.step_id}
+
+    async def execute_step(self, step, original_query, timeout=None, context=None):
+        return await AgenticGraphRAG.execute_step(self, step, original_query, timeout, context)
+
+
+def test_budget_times_out_and_cancels_steps():
+    budget = QueryBudget(0.5, {"planning": 0.2, "step": 0.6, "answer": 0.5})
+    agent = SlowAgent(max_concurrency=1)
+    plan = _plan(_step("fast"), _step("slow"), _step("late", dependencies=["slow"]))
+
+    async def run():
+        return [e async for e in _executed(agent, plan, budget=budget)]
+
+    events = {e.step.step_id: e for e in asyncio.run(run()) if e.status != "started"}
+    assert events["fast"].result.success
+    assert not events["slow"].result.success
+    assert "timed out" in events["slow"].result.summary
+    assert events["late"].status == "cancelled"
+    assert budget_stats["entity_search"]["timeouts"] >= 1
+
+
+def test_query_budget_reserves_the_answer_share():
+    now = [0.0]
+    budget = QueryBudget(10, {"planning": 0.2, "step": 0.5, "answer": 0.3}, clock=lambda: now[0])
+    assert budget.timeout("planning") == 2
+    assert budget.timeout("step") == 5
+    now[0] = 6.0
+    assert budget.timeout("step") == 1
+    assert budget.timeout("answer") == 4
+    now[0] = 8.0
+    assert budget.timeout("step") == 0
+
+
+def test_streamed_steps_run_before_the_plan_is_complete():
+    agent = SleepyAgent()
+    log = []
+
+    async def planned():
+        yield _step("mina")
+        yield _step("lucy")
+        await asyncio.sleep(0.1)
+        log.append("planned")
+        yield _step("answer", "synthesis")
+        yield _plan(_step("mina"), _step("lucy"), _step("answer", "synthesis"))
+
+    async def run():
+        async for event in agent.execute_streamed_plan(planned(), "query"):
+            log.append((event.status, event.step.step_id if event.step else None))
+
+    asyncio.run(run())
+    assert log.index(("finished", "mina")) < log.index("planned")
+    assert log.index(("plan", None)) < log.index(("started", "answer"))
+    assert log[-1] == ("finished", "answer")
+
+
+def test_streamed_plan_with_unknown_dependency_fails():
+    async def planned():
+        yield _step("a", dependencies=["missing"])
+        yield _plan(_step("a", dependencies=["missing"]))
+
+    async def run():
+        return [e async for e in SleepyAgent().execute_streamed_plan(planned(), "query")]
+
+    with pytest.raises(PlanError, match="unknown"):
+        asyncio.run(run())
+
+
+def test_identical_steps_are_memoized_across_queries():
+    agent = SlowAgent()
+    search = {"entities": ["Mina Harker"]}
+
+    async def run(query, *steps):
+        return [e async for e in _executed(agent, _plan(*steps), query)]
+
+    asyncio.run(run("Who is Mina?", _step("a", parameters=search), _step("b", parameters=search)))
+    asyncio.run(run("Is Mina married?", _step("c", parameters=search)))
+    assert agent.dispatched == ["a"]
+    assert agent.step_memo.stats == {"hits": 1, "misses": 2}
+
+
+def test_empty_and_stale_step_results_are_not_reused(store):
+    agent = SlowAgent()
+    results = iter([{"result": ""}, {"result": "Mina Harker -[MARRIED_TO]-> Jonathan"}])
+
+    async def flaky(step, original_query, context):
+        agent.dispatched.append(step.step_id)
+        return next(results, {"result": "reingested"})
+
+    agent._dispatch_step = flaky
+    search = _step("mina", parameters={"entities": ["Mina Harker"]})
+
+    async def run():
+        return (await agent.execute_step(search, "Who is Mina?")).data["result"]
+
+    assert asyncio.run(run()) == ""
+    assert asyncio.run(run()) == "Mina Harker -[MARRIED_TO]-> Jonathan"
+    assert asyncio.run(run()) == "Mina Harker -[MARRIED_TO]-> Jonathan"
+    store.generation += 1
+    assert asyncio.run(run()) == "reingested"
+    assert len(agent.dispatched) == 3
+
+
+def test_synthesis_only_sees_results_of_its_query():
+    agent = SlowAgent()
+
+    async def run(query, *steps):
+        events = [e async for e in _executed(agent, _plan(*steps), query)]
+        return events[-1].result.data["synthesis"]
+
+    asyncio.run(run("first", _step("mina"), _step("answer", "synthesis")))
+    assert asyncio.run(run("second", _step("lucy"), _step("answer", "synthesis"))) == ["lucy"]
+    assert len(agent.execution_history) == 4
+
+
+def test_synthesis_streams_tokens_then_the_final_result(monkeypatch):
+    from langchain_core.messages import AIMessageChunk
+    from langchain_core.runnables import RunnableLambda
+
+    async def tokens(prompt):
+        assert "[mina]" in prompt
+        for token in ("<think>Hmm</think>", "Mina", " married", " Jonathan"):
+            await asyncio.sleep(0.01)
+            yield AIMessageChunk(content=token)
+
+    monkeypatch.setattr(agent_module, "get_llm_instance", lambda chain: RunnableLambda(tokens))
+    agent = AgenticGraphRAG(None, None, None, None)
+    results = [
+        StepResult("mina", True, {"result": "Mina Harker -[MARRIED_TO]-> Jonathan Harker"},
+                   90, "mina", ["doc"], 0.1),
+        StepResult("lucy", False, {"error": "timed out"}, 0, "lucy", [], 0.1),
+    ]
+    count = latency_stats.get("complex", {}).get("count", 0)
+
+    async def collect():
+        return [item async for item in agent.stream_synthesis(results, "Who did Mina marry?")]
+
+    items = asyncio.run(collect())
+    assert items[:-1] == ["<think>Hmm</think>", "Mina", " married", " Jonathan"]
+    final = items[-1]
+    assert isinstance(final, FinalResult)
+    assert final.answer.content == "<think>Hmm</think>Mina married Jonathan"
+    assert final.sources == ["doc"] and "lucy" in final.limitations
+    assert latency_stats["complex"]["count"] == count + 1
+    assert latency_stats["complex"]["first_token_seconds"] > 0
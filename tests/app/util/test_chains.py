@@ -0,0 +1,48 @@
+import asyncio
+
+from langchain_core.messages import AIMessage, SystemMessage
+from langchain_core.runnables import RunnableLambda
+
+from app.util.chains import ConversationState, count_tokens
+
+
+def _turn(state: ConversationState, i: int) -> None:
+    state.save_context({"human": f"question {i} " * 10}, {"ai": f"answer {i} " * 10})
+
+
+def test_history_buffer_is_bounded_by_tokens():
+    budget = 4 * count_tokens("question 0 " * 10)
+    state = ConversationState(max_tokens=budget)
+    for i in range(10):
+        _turn(state, i)
+
+    assert state.total_tokens <= budget
+    history = state.load_memory_variables({})["history"]
+    assert history.startswith("Human: question 8")
+    assert history.endswith(("answer 9 " * 10).strip())
+    assert len(state.get_messages()) == 4
+
+
+def test_evicted_turns_are_compacted_into_a_summary():
+    summarized = []
+
+    async def summarize(inputs):
+        summarized.append(inputs["question"])
+        return AIMessage(content=f"summary #{len(summarized)}")
+
+    async def run():
+        state = ConversationState(
+            max_tokens=2 * count_tokens("question 0 " * 10),
+            summarizer=RunnableLambda(summarize),
+        )
+        for i in range(3):
+            _turn(state, i)
+        await state._compaction
+        return state
+
+    state = asyncio.run(run())
+
+    assert state.summary == "summary #1"
+    assert "question 0" in summarized[0] and "answer 1" in summarized[0]
+    assert isinstance(state.get_messages()[0], SystemMessage)
+    assert state.load_memory_variables({})["history"].startswith("Summary: summary #1\nHuman:")
@@ -0,0 +1,112 @@
+import asyncio
+import threading
+import time
+
+from app.util.chains import count_tokens
+from app.util.conversation_store import (
+    ConversationManager,
+    NullConversationStore,
+    SQLiteConversationStore,
+)
+
+
+def test_sessions_resume_from_the_persistent_tier(tmp_path):
+    store = SQLiteConversationStore(tmp_path / "conversations.sqlite", ttl=60)
+    worker = ConversationManager(store)
+    worker.get("thread-1").save_context({"human": "Who is Mina?"}, {"ai": "A teacher."})
+    worker.flush()
+
+    other_worker = ConversationManager(store)
+    resumed = other_worker.get("thread-1")
+
+    assert [m.content for m in resumed.get_messages()] == ["Who is Mina?", "A teacher."]
+    assert other_worker.stats()["loads"] == 1
+
+
+def test_lru_bounds_sessions_in_memory(tmp_path):
+    manager = ConversationManager(
+        SQLiteConversationStore(tmp_path / "conversations.sqlite", ttl=60), max_sessions=2
+    )
+    for i in range(3):
+        manager.get(f"thread-{i}").save_context({"human": f"q{i}"}, {"ai": f"a{i}"})
+
+    stats = manager.stats()
+    assert stats["sessions"] == 2 and stats["evicted"] == 1
+    assert stats["tokens"] == 2 * (count_tokens("q0") + count_tokens("a0"))
+    # The evicted session is loaded lazily, with its history intact.
+    assert manager.get("thread-0").load_memory_variables({})["history"] == "Human: q0\nAI: a0"
+
+
+def test_idle_sessions_expire(tmp_path):
+    store = SQLiteConversationStore(tmp_path / "conversations.sqlite", ttl=0)
+    manager = ConversationManager(store, ttl=0)
+    manager.get("thread-1").save_context({"human": "q"}, {"ai": "a"})
+    manager.flush()
+
+    assert store.load("thread-1") is None
+    assert store.purge() == 1
+    assert manager.get("thread-1").get_messages() == []
+    assert manager.stats()["expired"] == 1
+
+
+def test_memory_only_store_keeps_hot_sessions():
+    manager = ConversationManager(NullConversationStore())
+    state = manager.get("thread-1")
+    assert manager.get("thread-1") is state
+
+
+def test_sessions_changed_by_another_worker_are_reloaded(tmp_path):
+    store = SQLiteConversationStore(tmp_path / "conversations.sqlite", ttl=60)
+    worker, other_worker = ConversationManager(store), ConversationManager(store)
+    worker.get("thread-1").save_context({"human": "Who is Mina?"}, {"ai": "A teacher."})
+    worker.flush()
+
+    other_worker.get("thread-1").save_context({"human": "And Lucy?"}, {"ai": "Her friend."})
+    other_worker.flush()
+
+    assert len(worker.get("thread-1").get_messages()) == 4
+    assert worker.stats()["stale"] == 1
+    # Unchanged elsewhere, the session in memory is kept.
+    assert worker.get("thread-1") is worker.get("thread-1")
+    assert worker.stats()["stale"] == 1
+
+
+def test_writes_are_coalesced_off_the_caller(tmp_path):
+    class SlowStore(SQLiteConversationStore):
+        saves = 0
+
+        def save(self, session_id, data):
+            time.sleep(0.05)
+            SlowStore.saves += 1
+            super().save(session_id, data)
+
+    manager = ConversationManager(SlowStore(tmp_path / "conversations.sqlite", ttl=60))
+    state = manager.get("thread-1")
+    started = time.perf_counter()
+    for i in range(5):
+        state.save_context({"human": f"q{i}"}, {"ai": f"a{i}"})
+    assert time.perf_counter() - started < 0.05
+
+    manager.flush()
+    assert SlowStore.saves < 5
+    assert len(manager.store.load("thread-1")["messages"]) == 10
+
+
+def test_aget_reads_the_store_off_the_event_loop(tmp_path):
+    class RecordingStore(SQLiteConversationStore):
+        threads = set()
+
+        def revision(self, session_id):
+            RecordingStore.threads.add(threading.get_ident())
+            return super().revision(session_id)
+
+    manager = ConversationManager(RecordingStore(tmp_path / "conversations.sqlite", ttl=60))
+    state = manager.get("thread-1")
+    RecordingStore.threads.clear()
+
+    async def resume():
+        return await manager.aget("thread-1"), threading.get_ident()
+
+    resumed, loop_thread = asyncio.run(resume())
+    assert resumed is state
+    assert RecordingStore.threads and loop_thread not in RecordingStore.threads
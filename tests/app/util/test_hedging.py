@@ -0,0 +1,173 @@
+import asyncio
+import time
+
+import pytest
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from app.util.hedging import HedgedChatModel, LatencyStats
+
+
+class SleepyChat(BaseChatModel):
+    """Answers with its name after `delay` seconds, or raises if `fail` is set."""
+
+    name: str
+    delay: float = 0.0
+    fail: bool = False
+
+    @property
+    def _llm_type(self) -> str:
+        return "sleepy"
+
+    def _result(self) -> ChatResult:
+        if self.fail:
+            raise ConnectionError(f"{self.name} is down")
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.name))])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self.delay)
+        return self._result()
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(self.delay)
+        return self._result()
+
+
+class StreamingChat(SleepyChat):
+    """Streams its name word by word, the first word after `delay` seconds."""
+
+    def _chunks(self):
+        if self.fail:
+            raise ConnectionError(f"{self.name} is down")
+        return [ChatGenerationChunk(message=AIMessageChunk(content=word))
+                for word in self.name.split(" ")]
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self.delay)
+        yield from self._chunks()
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(self.delay)
+        for chunk in self._chunks():
+            yield chunk
+
+
+def _hedged(*routes, **kwargs) -> HedgedChatModel:
+    return HedgedChatModel(
+        routes=list(routes),
+        names=[route.name for route in routes],
+        stats=LatencyStats(),
+        **kwargs,
+    )
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_slow_primary_is_hedged(use_async):
+    llm = _hedged(
+        SleepyChat(name="primary", delay=1.0),
+        SleepyChat(name="secondary"),
+        hedge_delay=0.05,
+    )
+    started = time.perf_counter()
+    if use_async:
+        answer = asyncio.run(llm.ainvoke([HumanMessage(content="q")]))
+    else:
+        answer = llm.invoke([HumanMessage(content="q")])
+
+    assert answer.content == "secondary"
+    assert time.perf_counter() - started < 0.5
+    assert llm.stats.snapshot()["secondary"]["hedged"] == 1
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_errors_fail_over_without_hedging(use_async):
+    llm = _hedged(
+        SleepyChat(name="primary", fail=True),
+        SleepyChat(name="secondary"),
+        hedge=False,
+    )
+    if use_async:
+        answer = asyncio.run(llm.ainvoke([HumanMessage(content="q")]))
+    else:
+        answer = llm.invoke([HumanMessage(content="q")])
+
+    assert answer.content == "secondary"
+    assert llm.stats.snapshot()["primary"]["errors"] == 1
+
+
+def test_timeouts_fail_over_and_last_error_is_raised():
+    llm = _hedged(
+        SleepyChat(name="primary", delay=1.0),
+        SleepyChat(name="secondary", fail=True),
+        hedge=False,
+        attempt_timeout=0.05,
+    )
+    with pytest.raises(ConnectionError):
+        asyncio.run(llm.ainvoke([HumanMessage(content="q")]))
+
+
+def test_hedge_delay_is_learned_from_latencies():
+    stats = LatencyStats()
+    llm = HedgedChatModel(
+        routes=[SleepyChat(name="primary")],
+        names=["primary"],
+        stats=stats,
+        min_samples=10,
+        initial_hedge_delay=2.0,
+        hedge_quantile=0.9,
+    )
+    assert llm.delay_for("primary") == 2.0
+
+    for i in range(10):
+        stats.record("primary", 0.1 * (i + 1))
+    assert llm.delay_for("primary") == pytest.approx(0.91)
+
+
+def test_streams_are_hedged_on_their_first_chunk():
+    llm = _hedged(
+        StreamingChat(name="primary answer", delay=1.0),
+        StreamingChat(name="secondary answer"),
+        hedge_delay=0.05,
+    )
+
+    async def stream():
+        return [chunk.content async for chunk in llm.astream([HumanMessage(content="q")])]
+
+    started = time.perf_counter()
+    assert asyncio.run(stream()) == ["secondary", "answer"]
+    assert time.perf_counter() - started < 0.5
+    assert llm.stats.snapshot()["secondary answer"]["hedged"] == 1
+
+
+def test_sync_streams_fail_over():
+    llm = _hedged(
+        StreamingChat(name="primary answer", fail=True),
+        StreamingChat(name="secondary answer"),
+    )
+    chunks = [chunk.content for chunk in llm.stream([HumanMessage(content="q")])]
+    assert chunks == ["secondary", "answer"]
+    assert llm.stats.snapshot()["primary answer"]["errors"] == 1
+
+
+class ToolChat(SleepyChat):
+    """Formats tools with its own name and records the kwargs of its calls."""
+
+    calls: list = []
+
+    def bind_tools(self, tools, **kwargs):
+        return self.bind(tools=[f"{self.name}:{tool}" for tool in tools], **kwargs)
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        self.calls.append(kwargs)
+        return super()._generate(messages, stop, run_manager, **kwargs)
+
+
+def test_tools_are_bound_per_route():
+    primary = ToolChat(name="ollama", fail=True, calls=[])
+    fallback = ToolChat(name="openai", calls=[])
+    llm = _hedged(primary, fallback, hedge=False).bind_tools(["Entities"], tool_choice="any")
+
+    assert llm.invoke([HumanMessage(content="q")]).content == "openai"
+    assert primary.calls == [{"tools": ["ollama:Entities"], "tool_choice": "any"}]
+    assert fallback.calls == [{"tools": ["openai:Entities"], "tool_choice": "any"}]
@@ -0,0 +1,102 @@
+import asyncio
+
+import pytest
+from langchain_core.runnables import RunnableLambda
+from langchain_ollama import ChatOllama
+
+from app.core.config import LLMSettings, config
+from app.util.hedging import HedgedChatModel
+from app.util.llm import LLMClientManager, ainvoke_with_deadline, astream_with_deadline
+
+
+@pytest.fixture(autouse=True)
+def clear_pool():
+    LLMClientManager.clear()
+    yield
+    LLMClientManager.clear()
+
+
+def test_pool_is_keyed_by_settings():
+    fast = LLMSettings(provider="ollama", model="phi3:14b", temperature=0.0)
+    creative = LLMSettings(provider="ollama", model="phi3:14b", temperature=0.7)
+
+    first = LLMClientManager.get_ollama_instance(fast)
+    again = LLMClientManager.get_ollama_instance(fast)
+    other = LLMClientManager.get_ollama_instance(creative)
+
+    assert first is again
+    assert other is not first
+    assert other.temperature == 0.7
+    assert LLMClientManager.stats() == {"hits": 1, "created": 2, "size": 2}
+
+
+def test_clients_share_transport_per_base_url():
+    settings = LLMSettings(provider="ollama", model="phi3:14b", temperature=0.0)
+
+    ollama = LLMClientManager.get_ollama_instance(settings)
+    openai_compatible = LLMClientManager.get_instance(settings)
+
+    assert ollama is not openai_compatible
+    assert len(LLMClientManager._transports) == 2
+    other = LLMClientManager.get_ollama_instance(
+        LLMSettings(provider="ollama", model="gemma2:9b", temperature=0.0)
+    )
+    assert other._client._client._transport is ollama._client._client._transport
+
+
+def test_ollama_clients_are_routed_over_fallbacks(monkeypatch):
+    monkeypatch.setattr(config, "LLM_FALLBACKS", ["ollama:gemma2:9b"])
+    llm = LLMClientManager.get_ollama_instance(
+        LLMSettings(provider="ollama", model="phi3:14b", temperature=0.0)
+    )
+    assert isinstance(llm, HedgedChatModel)
+    assert llm.names == ["ollama:phi3:14b", "ollama:gemma2:9b"]
+    assert isinstance(llm.routes[0], ChatOllama)
+
+
+def test_ollama_client_requires_ollama_provider():
+    with pytest.raises(ValueError):
+        LLMClientManager.get_ollama_instance(
+            LLMSettings(provider="openai", model="gpt-4o", temperature=0.0)
+        )
+
+
+def test_ainvoke_with_deadline_cancels_slow_calls():
+    cancelled = False
+
+    async def slow(_):
+        nonlocal cancelled
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled = True
+            raise
+
+    async def fast(value):
+        return value
+
+    with pytest.raises(TimeoutError):
+        asyncio.run(ainvoke_with_deadline(RunnableLambda(slow), "q", timeout=0.01))
+    assert cancelled
+    assert asyncio.run(ainvoke_with_deadline(RunnableLambda(fast), "q", timeout=1)) == "q"
+
+
+def test_astream_with_deadline_streams_until_the_deadline():
+    async def tokens(_):
+        for token in ("Mina", " married", " Jonathan"):
+            await asyncio.sleep(0.02)
+            yield token
+        await asyncio.sleep(10)
+        yield "!"
+
+    async def collect(timeout):
+        received = []
+        try:
+            async for token in astream_with_deadline(RunnableLambda(tokens), "q", timeout):
+                received.append(token)
+        except TimeoutError:
+            received.append("timeout")
+        return received
+
+    assert asyncio.run(collect(0.3)) == ["Mina", " married", " Jonathan", "timeout"]
+    assert asyncio.run(collect(0.01)) == ["timeout"]
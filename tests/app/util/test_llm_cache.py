@@ -0,0 +1,117 @@
+import time
+
+from langchain_core.embeddings import Embeddings
+from langchain_core.load import dumps
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from langchain_core.outputs import ChatGeneration
+
+from app.util.llm_cache import SQLiteLLMCache, _split_prompt
+from app.util.prompts.rag import CONDENSE_QUESTION_PROMPT
+
+LLM_STRING = "ollama-qwen3:30b-temperature-0"
+
+
+class KeywordEmbeddings(Embeddings):
+    """Embeds texts by counting a few keywords, so paraphrases land close together."""
+
+    keywords = ["mina", "harker", "dracula", "castle"]
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text):
+        return [float(text.lower().count(k)) for k in self.keywords]
+
+
+def _prompt(question: str, *context) -> str:
+    return dumps([*context, HumanMessage(content=question)])
+
+
+def _generation(answer: str):
+    return [ChatGeneration(message=AIMessage(content=answer))]
+
+
+def test_exact_lookup(tmp_path):
+    cache = SQLiteLLMCache(tmp_path / "cache.sqlite")
+    cache.update(_prompt("Who is Mina Harker?"), LLM_STRING, _generation("A teacher."))
+
+    hit = cache.lookup(_prompt("Who is Mina Harker?"), LLM_STRING)
+
+    assert hit[0].message.content == "A teacher."
+    assert cache.lookup(_prompt("Who is Mina Harker?"), "other-model") is None
+    assert cache.stats["exact_hits"] == 1
+
+
+def test_semantic_lookup_uses_similarity_threshold(tmp_path):
+    cache = SQLiteLLMCache(
+        tmp_path / "cache.sqlite",
+        embeddings=KeywordEmbeddings(),
+        similarity_threshold=0.9,
+    )
+    cache.update(_prompt("Who is Mina Harker?"), LLM_STRING, _generation("A teacher."))
+
+    hit = cache.lookup(_prompt("Tell me who Mina Harker is"), LLM_STRING)
+    miss = cache.lookup(_prompt("Where is Dracula's castle?"), LLM_STRING)
+
+    assert hit[0].message.content == "A teacher."
+    assert miss is None
+    assert cache.stats["semantic_hits"] == 1
+
+
+def test_eviction_by_size_and_age(tmp_path):
+    cache = SQLiteLLMCache(tmp_path / "cache.sqlite", max_entries=2, max_age=60)
+    for i in range(3):
+        cache.update(_prompt(f"question {i}"), LLM_STRING, _generation(str(i)))
+        time.sleep(0.01)
+
+    assert cache.lookup(_prompt("question 0"), LLM_STRING) is None
+    assert cache.lookup(_prompt("question 2"), LLM_STRING) is not None
+
+    cache.max_age = 0
+    assert cache.lookup(_prompt("question 2"), LLM_STRING) is None
+
+
+def test_semantic_lookup_compares_final_inputs_within_their_scope(tmp_path):
+    cache = SQLiteLLMCache(
+        tmp_path / "cache.sqlite",
+        embeddings=KeywordEmbeddings(),
+        similarity_threshold=0.9,
+    )
+    # Mentions every keyword, so embedding the whole prompt would match any question.
+    ner = SystemMessage(content="Extract entities like Mina Harker or Dracula's castle.")
+    planner = SystemMessage(content="Plan the query.")
+    cache.update(_prompt("Who is Mina Harker?", ner), LLM_STRING, _generation("Mina Harker"))
+
+    assert cache.lookup(_prompt("Tell me who Mina Harker is", ner), LLM_STRING) is not None
+    assert cache.lookup(_prompt("Where is Dracula's castle?", ner), LLM_STRING) is None
+    assert cache.lookup(_prompt("Tell me who Mina Harker is", planner), LLM_STRING) is None
+    assert cache.stats["semantic_hits"] == 1
+
+
+def test_semantic_lookup_is_bounded_to_recent_candidates(tmp_path):
+    cache = SQLiteLLMCache(
+        tmp_path / "cache.sqlite",
+        embeddings=KeywordEmbeddings(),
+        similarity_threshold=0.9,
+        max_candidates=1,
+    )
+    cache.update(_prompt("Who is Mina Harker?"), LLM_STRING, _generation("A teacher."))
+    time.sleep(0.01)
+    cache.update(_prompt("Where is Dracula's castle?"), LLM_STRING, _generation("Transylvania."))
+
+    assert cache.lookup(_prompt("Tell me who Mina Harker is"), LLM_STRING) is None
+
+
+def test_condense_prompts_are_scoped_by_their_chat_history():
+    def condense(question, *history):
+        messages = CONDENSE_QUESTION_PROMPT.invoke(
+            {"question": question, "chat_history": list(history)}
+        ).to_messages()
+        return dumps(messages)
+
+    context, question = _split_prompt(condense("Who is she married to?", "Who is Mina Harker?"))
+    assert question == "Who is she married to?"
+    assert "Who is Mina Harker?" in context
+    assert SQLiteLLMCache._scope(
+        condense("Who is she married to?", "Who is Mina Harker?"), LLM_STRING
+    ) != SQLiteLLMCache._scope(condense("Who is she married to?", "Who is Lucy?"), LLM_STRING)
@@ -0,0 +1,97 @@
+import asyncio
+
+import pytest
+
+from app.util import paths
+
+EDGES = [
+    ("Mina Harker", "MARRIED_TO", "Jonathan Harker"),
+    ("Jonathan Harker", "VISITED", "Castle Dracula"),
+    ("Count Dracula", "LIVES_IN", "Castle Dracula"),
+    ("Mina Harker", "FRIEND_OF", "Lucy Westenra"),
+    ("Count Dracula", "BIT", "Lucy Westenra"),
+    ("Van Helsing", "TREATED", "Lucy Westenra"),
+]
+
+
+def _neighbors(edges=EDGES):
+    neighbors = {}
+    for start, rel_type, end in edges:
+        neighbors.setdefault(start, []).append((end, (start, rel_type, end)))
+        neighbors.setdefault(end, []).append((start, (start, rel_type, end)))
+    return neighbors
+
+
+def test_bidirectional_bfs_finds_all_shortest_paths():
+    found = paths.bidirectional_paths(_neighbors(), "Mina Harker", "Count Dracula", 5, 10, 100)
+    assert [paths.summarize(p) for p in found] == [
+        "Mina Harker -[FRIEND_OF]-> Lucy Westenra <-[BIT]- Count Dracula"
+    ]
+    neighbors = _neighbors(EDGES + [("Jonathan Harker", "MET", "Van Helsing")])
+    found = paths.bidirectional_paths(neighbors, "Jonathan Harker", "Lucy Westenra", 5, 10, 100)
+    assert sorted(paths.summarize(p) for p in found) == [
+        "Jonathan Harker -[MET]-> Van Helsing -[TREATED]-> Lucy Westenra",
+        "Jonathan Harker <-[MARRIED_TO]- Mina Harker -[FRIEND_OF]-> Lucy Westenra",
+    ]
+
+
+def test_bidirectional_bfs_respects_bounds():
+    neighbors = _neighbors()
+    assert paths.bidirectional_paths(neighbors, "Mina Harker", "Count Dracula", 1, 10, 100) == []
+    # Lucy has three relationships, too many to be crossed with max_degree=2.
+    found = paths.bidirectional_paths(neighbors, "Mina Harker", "Count Dracula", 5, 10, 2)
+    assert [paths.summarize(p) for p in found] == [
+        "Mina Harker -[MARRIED_TO]-> Jonathan Harker -[VISITED]-> Castle Dracula "
+        "<-[LIVES_IN]- Count Dracula"
+    ]
+    assert paths.bidirectional_paths(neighbors, "Mina Harker", "Nobody", 5, 10, 100) == []
+
+
+class FakeGraph:
+    def __init__(self, slow=False):
+        self.slow = slow
+        self.queries = []
+
+    def query(self, query, params=None):
+        self.queries.append((query, params))
+        if "queryNodes" in query:
+            name = params["query"].replace("~2", "").replace(" AND", "")
+            return [{"id": name}] if name in _neighbors() else []
+        if "allShortestPaths" in query:
+            if self.slow:
+                raise TimeoutError("planner is slow")
+            return [{
+                "nodes": ["Mina Harker", "Jonathan Harker"],
+                "edges": [["Mina Harker", "MARRIED_TO", "Jonathan Harker"]],
+            }]
+        return [{"start": s, "type": t, "end": e} for s, t, e in EDGES]
+
+
+class FakeStore:
+    generation = 0
+
+    def __init__(self, graph):
+        self.graph = graph
+        self.timeouts = []
+
+    def query(self, query, params=None, timeout=None):
+        self.timeouts.append(timeout)
+        return self.graph.query(query, params)
+
+
+@pytest.mark.parametrize("slow, method", [(False, "cypher"), (True, "bfs")])
+def test_find_paths_uses_parameters_and_falls_back_to_bfs(monkeypatch, slow, method):
+    store = FakeStore(FakeGraph(slow))
+    monkeypatch.setattr(paths, "get_default_store", lambda: store)
+
+    result = asyncio.run(paths.find_paths(["Mina Harker", "Jonathan Harker", "Whoever"]))
+
+    assert result["result"] == "Mina Harker -[MARRIED_TO]-> Jonathan Harker"
+    assert list(result["method"].values()) == [method]
+    path_query, params = next(q for q in store.graph.queries if "allShortestPaths" in q[0])
+    assert "Mina Harker" not in path_query
+    assert params["source"] == "Mina Harker" and params["target"] == "Jonathan Harker"
+    # Degrees count relationships to entities, as the BFS adjacency does.
+    assert "COUNT { (n)-[:!MENTIONS]-(:__Entity__) }" in path_query
+    # The timeout bounds the Neo4j transaction, so the server aborts slow queries.
+    assert store.timeouts == [paths.config.PATH_QUERY_TIMEOUT]
@@ -0,0 +1,155 @@
+import asyncio
+import json
+
+import pytest
+from langchain_core.caches import InMemoryCache
+from langchain_core.language_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+
+from app.util import planner
+from app.util.planner import (
+    PlanError,
+    PlanStreamParser,
+    QueryPlanner,
+    parse_plan_json,
+    query_shape,
+    template_plan,
+)
+
+LLM_PLAN = {
+    "steps": [
+        {
+            "step_id": "search",
+            "description": "Search Mina Harker",
+            "query_type": "entity_search",
+            "parameters": {"entities": ["Mina Harker"]},
+            "dependencies": [],
+            "expected_confidence": 90,
+        },
+        {
+            "step_id": "answer",
+            "description": "Synthesize",
+            "query_type": "synthesis",
+            "parameters": {},
+            "dependencies": ["search"],
+            "expected_confidence": 80,
+        },
+    ],
+    "confidence_estimate": 80,
+    "estimated_time": 10.5,
+}
+
+
+@pytest.fixture
+def query_planner(monkeypatch):
+    monkeypatch.setattr(planner.config, "LLM_API_PROVIDER", "ollama")
+    monkeypatch.setattr(planner.config, "LLM_MODEL_ID", "qwen3:30b")
+    return QueryPlanner()
+
+
+def _planner_llm(*plans):
+    """Fake planner LLM answering with `plans`, then failing if called again."""
+    return GenericFakeChatModel(messages=iter([AIMessage(content=json.dumps(p)) for p in plans]))
+
+
+def _plan(query_planner, query, complexity_analysis):
+    async def run():
+        items = [item async for item in query_planner.stream_execution_plan(
+            query, complexity_analysis)]
+        return items[-1]
+
+    return asyncio.run(run())
+
+
+def test_comparison_uses_a_template(query_planner):
+    query_planner.llm = _planner_llm()
+    plan = _plan(query_planner, "Compare Mina Harker and Lucy Westenra", {"needs_comparison": True})
+    assert [s.query_type for s in plan.steps] == [
+        "entity_search", "entity_search", "relationship_traverse", "synthesis"
+    ]
+    assert plan.steps[2].parameters["entities"] == ["Mina Harker", "Lucy Westenra"]
+    assert plan.dependencies()["traverse_relationships"] == ["search_0", "search_1"]
+
+
+def test_unmatched_queries_are_planned_once_per_shape(query_planner):
+    query_planner.llm = _planner_llm(LLM_PLAN)
+    analysis = {"needs_planning": True}
+    _plan(query_planner, "How does Mina Harker feel?", analysis)
+    plan = _plan(query_planner, "How does Van Helsing feel?", analysis)
+
+    assert plan.steps[0].parameters["entities"] == ["Van Helsing"]
+    assert plan.steps[0].description == "Search Van Helsing"
+
+
+def test_invalid_llm_plans_are_not_cached(query_planner):
+    cyclic = {**LLM_PLAN, "steps": [{**LLM_PLAN["steps"][0], "dependencies": ["answer"]},
+                                    LLM_PLAN["steps"][1]]}
+    query_planner.llm = _planner_llm(cyclic, cyclic)
+
+    before = planner.planner_stats["llm"]
+    for _ in range(2):
+        with pytest.raises(PlanError):
+            _plan(query_planner, "Why Whitby?", {})
+    assert planner.planner_stats["llm"] - before == 2
+
+
+def test_template_needs_entities_and_a_known_pattern():
+    assert template_plan({"needs_comparison": True}, []) is None
+    assert template_plan({"needs_planning": True}, ["Whitby"]) is None
+    plan = template_plan({"needs_multi_step": True}, ["Jonathan Harker"])
+    assert [s.query_type for s in plan.steps] == ["entity_search", "synthesis"]
+
+
+def test_parse_plan_json_ignores_thinking_and_fences():
+    text = '<think>{"draft": 1}</think>\n```json\n{"steps": [], "confidence_estimate": 1}\n```'
+    assert parse_plan_json(text) == {"steps": [], "confidence_estimate": 1}
+
+
+def test_stream_parser_returns_steps_as_they_complete():
+    text = "<think>plan {\"steps\": [}</think>" + json.dumps(LLM_PLAN)
+    parser = PlanStreamParser()
+    completed = []
+    for i in range(0, len(text), 7):
+        steps = parser.feed(text[i:i + 7])
+        completed.extend((i, step["step_id"]) for step in steps)
+
+    assert [step_id for _, step_id in completed] == ["search", "answer"]
+    # The first step is complete long before the end of the response.
+    assert completed[0][0] < text.index('"answer"')
+    assert parse_plan_json(parser.text) == LLM_PLAN
+
+
+def test_stream_execution_plan_yields_steps_then_plan(query_planner):
+    query_planner.llm = GenericFakeChatModel(
+        messages=iter([AIMessage(content=json.dumps(LLM_PLAN, indent=1))])
+    )
+
+    async def run():
+        return [item async for item in query_planner.stream_execution_plan("Why Whitby?", {})]
+
+    items = asyncio.run(run())
+    assert [item.step_id for item in items[:-1]] == ["search", "answer"]
+    assert items[-1].confidence_estimate == 80
+    # The plan is cached for the next query of the same shape.
+    assert query_planner.cache.get(query_shape("Why Dover?", ["Dover"]), ["Dover"])
+
+
+def test_stream_execution_plan_goes_through_the_response_cache(query_planner):
+    # The fake model answers once, later calls must be served by the cache.
+    query_planner.llm = GenericFakeChatModel(
+        messages=iter([AIMessage(content=json.dumps(LLM_PLAN))]), cache=InMemoryCache()
+    )
+
+    async def plan():
+        query_planner.cache = planner.PlanCache()
+        return [item async for item in query_planner.stream_execution_plan("Why Whitby?", {})]
+
+    before = planner.planner_stats["llm_cached"]
+    streamed, cached = asyncio.run(plan()), asyncio.run(plan())
+    assert [item.step_id for item in cached[:-1]] == [item.step_id for item in streamed[:-1]]
+    assert planner.planner_stats["llm_cached"] - before == 1
+
+    # The streamed response is cached under the key `ainvoke` looks up.
+    prompt = query_planner._planning_prompt("Why Whitby?", {})
+    response = asyncio.run(query_planner.llm.ainvoke(prompt))
+    assert parse_plan_json(response.content) == LLM_PLAN
@@ -0,0 +1,57 @@
+from langchain_core.messages import AIMessage
+
+from app.util.planner import StepResult
+from app.util.serializer import serialize_results, serializer_stats, step_text
+
+NEIGHBORHOOD = """--- Entity: Mina Harker ---
+Node: Mina Harker (Wife of Jonathan) -[MARRIED_TO]-> Jonathan Harker (Solicitor)
+Node: Mina Harker (Wife of Jonathan) -[FRIEND_OF]-> Lucy Westenra (Friend of Mina)
+
+--- Entity: Lucy Westenra ---
+Node: Mina Harker (Wife of Jonathan) -[FRIEND_OF]-> Lucy Westenra (Friend of Mina)
+"""
+
+
+def _result(step_id, data):
+    return StepResult(step_id, True, data, 0.8, f"Completed {step_id}", [], 0.1)
+
+
+def test_step_text_drops_message_metadata_and_bookkeeping():
+    message = AIMessage(
+        content="<think>Let me see.</think>Mina married Jonathan.",
+        response_metadata={"model": "qwen3:30b", "total_duration": 123456789},
+    )
+    assert step_text({"synthesis": message}) == "Mina married Jonathan."
+    assert step_text({"result": "A -[R]-> B", "entities": {"A": "A"}, "method": "bfs"}) == (
+        "A -[R]-> B"
+    )
+
+
+def test_serialize_results_deduplicates_lines_across_steps():
+    serialized = serialize_results([
+        _result("search_1", {"result": NEIGHBORHOOD}),
+        _result("search_2", {"result": NEIGHBORHOOD}),
+        _result("paths", {"result": "Mina Harker -[FRIEND_OF]-> Lucy Westenra"}),
+    ])
+    assert serialized.text == (
+        "[search_1]\n"
+        "--- Entity: Mina Harker ---\n"
+        "Node: Mina Harker (Wife of Jonathan) -[MARRIED_TO]-> Jonathan Harker (Solicitor)\n"
+        "Node: Mina Harker (Wife of Jonathan) -[FRIEND_OF]-> Lucy Westenra (Friend of Mina)\n\n"
+        "[paths]\n"
+        "Mina Harker -[FRIEND_OF]-> Lucy Westenra"
+    )
+    assert serialized.duplicate_lines == 4
+    assert serialized.tokens < serialized.raw_tokens
+
+
+def test_serialize_results_truncates_each_step_to_its_budget():
+    lines = "\n".join(f"Node: Entity {i} -[KNOWS]-> Entity {i + 1}" for i in range(100))
+    before = serializer_stats["truncated_lines"]
+    serialized = serialize_results([_result("search", {"result": lines})], 50)
+
+    kept = serialized.text.splitlines()
+    assert kept[0] == "[search]" and kept[-1] == "[truncated]"
+    assert len(kept) - 2 + serialized.truncated_lines == 100
+    assert serialized.tokens <= 50 + 10
+    assert serializer_stats["truncated_lines"] - before == serialized.truncated_lines
@@ -0,0 +1,44 @@
+import pytest
+
+from app.core.config import config
+from app.util.agent import AgenticGraphRAG
+from app.util.chains import ConversationState, get_default_ner_chain
+from app.util.llm import LLMClientManager
+from app.util.shared import get_shared_chains
+
+
+@pytest.fixture(autouse=True)
+def ollama_settings(monkeypatch):
+    monkeypatch.setattr(config, "LLM_API_PROVIDER", "ollama")
+    monkeypatch.setattr(config, "LLM_MODEL_ID", "qwen3:30b")
+    get_shared_chains.cache_clear()
+    get_default_ner_chain.cache_clear()
+    yield
+    get_shared_chains.cache_clear()
+    get_default_ner_chain.cache_clear()
+
+
+def test_shared_chains_are_built_once():
+    shared = get_shared_chains()
+    created = LLMClientManager.stats()["created"]
+
+    assert get_shared_chains() is shared
+    assert shared.ner_chain is get_default_ner_chain()
+    assert LLMClientManager.stats()["created"] == created
+
+
+def test_sessions_only_own_their_history():
+    shared = get_shared_chains()
+    sessions = [
+        AgenticGraphRAG(
+            base_rag_chain=shared.rag_chain,
+            planner=shared.planner,
+            validator=shared.validator,
+            memory=ConversationState(),
+        )
+        for _ in range(2)
+    ]
+
+    assert sessions[0].planner is sessions[1].planner
+    assert sessions[0].memory is not sessions[1].memory
+    assert sessions[0].execution_history is not sessions[1].execution_history
@@ -0,0 +1,83 @@
+import asyncio
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.runnables import RunnableLambda
+
+from app.util import retrievers, speculation
+from app.util.prompts import rag
+
+ENTITIES = {
+    "Who is Mina Harker?": ["Mina Harker"],
+    "Who is she married to?": [],
+    "Who is Mina Harker married to?": ["Mina Harker"],
+    "And Lucy?": ["Lucy"],
+    "Who is Lucy Westenra married to?": ["Lucy Westenra"],
+}
+
+
+@pytest.fixture
+def retrieved(monkeypatch):
+    calls = []
+
+    def super_retriever(question, entities=None):
+        calls.append((question, entities))
+        return f"context for {entities}"
+
+    async def condense(inputs):
+        return {
+            "Who is she married to?": "Who is Mina Harker married to?",
+            "And Lucy?": "Who is Lucy Westenra married to?",
+        }[inputs["question"]]
+
+    monkeypatch.setattr(retrievers, "extract_entities", lambda q: ENTITIES[q])
+    monkeypatch.setattr(retrievers, "super_retriever", super_retriever)
+    monkeypatch.setattr(rag, "condense_question", RunnableLambda(condense))
+    monkeypatch.setattr(speculation, "entity_memory", speculation.EntityMemory())
+    monkeypatch.setattr(speculation, "speculation_stats",
+                        {"speculated": 0, "hits": 0, "misses": 0})
+    return calls
+
+
+def _ask(question, history=None, session_id="session-1"):
+    return asyncio.run(
+        speculation.speculative_context(
+            {"question": question, "chat_history": history},
+            {"configurable": {"session_id": session_id}},
+        )
+    )
+
+
+def test_speculation_uses_previous_turn_entities(retrieved):
+    _ask("Who is Mina Harker?")
+    history = [HumanMessage(content="Who is Mina Harker?"), AIMessage(content="A teacher.")]
+
+    assert _ask("Who is she married to?", history) == "context for ['Mina Harker']"
+    assert retrieved[-1] == ("Who is she married to?", ["Mina Harker"])
+    assert speculation.speculation_stats["hits"] == 1
+
+
+def test_speculation_miss_reruns_retrieval(retrieved):
+    _ask("Who is Mina Harker?")
+    history = [HumanMessage(content="Who is Mina Harker?"), AIMessage(content="A teacher.")]
+
+    assert _ask("And Lucy?", history) == "context for ['Lucy Westenra']"
+    assert retrieved[-1] == ("Who is Lucy Westenra married to?", ["Lucy Westenra"])
+    assert speculation.speculation_stats["misses"] == 1
+    assert speculation.hit_rate() == 0.0
+
+
+def test_previous_turn_entities_are_not_shared_across_sessions(retrieved):
+    _ask("Who is Mina Harker?", session_id="session-1")
+    history = [HumanMessage(content="Who is Mina Harker?"), AIMessage(content="A teacher.")]
+
+    retriever = speculation.get_context_retriever(True)
+    context = asyncio.run(retriever.ainvoke(
+        {"question": "Who is she married to?", "chat_history": history},
+        {"configurable": {"session_id": "session-2"}},
+    ))
+
+    assert context == "context for ['Mina Harker']"
+    # Session 2 never resolved "Mina Harker", so it speculated without her.
+    assert retrieved[-2] == ("Who is she married to?", [])
+    assert speculation.speculation_stats["misses"] == 1
@@ -0,0 +1,59 @@
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+
+from app.util import standalone
+
+KNOWN = {"Mina Harker", "Whitby", "Count Dracula"}
+
+
+def linker(mentions):
+    return [m for m in mentions if m in KNOWN]
+
+
+def test_mentions_skip_question_words():
+    assert standalone.mentions("Who is Mina Harker?") == ["Mina Harker"]
+    assert standalone.mentions("How did Jonathan Harker reach Whitby?") == [
+        "Jonathan Harker", "Whitby"
+    ]
+
+
+@pytest.mark.parametrize(
+    "question, expected",
+    [
+        ("Who is Mina Harker?", True),
+        ("Why did Count Dracula travel to Whitby?", True),
+        ("Who is she married to?", False),
+        ("What did they find there?", False),
+        ("And Whitby?", False),
+        ("What happened after the storm?", False),
+        ("Who is Quincey Morris?", False),
+    ],
+)
+def test_classify(question, expected):
+    assert standalone.classify(question, linker)[0] is expected
+
+
+def test_classify_condenses_when_linking_fails():
+    def broken(mentions):
+        raise ConnectionError("neo4j is down")
+
+    assert standalone.classify("Who is Mina Harker?", broken) == (False, "linking failed")
+
+
+def test_needs_condensation_counts_decisions(monkeypatch):
+    monkeypatch.setattr(standalone, "_link", linker)
+    monkeypatch.setattr(standalone, "condense_stats", dict.fromkeys(standalone.condense_stats, 0))
+    history = [HumanMessage(content="Who is Lucy?"), AIMessage(content="A friend of Mina.")]
+
+    assert not standalone.needs_condensation({"question": "Who is she?", "chat_history": []})
+    assert not standalone.needs_condensation(
+        {"question": "Who is Mina Harker?", "chat_history": history}
+    )
+    assert standalone.needs_condensation({"question": "Who is she?", "chat_history": history})
+    assert standalone.condense_stats["skipped"] == 1
+    assert standalone.condense_stats["condensed"] == 1
+
+    monkeypatch.setattr(standalone.config, "SKIP_CONDENSE", False)
+    assert standalone.needs_condensation(
+        {"question": "Who is Mina Harker?", "chat_history": history}
+    )
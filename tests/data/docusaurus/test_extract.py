@@ -0,0 +1,34 @@
+from datetime import date
+
+from bs4 import BeautifulSoup
+
+from data.docusaurus.extract import IncrementalDocusaurusLoader
+
+SITEMAP = """<?xml version="1.0" encoding="UTF-8"?>
+<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+  <url><loc>https://docs.example.com/old</loc><lastmod>2024-01-01</lastmod></url>
+  <url><loc>https://docs.example.com/new</loc><lastmod>2024-06-01T10:00:00Z</lastmod></url>
+  <url><loc>https://docs.example.com/unknown</loc></url>
+</urlset>
+"""
+
+
+def test_parse_sitemap_keeps_pages_modified_since():
+    loader = IncrementalDocusaurusLoader(
+        "https://docs.example.com", since=date(2024, 3, 1)
+    )
+
+    els = loader.parse_sitemap(BeautifulSoup(SITEMAP, "xml"))
+
+    assert [el["loc"] for el in els] == [
+        "https://docs.example.com/new",
+        "https://docs.example.com/unknown",
+    ]
+
+
+def test_parse_sitemap_without_since_keeps_all_pages():
+    loader = IncrementalDocusaurusLoader("https://docs.example.com")
+
+    els = loader.parse_sitemap(BeautifulSoup(SITEMAP, "xml"))
+
+    assert len(els) == 3
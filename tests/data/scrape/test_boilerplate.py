@@ -0,0 +1,32 @@
+from data.scrape.boilerplate import extract_main_content
+
+PAGE = """
+<html>
+  <head><title>Signals</title><script>window.x = 1</script></head>
+  <body>
+    <header>Angular Docs</header>
+    <nav><a href="/api">API</a><a href="/cli">CLI</a></nav>
+    <div role="navigation">Sidebar links</div>
+    <main>
+      <h1>Signals</h1>
+      <p>A signal is a wrapper around a value.</p>
+      <h2>Writable signals</h2>
+      <p>Use set to change the value.</p>
+    </main>
+    <aside>On this page</aside>
+    <footer>Copyright</footer>
+  </body>
+</html>
+"""
+
+
+def test_extract_main_content_drops_boilerplate():
+    result = extract_main_content(PAGE)
+
+    assert "A signal is a wrapper around a value." in result["content"]
+    for boilerplate in ("Angular Docs", "Sidebar links", "On this page", "Copyright", "window.x"):
+        assert boilerplate not in result["content"]
+    assert result["title"] == "Signals"
+    assert result["headings"] == ["# Signals", "## Writable signals"]
+    assert result["length"] < result["raw_length"]
+    assert result["parse_time_ms"] >= 0
@@ -0,0 +1,59 @@
+from unittest.mock import patch
+
+import httpx
+
+from data.scrape.cache import CacheEntry, CrawlCache, content_hash
+from data.scrape.extract import DocScraper, DocURLs
+
+
+def _page(url: str, content: str) -> dict:
+    return {"content": content, "metadata": {"url": url, "length": len(content)}}
+
+
+def test_crawl_cache_roundtrip(tmp_path):
+    cache = CrawlCache(tmp_path)
+    cache.put(
+        CacheEntry(
+            url="https://example.com/a",
+            content_hash=content_hash("body"),
+            body="body",
+            metadata={},
+            etag='"abc"',
+            last_modified="Wed, 21 Oct 2015 07:28:00 GMT",
+        )
+    )
+
+    entry = cache.get("https://example.com/a")
+    assert entry is not None
+    assert entry.body == "body"
+    assert cache.conditional_headers("https://example.com/a") == {
+        "If-None-Match": '"abc"',
+        "If-Modified-Since": "Wed, 21 Oct 2015 07:28:00 GMT",
+    }
+    assert cache.get("https://example.com/missing") is None
+    assert cache.conditional_headers("https://example.com/missing") == {}
+
+
+def test_scraper_skips_unchanged_pages(tmp_path):
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.headers.get("If-None-Match") == '"v1"':
+            return httpx.Response(304)
+        return httpx.Response(200, headers={"ETag": '"v1"'})
+
+    with patch.object(DocScraper, "_initialize_driver"):
+        scraper = DocScraper(DocURLs.angular, CrawlCache(tmp_path))
+    scraper.http = httpx.Client(transport=httpx.MockTransport(handler))
+
+    url = "https://example.com/page"
+    with patch.object(
+        DocScraper, "_scrape_page_content", return_value=_page(url, "hello")
+    ) as scrape_page_content:
+        assert scraper._scrape_page(url) == _page(url, "hello")
+        # Not loaded yet, so not cached: a failed load is scraped again.
+        assert scraper._scrape_page(url) == _page(url, "hello")
+        scraper.mark_loaded([url])
+        assert scraper._scrape_page(url) is None
+        assert scrape_page_content.call_count == 2
+
+    assert scraper.stats["changed"] == 2
+    assert scraper.stats["not_modified"] == 1
@@ -0,0 +1,82 @@
+from langchain_core.documents import Document
+from langchain_core.embeddings import FakeEmbeddings
+from redis.exceptions import ResponseError
+
+from data.scrape.redis_loader import RedisBulkLoader
+
+
+class FakeSearch:
+    def __init__(self, server: "FakeRedis", name: str):
+        self.server = server
+        self.name = name
+
+    def info(self):
+        if self.name not in self.server.indexes:
+            raise ResponseError("Unknown index name")
+        return {}
+
+    def create_index(self, fields, definition):
+        self.server.indexes[self.name] = fields
+
+
+class FakePipeline:
+    def __init__(self, server: "FakeRedis"):
+        self.server = server
+        self.commands = []
+
+    def hset(self, key, mapping):
+        self.commands.append((key, mapping))
+
+    def execute(self):
+        self.server.round_trips += 1
+        for key, mapping in self.commands:
+            self.server.hashes.setdefault(key, {}).update(mapping)
+
+
+class FakeRedis:
+    """Local stand-in for the subset of the Redis API used by the bulk loader."""
+
+    def __init__(self):
+        self.hashes = {}
+        self.indexes = {}
+        self.round_trips = 0
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    def ft(self, name):
+        return FakeSearch(self, name)
+
+
+def _docs(n: int):
+    return [
+        Document(
+            page_content=f"chunk {i}",
+            metadata={"content_checksum": f"sum{i}", "url": "https://angular.dev/api"},
+        )
+        for i in range(n)
+    ]
+
+
+def test_load_pipelines_batches_and_creates_index():
+    server = FakeRedis()
+    loader = RedisBulkLoader(server, FakeEmbeddings(size=8), batch_size=2)  # type: ignore
+
+    assert loader.load(_docs(5)) == 5
+
+    assert server.round_trips == 3
+    assert "redis-index" in server.indexes
+    stored = server.hashes["doc:redis-index:sum0"]
+    assert stored["content"] == "chunk 0"
+    assert stored["url"] == "https://angular.dev/api"
+    assert len(stored["content_vector"]) == 8 * 4
+
+
+def test_load_is_idempotent_on_content_checksum():
+    server = FakeRedis()
+    loader = RedisBulkLoader(server, FakeEmbeddings(size=8), batch_size=2)  # type: ignore
+
+    loader.load(_docs(3))
+    loader.load(_docs(3))
+
+    assert len(server.hashes) == 3
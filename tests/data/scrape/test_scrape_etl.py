@@ -0,0 +1,100 @@
+from unittest.mock import patch
+
+import pytest
+from langchain_core.documents import Document
+
+from data.scrape.scrape_etl import ScrapeETL
+from data.scrape.transform import Transformer
+from data.store import StoreEnum
+
+
+@pytest.fixture
+def etl():
+    with (
+        patch("data.scrape.scrape_etl.DocScraper"),
+        patch("data.scrape.scrape_etl.Transformer") as transformer,
+        patch("data.scrape.scrape_etl.DataLoader"),
+    ):
+        transformer.return_value.convert.side_effect = lambda docs: docs
+        transformer.return_value.failed_urls = set()
+        yield ScrapeETL(None, StoreEnum.redis, batch_size=2)  # type: ignore
+
+
+def _docs(n: int):
+    for i in range(n):
+        yield Document(page_content=f"doc {i}")
+
+
+def _pages(*pages):
+    for page, chunks in pages:
+        for i in range(chunks):
+            yield Document(page_content=f"{page} {i}", metadata={"url": page})
+
+
+def test_load_streams_fixed_size_batches(etl):
+    etl.load(_docs(5))
+
+    batch_sizes = [len(c.args[0]) for c in etl.loader.load.call_args_list]
+    assert batch_sizes == [2, 2, 1]
+
+
+def test_load_flushes_partial_batch_on_shutdown(etl):
+    def interrupted():
+        yield from _docs(3)
+        raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        etl.load(interrupted())
+
+    batch_sizes = [len(c.args[0]) for c in etl.loader.load.call_args_list]
+    assert batch_sizes == [2, 1]
+
+
+def test_failed_batch_is_not_flushed_again(etl):
+    etl.loader.load.side_effect = ConnectionError("graph is down")
+
+    with pytest.raises(ConnectionError):
+        etl.load(_docs(5))
+
+    assert etl.loader.load.call_count == 1
+
+
+def test_pages_are_marked_loaded_once_all_their_documents_are(etl):
+    def pages():
+        yield from _pages(("a", 3), ("b", 1), ("c", 2))
+        raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        etl.load(pages())
+
+    marked = [sorted(c.args[0]) for c in etl.scraper.mark_loaded.call_args_list]
+    # Batches: [a, a], [a, b], [c, c]; "c" may have been cut short by the interrupt.
+    assert marked == [[], ["a"], ["b"]]
+
+
+def test_last_page_is_marked_loaded_when_batches_end_full(etl):
+    etl.load(_pages(("a", 1), ("b", 1)))
+
+    marked = [sorted(c.args[0]) for c in etl.scraper.mark_loaded.call_args_list]
+    assert marked == [["a"], ["b"]]
+
+
+def test_pages_that_fail_extraction_are_not_marked_loaded():
+    def process_document(document, llm_transformer):
+        if document.metadata["url"] == "b":
+            raise ValueError("invalid structured output")
+        return [document]
+
+    with (
+        patch("data.scrape.scrape_etl.DocScraper"),
+        patch("data.scrape.scrape_etl.DataLoader"),
+        patch("data.scrape.transform.get_llm_instance"),
+        patch.object(Transformer, "_get_llm_transformer"),
+        patch.object(Transformer, "process_document", side_effect=process_document),
+    ):
+        etl = ScrapeETL(None, StoreEnum.neo4j, batch_size=2)  # type: ignore
+        etl.load(_pages(("a", 1), ("b", 2), ("c", 1)))
+
+    marked = [sorted(c.args[0]) for c in etl.scraper.mark_loaded.call_args_list]
+    assert marked == [["a"], [], ["c"]]
+    assert etl.transformer.failed_urls == {"b"}
@@ -0,0 +1,27 @@
+from unittest.mock import MagicMock
+
+from data import store as store_module
+from data.store import Store
+
+
+def test_query_bounds_the_transaction_with_a_driver_from_config(monkeypatch):
+    record = MagicMock()
+    record.data.return_value = {"id": "Mina Harker"}
+    driver = MagicMock()
+    driver.execute_query.return_value = ([record], None, None)
+    connect = MagicMock(return_value=driver)
+    monkeypatch.setattr(store_module.GraphDatabase, "driver", connect)
+    store = Store(graph=MagicMock(), vectorstore=MagicMock(), embeddings=MagicMock())
+
+    assert store.query("MATCH (e) RETURN e.id AS id", {"id": 1}, timeout=3) == [
+        {"id": "Mina Harker"}
+    ]
+    store.query("MATCH (e) RETURN e.id AS id")
+
+    connect.assert_called_once()
+    assert connect.call_args.args == (store_module.config.NEO4J_URI,)
+    query = driver.execute_query.call_args_list[0].args[0]
+    assert query.text == "MATCH (e) RETURN e.id AS id" and query.timeout == 3
+    assert driver.execute_query.call_args_list[0].kwargs["parameters_"] == {"id": 1}
+    # The graph of the store is left to langchain.
+    store.graph.query.assert_not_called()
@@ -0,0 +1,78 @@
+import json
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from langchain_openai import ChatOpenAI
+
+from app.util.prompts.entities import Entities
+from fakellm import FakeLLMSettings, create_app
+
+
+@pytest.fixture
+def client():
+    return TestClient(create_app(FakeLLMSettings(embedding_dim=8)))
+
+
+@pytest.fixture
+def llm(client):
+    return ChatOpenAI(
+        base_url="http://testserver/v1", api_key="fake", model="qwen3:30b", http_client=client
+    )
+
+
+def test_completions_are_deterministic(llm):
+    first = llm.invoke("tell me about count dracula")
+    assert first.content
+    assert llm.invoke("tell me about count dracula").content == first.content
+    assert "".join(c.content for c in llm.stream("tell me about count dracula")) == first.content
+
+
+@pytest.mark.parametrize("method", ["function_calling", "json_schema"])
+def test_structured_output_returns_valid_entities(llm, method):
+    entities = llm.with_structured_output(Entities, method=method).invoke(
+        "Use the given format to extract information from the following "
+        "input: How did Jonathan Harker meet Count Dracula?"
+    )
+    assert entities.names == ["Jonathan Harker", "Count Dracula"]
+
+
+def test_bound_tools_are_called(llm):
+    message = llm.bind_tools([Entities]).invoke("Where is Whitby?")
+    assert message.tool_calls[0]["name"] == "Entities"
+    assert message.tool_calls[0]["args"] == {"names": ["Whitby"]}
+
+
+def test_planner_prompts_get_a_json_plan(llm):
+    response = llm.invoke(
+        'You are a query planner.\n    Query: Who visited Whitby?\n    {"steps": []}'
+    )
+    plan = json.loads(response.content)
+    assert [s["query_type"] for s in plan["steps"]] == [
+        "entity_search", "relationship_traverse", "synthesis"
+    ]
+    assert plan["steps"][0]["parameters"]["entities"] == ["Whitby"]
+
+
+def test_ollama_chat_and_embed(client):
+    chat = client.post(
+        "/api/chat",
+        json={"model": "qwen3:30b", "stream": False,
+              "messages": [{"role": "user", "content": "hello"}]},
+    ).json()
+    assert chat["done"] and chat["message"]["content"]
+
+    lines = client.post(
+        "/api/chat",
+        json={"model": "qwen3:30b", "messages": [{"role": "user", "content": "hello"}]},
+    ).text.splitlines()
+    assert "".join(json.loads(line)["message"]["content"] for line in lines) == (
+        chat["message"]["content"]
+    )
+
+    embeddings = client.post(
+        "/api/embed", json={"model": "nomic-embed-text", "input": ["a", "b", "a"]}
+    ).json()["embeddings"]
+    assert len(embeddings[0]) == 8
+    assert embeddings[0] == embeddings[2] != embeddings[1]
+    assert np.linalg.norm(embeddings[0]) == pytest.approx(1.0)